@@ -1,18 +1,100 @@
+import queue
 import requests
+import threading
 import time
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Dict, Optional, Sequence
 from datetime import datetime, timezone
-# from .config import MAX_POSTS_PER_KEYWORD
+from urllib.parse import urlencode
 import os
-import dotenv
+from . import jsonio, metrics, transport
+from .config import settings
+from .fetch_state import FetchState
+from .matcher import MultiPatternMatcher
+from .models import Post
+from .rate_limit import TokenBucket
+from .ws_client import WebSocket, WebSocketClosed
 
-# Load environment variables
-dotenv.load_dotenv()
+# Reconnects resume this far before the last event seen (events may repeat, none are lost)
+JETSTREAM_REWIND_SECONDS = 5
 
-# Load max posts per keyword from config or use default
-MAX_POSTS_PER_KEYWORD = int(os.getenv("MAX_POSTS_PER_KEYWORD"))
+# Without matches, the cursor still advances to the newest event read this often
+JETSTREAM_IDLE_COMMIT_SECONDS = 30
+
+POST_COLLECTION = "app.bsky.feed.post"
+
+# searchPosts 429s: retries per request, and the longest server-requested wait honoured
+SEARCH_MAX_RETRIES = 3
+SEARCH_MAX_BACKOFF_SECONDS = 60.0
+
+# One bucket shared by every worker, replaces the fixed sleeps between requests
+# (built on first use from BLUESKY_RATE_LIMIT / BLUESKY_RATE_BURST)
+_rate_limiter: Optional[TokenBucket] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """The shared searchPosts token bucket"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = TokenBucket(settings.BLUESKY_RATE_LIMIT, settings.BLUESKY_RATE_BURST)
+    return _rate_limiter
+
+
+def reset_rate_limiter() -> None:
+    """Drop the shared bucket; the next request rebuilds it from settings"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = None
+
+
+def _retry_after(response: requests.Response, attempt: int) -> float:
+    """Seconds a 429 asks us to wait: Retry-After, else RateLimit-Reset (epoch seconds), else backoff"""
+    headers = response.headers
+    try:
+        return max(0.0, float(headers["retry-after"]))
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, float(headers["ratelimit-reset"]) - time.time())
+    except (KeyError, TypeError, ValueError):
+        return float(2 ** attempt)
+
+
+def _search(params: Dict) -> requests.Response:
+    """
+    One rate-limited searchPosts request (raises on HTTP errors).
+
+    A 429 pauses the shared token bucket for as long as the server asks,
+    so every worker backs off, and the request is retried up to
+    SEARCH_MAX_RETRIES times.
+    """
+    for attempt in range(SEARCH_MAX_RETRIES + 1):
+        metrics.observe("rate_limit_wait_seconds", get_rate_limiter().acquire(), limiter="bluesky")
+        started = time.perf_counter()
+        try:
+            response = transport.get(settings.BLUESKY_API_URL, params=params)
+            if response.status_code == 429 and attempt < SEARCH_MAX_RETRIES:
+                metrics.inc("bluesky_requests_total", outcome="429")
+                wait = min(_retry_after(response, attempt), SEARCH_MAX_BACKOFF_SECONDS)
+                print(f"[BlueSky] ⏳ searchPosts rate limited, retrying in {wait:.1f}s "
+                      f"({attempt + 1}/{SEARCH_MAX_RETRIES})")
+                get_rate_limiter().pause(wait)
+                continue
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            metrics.inc("bluesky_requests_total", outcome=str(e.response.status_code))
+            raise
+        except Exception:
+            metrics.inc("bluesky_requests_total", outcome="error")
+            raise
+        finally:
+            metrics.observe("bluesky_request_seconds", time.perf_counter() - started)
+        metrics.inc("bluesky_requests_total", outcome="ok")
+        return response
 
-BLUESKY_API_URL = "https://api.bsky.app/xrpc/app.bsky.feed.searchPosts"
 
 def fetch_posts(keyword: str, max_posts: int = None) -> List[Dict]:
     """
@@ -26,7 +108,7 @@ def fetch_posts(keyword: str, max_posts: int = None) -> List[Dict]:
         List of post dictionaries
     """
     if max_posts is None:
-        max_posts = MAX_POSTS_PER_KEYWORD
+        max_posts = settings.MAX_POSTS_PER_KEYWORD
     
     all_posts = []
     cursor = None
@@ -45,9 +127,8 @@ def fetch_posts(keyword: str, max_posts: int = None) -> List[Dict]:
             params["cursor"] = cursor
         
         try:
-            response = requests.get(BLUESKY_API_URL, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            response = _search(params)
+            data = jsonio.loads(response.content)
             
             posts = data.get("posts", [])
             if not posts:
@@ -60,10 +141,6 @@ def fetch_posts(keyword: str, max_posts: int = None) -> List[Dict]:
             cursor = data.get("cursor")
             if not cursor:
                 break  # No more pages
-            
-            # Rate limiting between pages (only if fetching another page)
-            if len(all_posts) < max_posts and cursor:
-                time.sleep(0.5)  # Shorter delay between pages of same keyword
                 
         except requests.exceptions.RequestException as e:
             print(f"[BlueSky] Error fetching '{keyword}' (page {pages_fetched + 1}): {e}")
@@ -81,27 +158,129 @@ def fetch_posts(keyword: str, max_posts: int = None) -> List[Dict]:
     return all_posts
 
 
-def fetch_all(keywords: List[str]) -> List[Dict]:
+def fetch_keywords_concurrently(
+    fetch_fn: Callable[[str], List[Dict]],
+    keywords: List[str],
+    max_workers: int = None,
+) -> List[List[Dict]]:
+    """
+    Run a per-keyword fetch function over a bounded thread pool.
+    
+    Request pacing is handled by the shared token bucket, so workers
+    only wait when the searchPosts budget is actually exhausted.
+    
+    Args:
+        fetch_fn: Function fetching the posts for one keyword
+        keywords: List of search terms
+        max_workers: Worker count (uses FETCH_WORKERS if None)
+        
+    Returns:
+        One list of posts per keyword, in keyword order
+    """
+    if max_workers is None:
+        max_workers = settings.FETCH_WORKERS
+    max_workers = max(1, min(max_workers, len(keywords) or 1))
+    
+    if max_workers == 1:
+        return [fetch_fn(keyword) for keyword in keywords]
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bsky-fetch") as executor:
+        return list(executor.map(fetch_fn, keywords))
+
+
+class FetchMerger:
+    """
+    URI-keyed merge of search results across keywords.
+    
+    Overlapping keywords return the same post many times; pages are merged
+    here as they arrive so only unique posts reach the pipeline. Each kept
+    post gets a "matched_keywords" list, and per-keyword raw/unique counts
+    show which keywords add nothing new.
+    
+    With `keep_posts=False` only each URI's keyword list is retained, so
+    streamed posts can be released once the pipeline is done with them.
+    """
+    
+    def __init__(self, keywords: List[str], keep_posts: bool = True):
+        self.posts: Dict[str, Dict] = {}
+        self.keep_posts = keep_posts
+        self.raw_counts = {keyword: 0 for keyword in keywords}
+        self.unique_counts = {keyword: 0 for keyword in keywords}
+        self._lock = threading.Lock()
+    
+    def add_page(self, keyword: str, posts: List[Dict]) -> List[Dict]:
+        """Merge a page; returns the posts not seen before"""
+        fresh = []
+        with self._lock:
+            self.raw_counts[keyword] = self.raw_counts.get(keyword, 0) + len(posts)
+            for post in posts:
+                uri = post.get("uri")
+                existing = self.posts.get(uri)
+                if existing is not None:
+                    keywords = existing["matched_keywords"] if self.keep_posts else existing
+                    if keyword not in keywords:
+                        keywords.append(keyword)
+                    continue
+                post["matched_keywords"] = [keyword]
+                self.posts[uri] = post if self.keep_posts else post["matched_keywords"]
+                self.unique_counts[keyword] = self.unique_counts.get(keyword, 0) + 1
+                fresh.append(post)
+        return fresh
+    
+    def unique_posts(self) -> List[Dict]:
+        return list(self.posts.values()) if self.keep_posts else []
+    
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Per-keyword {"raw", "unique"} counts (unique = first seen via that keyword)"""
+        return {
+            keyword: {"raw": self.raw_counts[keyword], "unique": self.unique_counts.get(keyword, 0)}
+            for keyword in self.raw_counts
+        }
+    
+    def print_report(self) -> None:
+        raw_total = sum(self.raw_counts.values())
+        print(f"[BlueSky] Merged {raw_total} raw results into {len(self.posts)} unique posts")
+        
+        redundant = [k for k, counts in self.report().items() if counts["raw"] and not counts["unique"]]
+        for keyword, counts in sorted(self.report().items(), key=lambda item: item[1]["unique"]):
+            if counts["raw"]:
+                print(f"[BlueSky]   {counts['unique']:>4} unique / {counts['raw']:>4} raw  '{keyword}'")
+        if redundant:
+            print(f"[BlueSky] {len(redundant)} keyword(s) returned only posts found by others: "
+                  + ", ".join(f"'{k}'" for k in redundant))
+
+
+# Raw vs unique counts from the most recent keyword sweep
+last_fetch_report: Dict[str, Dict[str, int]] = {}
+
+
+def fetch_all(keywords: List[str], max_workers: int = None) -> List[Dict]:
     """
     Fetch posts for all keywords with rate limiting.
     
     Args:
         keywords: List of search terms
+        max_workers: Concurrent keyword fetches (uses FETCH_WORKERS if None)
         
     Returns:
-        Combined list of all posts
+        Unique posts (by URI) across all keywords, each with "matched_keywords"
     """
+    global last_fetch_report
+    
     print(f"[BlueSky] Fetching posts for {len(keywords)} keywords...")
     
-    all_posts = []
-    for i, keyword in enumerate(keywords, 1):
-        posts = fetch_posts(keyword)
-        all_posts.extend(posts)
-        
-        # Rate limiting between keywords (longer delay)
-        if i < len(keywords):
-            time.sleep(1.5)
+    started = time.monotonic()
+    merger = FetchMerger(keywords)
+    
+    def fetch_and_merge(keyword: str) -> None:
+        merger.add_page(keyword, fetch_posts(keyword))
     
+    fetch_keywords_concurrently(fetch_and_merge, keywords, max_workers)
+    all_posts = merger.unique_posts()
+    
+    print(f"[BlueSky] Keyword sweep took {time.monotonic() - started:.1f}s")
+    merger.print_report()
+    last_fetch_report = merger.report()
     print(f"[BlueSky] Total posts fetched: {len(all_posts)}")
     return all_posts
 
@@ -145,24 +324,52 @@ def filter_recent_posts(posts: List[Dict], seconds: int) -> List[Dict]:
     return recent_posts
 
 
-def fetch_posts_since_timestamp(keyword: str, since: datetime, max_posts: int = 200) -> List[Dict]:
+def fetch_posts_since_timestamp(
+    keyword: str,
+    since: datetime,
+    max_posts: int = 200,
+    on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+    state: Optional[FetchState] = None,
+) -> List[Dict]:
     """
     Fetch posts for a keyword, stopping when we reach posts older than 'since'.
     This is more efficient than fetching all posts and filtering.
     
+    When `state` holds a high-water mark for the keyword, fetching stops at
+    that exact post instead of at `since`, and the newest post seen is staged
+    as the next mark once the fetch reached the old post, ran out of results
+    or hit `max_posts`. A capped fetch skips the posts between the oldest one
+    fetched and the old mark (logged and counted in
+    bluesky_fetch_capped_total); keeping the old mark instead would cap
+    every later cycle the same way. After an error the mark stays put and
+    the next cycle re-fetches the window.
+    
     Args:
         keyword: Search term
-        since: Only fetch posts newer than this timestamp
+        since: Only fetch posts newer than this timestamp (used when the
+            keyword has no high-water mark yet)
         max_posts: Safety limit to prevent infinite fetching
+        on_page: Called as on_page(keyword, posts) for every page; when set,
+            pages are handed off instead of accumulated
+        state: Persistent per-keyword high-water marks
         
     Returns:
-        List of post dictionaries newer than 'since'
+        List of post dictionaries newer than 'since' (empty when on_page is set)
     """
     all_posts = []
+    fetched = 0
     cursor = None
     found_old_post = False
+    exhausted = False
+    newest = None
+    oldest_kept = None
+    started = time.perf_counter()
     
-    while not found_old_post and len(all_posts) < max_posts:
+    mark = state.high_water_mark(keyword) if state is not None else None
+    if mark is not None:
+        since = mark["time"]
+    
+    while not found_old_post and fetched < max_posts:
         params = {
             "q": keyword,
             "limit": 100,
@@ -174,16 +381,17 @@ def fetch_posts_since_timestamp(keyword: str, since: datetime, max_posts: int =
             params["cursor"] = cursor
         
         try:
-            response = requests.get(BLUESKY_API_URL, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            response = _search(params)
+            data = jsonio.loads(response.content)
 
             posts = data.get("posts", [])
 
             if not posts:
+                exhausted = True
                 break
             
             # Check each post's timestamp
+            page_posts = []
             for post in posts:
                 created_at = post.get("createdAt") or post.get("indexedAt") or post.get("record", {}).get("createdAt")
                 
@@ -192,8 +400,17 @@ def fetch_posts_since_timestamp(keyword: str, since: datetime, max_posts: int =
                     try:
                         post_time = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
                         
+                        if mark is not None and post.get("uri") == mark["uri"]:
+                            # Reached the newest post from the previous cycle
+                            found_old_post = True
+                            break
+                        
+                        if newest is None:
+                            newest = (created_at, post.get("uri"))
+                        
                         if post_time >= since:
-                            all_posts.append(post)
+                            page_posts.append(post)
+                            oldest_kept = created_at
                         else:
                             # Found a post older than our cutoff, stop fetching
                             found_old_post = True
@@ -201,53 +418,416 @@ def fetch_posts_since_timestamp(keyword: str, since: datetime, max_posts: int =
                     except (ValueError, AttributeError):
                         continue
             
+            fetched += len(page_posts)
+            if on_page is not None:
+                on_page(keyword, page_posts)
+            else:
+                all_posts.extend(page_posts)
+            
             # Get cursor for next page
             cursor = data.get("cursor")
             if not cursor:
+                exhausted = True
                 break
-            
-            # Rate limiting
-            if not found_old_post and cursor:
-                time.sleep(0.5)
                 
+        except _FetchCancelled:
+            raise
         except Exception as e:
             print(f"[BlueSky] Error in timestamp-based fetch for '{keyword}': {e}")
             break
     
-    if all_posts:
-        print(f"[BlueSky] '{keyword}': {len(all_posts)} posts since {since.isoformat()}")
+    capped = not (found_old_post or exhausted) and fetched >= max_posts
+    if capped:
+        metrics.inc("bluesky_fetch_capped_total", keyword=keyword)
+        print(f"[BlueSky] ⚠️  '{keyword}': stopped at {max_posts} posts, skipping posts between "
+              f"{since.isoformat()} and {oldest_kept}")
+    
+    if state is not None and (found_old_post or exhausted or capped) and newest is not None:
+        state.advance(keyword, *newest)
+    
+    metrics.observe("bluesky_fetch_keyword_seconds", time.perf_counter() - started, keyword=keyword)
+    
+    if fetched:
+        print(f"[BlueSky] '{keyword}': {fetched} posts since {since.isoformat()}")
     
     return all_posts
 
 
-def fetch_all_since_timestamp(keywords: List[str], since: datetime) -> List[Dict]:
+def fetch_all_since_timestamp(
+    keywords: List[str],
+    since: datetime,
+    max_workers: int = None,
+    state: Optional[FetchState] = None,
+) -> List[Dict]:
     """
     Fetch posts for all keywords since a specific timestamp.
     More efficient than fetching max posts and filtering.
     
+    Keywords are fetched concurrently by a bounded worker pool that
+    shares one token-bucket rate limiter.
+    
     Args:
         keywords: List of search terms
-        since: Only fetch posts newer than this timestamp
+        since: Only fetch posts newer than this timestamp (for keywords
+            without a high-water mark in `state`)
+        max_workers: Concurrent keyword fetches (uses FETCH_WORKERS if None)
+        state: Per-keyword high-water marks; call state.commit() once the
+            fetched posts are stored
         
     Returns:
-        Combined list of all posts
+        Unique posts (by URI) across all keywords, each with "matched_keywords"
     """
+    global last_fetch_report
+    
     print(f"[BlueSky] Fetching posts since {since.isoformat()}...")
     print(f"[BlueSky] Fetching posts for {len(keywords)} keywords...")
     
-    all_posts = []
-    for i, keyword in enumerate(keywords, 1):
-        posts = fetch_posts_since_timestamp(keyword, since)
-        all_posts.extend(posts)
-        
-        # Rate limiting between keywords
-        if i < len(keywords):
-            time.sleep(1.5)
+    started = time.monotonic()
+    merger = FetchMerger(keywords)
+    fetch_keywords_concurrently(
+        lambda keyword: fetch_posts_since_timestamp(keyword, since, on_page=merger.add_page, state=state),
+        keywords,
+        max_workers,
+    )
+    all_posts = merger.unique_posts()
     
+    print(f"[BlueSky] Keyword sweep took {time.monotonic() - started:.1f}s")
+    merger.print_report()
+    last_fetch_report = merger.report()
     print(f"[BlueSky] Total posts fetched: {len(all_posts)}")
     return all_posts
 
 
+class _FetchCancelled(Exception):
+    """Raised inside fetch workers once the stream consumer has gone away"""
+
+
+def stream_all_since_timestamp(
+    keywords: List[str],
+    since: datetime,
+    max_workers: int = None,
+    state: Optional[FetchState] = None,
+    max_pages: int = None,
+) -> Iterator[List[Post]]:
+    """
+    Streaming variant of fetch_all_since_timestamp.
+    
+    Keyword fetches run in background workers; every page is merged by URI
+    on arrival and its not-yet-seen posts are yielded right away, so the
+    caller can process early pages while later keywords are still
+    downloading. Posts are reduced to `Post` records as they arrive. At most
+    `max_pages` pages are buffered; when the caller falls behind, the fetch
+    workers block.
+    
+    Args:
+        keywords: List of search terms
+        since: Only fetch posts newer than this timestamp (for keywords
+            without a high-water mark in `state`)
+        max_workers: Concurrent keyword fetches (uses FETCH_WORKERS if None)
+        state: Per-keyword high-water marks; call state.commit() once the
+            streamed posts are stored
+        max_pages: Page buffer size (uses FETCH_QUEUE_PAGES if None)
+        
+    Yields:
+        Lists of new unique posts (matched_keywords filled in)
+    """
+    global last_fetch_report
+    
+    if max_pages is None:
+        max_pages = settings.FETCH_QUEUE_PAGES
+    
+    print(f"[BlueSky] Streaming posts since {since.isoformat()} for {len(keywords)} keywords...")
+    
+    started = time.monotonic()
+    merger = FetchMerger(keywords, keep_posts=False)
+    pages: "queue.Queue" = queue.Queue(maxsize=max(1, max_pages))
+    stop = threading.Event()
+    done = object()
+    errors = []
+    
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise _FetchCancelled()
+    
+    def on_page(keyword: str, posts: List[Dict]) -> None:
+        fresh = merger.add_page(keyword, posts)
+        if fresh:
+            # Reduce to Post records here so raw payloads are freed at once
+            put([Post.from_api(post) for post in fresh])
+    
+    def produce() -> None:
+        try:
+            fetch_keywords_concurrently(
+                lambda keyword: fetch_posts_since_timestamp(keyword, since, on_page=on_page, state=state),
+                keywords,
+                max_workers,
+            )
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                put(done)
+            except _FetchCancelled:
+                pass
+    
+    producer = threading.Thread(target=produce, name="bsky-stream", daemon=True)
+    producer.start()
+    
+    total = 0
+    try:
+        while True:
+            page = pages.get()
+            if page is done:
+                break
+            total += len(page)
+            yield page
+    finally:
+        # Consumer finished or bailed out: unblock and stop the fetch workers
+        stop.set()
+    
+    if errors:
+        raise errors[0]
+    
+    print(f"[BlueSky] Keyword sweep took {time.monotonic() - started:.1f}s")
+    merger.print_report()
+    last_fetch_report = merger.report()
+    print(f"[BlueSky] Total posts streamed: {total}")
+
+
+class JetstreamConsumer:
+    """
+    Realtime source: new posts from a Jetstream WebSocket, matched locally.
+
+    A background reader receives every app.bsky.feed.post create event,
+    runs the text through one compiled MultiPatternMatcher over all
+    keywords and queues the matches as `Post` records. `batches()` groups
+    them into micro-batches of at most `batch_posts` posts or
+    `batch_seconds` seconds, so commission posts reach the pipeline
+    seconds after they are written instead of at the next search sweep.
+
+    Every event carries a time_us cursor. `commit()` persists the cursor of
+    the last batch handed out, and a restart resumes from it, so posts
+    written while the process was down are replayed rather than lost.
+    When nothing matches for a while the cursor still moves forward to the
+    newest event read, so a restart after a quiet stretch does not replay
+    it. Frames that cannot be decoded or are not event objects are logged,
+    counted in `stats["bad_events"]` and skipped; a reader thread that dies
+    anyway is restarted by `batches()`.
+    """
+
+    def __init__(
+        self,
+        keywords: Sequence[str],
+        url: str = None,
+        cursor_file: str = None,
+        batch_seconds: float = None,
+        batch_posts: int = None,
+        langs: Sequence[str] = ("en",),
+    ):
+        """
+        Args:
+            keywords: Phrases to match (case-insensitive substrings)
+            url: Jetstream subscribe endpoint (uses JETSTREAM_URL if None)
+            cursor_file: Where the resume cursor is kept (uses JETSTREAM_CURSOR_FILE if None)
+            batch_seconds: Max wait before a non-empty batch is handed out
+            batch_posts: Max posts per batch
+            langs: Language prefixes to keep; posts without a language tag are kept too
+        """
+        self.url = url or settings.JETSTREAM_URL
+        self.cursor_file = cursor_file or settings.JETSTREAM_CURSOR_FILE
+        self.batch_seconds = settings.JETSTREAM_BATCH_SECONDS if batch_seconds is None else batch_seconds
+        self.batch_posts = max(1, batch_posts or settings.JETSTREAM_BATCH_POSTS)
+        self.langs = tuple(lang.lower() for lang in langs)
+        self.matcher = MultiPatternMatcher({"keywords": keywords})
+        self._keyword_names = {keyword.lower(): keyword for keyword in keywords}
+        self.stats = {"events": 0, "posts": 0, "matched": 0, "reconnects": 0, "bad_events": 0, "restarts": 0}
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, settings.FETCH_QUEUE_PAGES * self.batch_posts))
+        self._stop = threading.Event()
+        self._reader: Optional[threading.Thread] = None
+        self._ws: Optional[WebSocket] = None
+        self._cursor = self._load_cursor()
+        self._last_seen = self._cursor
+        self._pending_cursor: Optional[int] = None
+
+    def _load_cursor(self) -> Optional[int]:
+        if not os.path.exists(self.cursor_file):
+            return None
+        try:
+            data = jsonio.read_file(self.cursor_file) or {}
+            return int(data["time_us"])
+        except (OSError, jsonio.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            print(f"[Jetstream] ❌ Could not read {self.cursor_file}: {e}, starting from live")
+            return None
+
+    def commit(self) -> None:
+        """Persist the cursor of the last batch handed out (call once it is stored)"""
+        if self._pending_cursor is None or self._pending_cursor == self._cursor:
+            return
+        try:
+            jsonio.write_file(self.cursor_file, {"time_us": self._pending_cursor})
+            self._cursor = self._pending_cursor
+        except Exception as e:
+            print(f"[Jetstream] ❌ Error saving cursor: {e}")
+
+    def _subscribe_url(self) -> str:
+        params = {"wantedCollections": POST_COLLECTION}
+        if self._last_seen is not None:
+            params["cursor"] = max(0, self._last_seen - int(JETSTREAM_REWIND_SECONDS * 1_000_000))
+        separator = "&" if "?" in self.url else "?"
+        return f"{self.url}{separator}{urlencode(params)}"
+
+    def _wanted_lang(self, langs) -> bool:
+        if not self.langs or not langs:
+            return True
+        return any(str(lang).lower().startswith(self.langs) for lang in langs)
+
+    def match_event(self, event: Dict) -> Optional[Post]:
+        """Post for a create event whose text contains a keyword, else None"""
+        if event.get("kind") != "commit":
+            return None
+        commit = event.get("commit") or {}
+        if commit.get("operation") != "create" or commit.get("collection") != POST_COLLECTION:
+            return None
+        self.stats["posts"] += 1
+
+        record = commit.get("record") or {}
+        if not self._wanted_lang(record.get("langs")):
+            return None
+        hits = self.matcher.scan(record.get("text") or "")["keywords"]
+        if not hits:
+            return None
+
+        self.stats["matched"] += 1
+        post = Post.from_jetstream(event)
+        post.matched_keywords = sorted(self._keyword_names.get(hit, hit) for hit in hits)
+        return post
+
+    def _put(self, item) -> None:
+        # Blocks while the pipeline is behind; Jetstream buffers for us meanwhile
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _handle_frame(self, frame) -> None:
+        """Match one received frame; a bad frame is logged and skipped"""
+        self.stats["events"] += 1
+        try:
+            event = jsonio.loads(frame)
+            if not isinstance(event, dict):
+                raise ValueError(f"expected an event object, got {type(event).__name__}")
+            time_us = event.get("time_us")
+            post = self.match_event(event)
+        except Exception as e:
+            self.stats["bad_events"] += 1
+            print(f"[Jetstream] ⚠️  Skipping bad event: {e}")
+            return
+        if post is not None:
+            self._put((post, time_us))
+        if isinstance(time_us, int) and time_us:
+            self._last_seen = time_us
+
+    def _start_reader(self) -> None:
+        self._reader = threading.Thread(target=self._read_loop, name="jetstream", daemon=True)
+        self._reader.start()
+
+    def _idle_commit(self) -> None:
+        """Move the cursor to the newest event read when no matched post is outstanding"""
+        # The last batch must be committed by the caller first (a failed one is replayed)
+        if self._pending_cursor is not None and self._pending_cursor != self._cursor:
+            return
+        # Read before checking the queue: every post up to `seen` was queued before it was set
+        seen = self._last_seen
+        if seen and seen > (self._cursor or 0) and self._queue.empty():
+            self._pending_cursor = seen
+            self.commit()
+
+    def _read_loop(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                ws = WebSocket.connect(self._subscribe_url(), timeout=30.0)
+            except (OSError, WebSocketClosed) as e:
+                print(f"[Jetstream] ❌ Connect failed: {e}, retrying in {backoff:.0f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+
+            self._ws = ws
+            backoff = 1.0
+            print(f"[Jetstream] Connected to {self.url}"
+                  + (f" (resuming from {self._last_seen})" if self._last_seen else ""))
+            try:
+                while not self._stop.is_set():
+                    self._handle_frame(ws.recv_bytes())
+            except (OSError, WebSocketClosed) as e:
+                if not self._stop.is_set():
+                    self.stats["reconnects"] += 1
+                    print(f"[Jetstream] ⚠️  Connection lost: {e}, reconnecting")
+            finally:
+                ws.close()
+                self._ws = None
+
+    def batches(self) -> Iterator[List[Post]]:
+        """
+        Connect and yield micro-batches of matched posts until `stop()`.
+
+        Yields:
+            Non-empty lists of posts (matched_keywords filled in)
+        """
+        self._stop.clear()
+        self._start_reader()
+        last_idle_commit = time.monotonic()
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    post, time_us = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    if not self._reader.is_alive() and not self._stop.is_set():
+                        self.stats["restarts"] += 1
+                        print("[Jetstream] ⚠️  Reader thread died, restarting it")
+                        self._start_reader()
+                    if time.monotonic() - last_idle_commit >= JETSTREAM_IDLE_COMMIT_SECONDS:
+                        self._idle_commit()
+                        last_idle_commit = time.monotonic()
+                    continue
+                batch = [post]
+                deadline = time.monotonic() + self.batch_seconds
+                while len(batch) < self.batch_posts:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        post, time_us = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(post)
+                # Past the last match when nothing newer is queued (see _idle_commit)
+                seen = self._last_seen
+                if seen and seen > (time_us or 0) and self._queue.empty():
+                    time_us = seen
+                self._pending_cursor = time_us
+                yield batch
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Close the connection and end `batches()`"""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+
+
 def at_uri_to_web_url(at_uri: str, username: str) -> str:
     """
     Convert AT Protocol URI to web URL.
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from . import jsonio
+from .config import settings
+
+
+def make_cache_key(content_hash: str, prompt_version: str, model: str) -> str:
+    """Cache key: a verdict is only reusable for the same text, prompt and model"""
+    return f"{model}:{prompt_version}:{content_hash}"
+
+
+class ClassificationCache:
+    """
+    Persistent LRU cache of AI classification results.
+
+    Entries expire after `ttl_seconds`; once `max_entries` is exceeded the
+    least recently used entries are evicted. The file is loaded lazily on
+    first access and written back with `save()` (atomic replace). Arguments
+    left as None are read from settings at that first access too, so a
+    module-level instance costs nothing at import.
+    """
+
+    def __init__(self, path: str = None, ttl_seconds: float = None, max_entries: int = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        # Caller holds the lock
+        self._loaded = True
+        if self.path is None:
+            self.path = settings.CLASSIFICATION_CACHE_FILE
+        if self.ttl_seconds is None:
+            self.ttl_seconds = settings.CLASSIFICATION_CACHE_TTL_HOURS * 3600  # default 7 days
+        if self.max_entries is None:
+            self.max_entries = settings.CLASSIFICATION_CACHE_MAX_ENTRIES
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            data = jsonio.read_file(self.path)
+        except (jsonio.JSONDecodeError, OSError) as e:
+            print(f"[Cache] ❌ Could not read {self.path}: {e}, starting empty")
+            return
+
+        if not isinstance(data, dict):
+            print("[Cache] Warning: Invalid cache structure, starting empty")
+            return
+
+        cutoff = time.time() - self.ttl_seconds
+        # File is written oldest → newest, which is the LRU order
+        for key, entry in data.items():
+            if isinstance(entry, dict) and entry.get("stored_at", 0) >= cutoff:
+                self._entries[key] = entry
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._dirty = True
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Key from make_cache_key()
+
+        Returns:
+            Copy of the cached result, or None on miss/expiry
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.time() - entry.get("stored_at", 0) > self.ttl_seconds:
+                del self._entries[key]
+                self._dirty = True
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry["result"])
+
+    def put(self, key: str, result: Dict) -> None:
+        """Store a classification result"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            self._entries[key] = {"stored_at": time.time(), "result": dict(result)}
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self._evict()
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed (atomic replace)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+
+        try:
+            jsonio.write_file(self.path, snapshot, indent=False)
+
+            print(f"[Cache] ✅ Saved {len(snapshot)} cached classifications")
+
+        except Exception as e:
+            print(f"[Cache] ❌ Error saving cache: {e}")
+
+    def stats(self, reset: bool = False) -> Dict[str, int]:
+        """
+        Hit/miss counters since the last reset.
+
+        Args:
+            reset: Zero the counters after reading (e.g. once per cycle)
+        """
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+            if reset:
+                self.hits = 0
+                self.misses = 0
+        return stats
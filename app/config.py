@@ -0,0 +1,159 @@
+"""
+Application settings, read from the environment on first use.
+
+Importing this module (or any module that uses it) does no I/O: `.env` is
+loaded once, the first time any setting is read, and each value is parsed
+and cached on first access. Modules read settings at call time through the
+shared `settings` object, e.g. `settings.FETCH_WORKERS`, so the app can be
+imported without credentials and benchmarks can set variables before the
+first call instead of before the first import.
+"""
+import os
+import threading
+from typing import Any, Callable, List, Optional, Union
+import dotenv
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _bool(value: str) -> bool:
+    return value.strip().lower() == "true"
+
+
+def _lower(value: str) -> str:
+    return value.strip().lower()
+
+
+def _list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class _Env:
+    """
+    One environment-backed setting.
+
+    A non-data descriptor: the parsed value is stored in the instance
+    __dict__ on first access, so later reads are plain attribute lookups.
+    `default` may be a callable taking the settings object, for defaults
+    derived from other settings.
+    """
+
+    def __init__(self, default: Union[Any, Callable[["Settings"], Any]] = None,
+                 parse: Callable[[str], Any] = str, env: Optional[str] = None):
+        self.default = default
+        self.parse = parse
+        self.env = env
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+        if self.env is None:
+            self.env = name
+
+    def __get__(self, settings: "Settings", owner=None):
+        if settings is None:
+            return self
+        settings.load_env()
+        raw = os.getenv(self.env)
+        if raw is None or raw.strip() == "":
+            value = self.default(settings) if callable(self.default) else self.default
+        else:
+            try:
+                value = self.parse(raw)
+            except ValueError:
+                raise ValueError(f"[Config] Invalid value for {self.env}: {raw!r}") from None
+        settings.__dict__[self.name] = value
+        return value
+
+
+class Settings:
+    """Lazily loaded configuration shared by every module"""
+
+    # BlueSky searchPosts
+    BLUESKY_API_URL = _Env("https://api.bsky.app/xrpc/app.bsky.feed.searchPosts")
+    MAX_POSTS_PER_KEYWORD = _Env(100, int)
+    FETCH_WORKERS = _Env(8, int)
+    # Shared searchPosts budget (public AppView allows ~3000 requests / 5 min per IP)
+    BLUESKY_RATE_LIMIT = _Env(8.0, float)
+    BLUESKY_RATE_BURST = _Env(10.0, float)
+    # Pages buffered between fetch workers and the pipeline
+    FETCH_QUEUE_PAGES = _Env(32, int)
+    FETCH_STATE_FILE = _Env("data/fetch_state.json")
+
+    # Realtime ingestion (Jetstream)
+    INGEST_MODE = _Env("search", _lower)
+    JETSTREAM_URL = _Env("wss://jetstream2.us-east.bsky.network/subscribe")
+    JETSTREAM_CURSOR_FILE = _Env("data/jetstream_cursor.json")
+    JETSTREAM_BATCH_SECONDS = _Env(2.0, float)
+    JETSTREAM_BATCH_POSTS = _Env(50, int)
+
+    # Scheduling
+    FETCH_INTERVAL_HOURS = _Env(2, int)
+    SCHEDULER_MIN_INTERVAL_MINUTES = _Env(15.0, float)
+    SCHEDULER_MAX_INTERVAL_HOURS = _Env(lambda s: 2.0 * s.FETCH_INTERVAL_HOURS, float)
+    SCHEDULER_BUSY_POSTS = _Env(10, int)
+
+    # Groq classification
+    GROQ_API_KEYS = _Env(lambda s: [], _list)
+    GROQ_MODEL = _Env("llama-3.1-8b-instant")
+    GROQ_KEY_CONCURRENCY = _Env(2, int)
+    GROQ_KEY_MAX_WAIT_SECONDS = _Env(60.0, float)
+    GROQ_MAX_RETRIES = _Env(0, int)
+    CLASSIFY_BATCH_SIZE = _Env(8, int)
+    API_USAGE_FILE = _Env(os.path.join(APP_DIR, "api_usage.json"))
+    API_RESET_FILE = _Env(os.path.join(APP_DIR, "last_reset.txt"))
+    USAGE_FLUSH_SECONDS = _Env(30.0, float)
+    CLASSIFICATION_CACHE_FILE = _Env("data/classification_cache.json")
+    CLASSIFICATION_CACHE_TTL_HOURS = _Env(168, int)
+    CLASSIFICATION_CACHE_MAX_ENTRIES = _Env(20000, int)
+
+    # Local pre-classifier
+    PRECLASSIFIER_ENABLED = _Env(True, _bool)
+    PRECLASSIFIER_CONFIDENCE = _Env(0.95, float)
+    PRECLASSIFIER_MODEL_FILE = _Env("data/preclassifier.npz")
+    PRECLASSIFIER_HISTORY_FILE = _Env("data/labeled_history.jsonl")
+
+    # Storage
+    DATA_FILE = _Env("data/posts.json")
+    LEGACY_DATA_FILE = _Env(lambda s: os.path.splitext(s.DATA_FILE)[0] + ".json")
+    STORAGE_BACKEND = _Env(
+        lambda s: "sqlite" if s.DATA_FILE.endswith((".db", ".sqlite", ".sqlite3")) else "json", _lower
+    )
+    JSONL_COMPACT_RATIO = _Env(0.5, float)
+    JSONL_COMPACT_MIN_LINES = _Env(1000, int)
+    JSON_BACKEND = _Env("auto", _lower)
+    JSON_COMPACT = _Env(False, _bool)
+
+    # HTTP transport
+    HTTP_POOL_CONNECTIONS = _Env(4, int)
+    HTTP_POOL_MAXSIZE = _Env(16, int)
+    HTTP_DEFAULT_TIMEOUT = _Env(30.0, float)
+    # Per-host timeouts, e.g. "api.bsky.app=30,discord.com=10"
+    HTTP_TIMEOUTS = _Env("api.bsky.app=30,discord.com=10")
+
+    # Notifications and metrics
+    DISCORD_WEBHOOK_URL = _Env(None)
+    # Undelivered webhook messages, resent after a restart (empty disables)
+    DISCORD_OUTBOX_FILE = _Env("data/discord_outbox.json")
+    METRICS_FILE = _Env("data/metrics.jsonl")
+
+    def __init__(self):
+        self._env_loaded = False
+        self._lock = threading.Lock()
+
+    def load_env(self) -> None:
+        """Read .env into os.environ once (existing variables win)"""
+        if self._env_loaded:
+            return
+        with self._lock:
+            if not self._env_loaded:
+                dotenv.load_dotenv()
+                self._env_loaded = True
+
+    def reload(self) -> None:
+        """Forget every cached value so the next reads see the current environment"""
+        for name, value in vars(type(self)).items():
+            if isinstance(value, _Env):
+                self.__dict__.pop(name, None)
+
+
+settings = Settings()
@@ -1,88 +1,425 @@
-import requests
-from typing import List, Dict
-# from .config import DISCORD_WEBHOOK_URL
+import atexit
+import itertools
 import os
-import dotenv
+import threading
 import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from . import jsonio, metrics, transport
+from .config import settings
+from .models import Post
 
-# Load environment variables
-dotenv.load_dotenv()
+# Discord message limits (lengths in UTF-16 code units, as Discord counts them)
+CONTENT_LIMIT = 2000
+MAX_EMBEDS = 10                 # embeds per message
+MAX_FIELDS = 25                 # fields per embed
+EMBED_TOTAL_LIMIT = 6000        # all embed text in one message
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
 
-DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
+EMBED_COLOR = 0x5865F2
+
+# Longest pause between retries while the webhook keeps failing
+MAX_BACKOFF_SECONDS = 300.0
 
 def sanitize(text: str) -> str:
     """Remove Discord mention triggers"""
     return text.replace("@everyone", "@\u200beveryone").replace("@here", "@\u200bhere")
 
-def send_notification(post: Dict):
+def _length(text: Optional[str]) -> int:
+    """Length as Discord counts it (UTF-16 code units, so most emoji count twice)"""
+    return len(text.encode("utf-16-le")) // 2 if text else 0
+
+def _truncate(text: str, limit: int) -> str:
+    if _length(text) <= limit:
+        return text
+    # Cut on a code-unit boundary; a split surrogate pair is dropped by the decoder
+    return text.encode("utf-16-le")[:(limit - 1) * 2].decode("utf-16-le", errors="ignore") + "…"
+
+def _embed_length(embed: Dict) -> int:
+    """Characters an embed counts towards EMBED_TOTAL_LIMIT"""
+    return (_length(embed.get("title")) + _length(embed.get("description"))
+            + _length((embed.get("footer") or {}).get("text"))
+            + _length((embed.get("author") or {}).get("name"))
+            + sum(_length(f.get("name")) + _length(f.get("value")) for f in embed.get("fields") or ()))
+
+def _measure(payload: Dict) -> Optional[Tuple[int, int, int]]:
+    """(content length, embeds, embed characters), or None if the payload must go alone"""
+    if not payload or set(payload) - {"content", "embeds"}:
+        return None
+    embeds = payload.get("embeds") or []
+    return _length(payload.get("content")), len(embeds), sum(_embed_length(e) for e in embeds)
+
+def _merge_field_embeds(embeds: List[Dict]) -> List[Dict]:
+    """Fold consecutive field-only embeds of one colour into embeds of up to MAX_FIELDS fields"""
+    merged: List[Dict] = []
+    for embed in embeds:
+        last = merged[-1] if merged else None
+        if (last is not None and set(embed) <= {"color", "fields"} and set(last) <= {"color", "fields"}
+                and last.get("color") == embed.get("color")
+                and len(last.get("fields") or ()) + len(embed.get("fields") or ()) <= MAX_FIELDS):
+            merged[-1] = {**last, "fields": list(last.get("fields") or ()) + list(embed.get("fields") or ())}
+        else:
+            merged.append(embed)
+    return merged
+
+def _seconds(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _post_webhook(url: str, payload: dict):
+    """POST one message to the webhook and return the response (no status check)"""
+    started = time.perf_counter()
+    try:
+        return transport.post(url, json=payload)
+    finally:
+        metrics.observe("discord_request_seconds", time.perf_counter() - started)
+
+
+class DiscordNotifier:
+    """
+    Background webhook sender fed by a persistent outbox.
+
+    `enqueue()` only appends to the outbox and returns, so a slow or
+    rate-limited webhook never holds up a pipeline cycle. A daemon worker
+    sends messages in order, coalescing consecutive queued messages while
+    the merged one stays within Discord's content and embed limits
+    (field-only embeds are folded together). It waits out 429 answers
+    (`retry_after`) and an exhausted X-RateLimit-Remaining bucket, and
+    backs off exponentially on network / 5xx errors; other 4xx answers
+    drop the message. The outbox is written to `outbox_file` (atomic
+    replace) whenever it changes and at exit, and unsent messages are
+    resent after a restart.
+    """
+
+    def __init__(self, url: str = None, outbox_file: str = None):
+        self.url = settings.DISCORD_WEBHOOK_URL if url is None else url
+        self.outbox_file = settings.DISCORD_OUTBOX_FILE if outbox_file is None else outbox_file
+        self._outbox: Deque[Dict] = deque()
+        self._cond = threading.Condition()
+        self._loaded = False
+        self._dirty = False
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    # --- Producer side ---
+
+    def enqueue(self, payloads: List[Dict]) -> None:
+        """Queue webhook payloads for delivery (returns immediately)"""
+        if not payloads:
+            return
+        if not self.url:
+            print(f"[Discord] DISCORD_WEBHOOK_URL not set, dropping {len(payloads)} message(s)")
+            return
+        now = time.time()
+        with self._cond:
+            self._outbox.extend({"payload": payload, "queued_at": now} for payload in payloads)
+            self._dirty = True
+            self._cond.notify_all()
+        self.start()
+
+    def pending(self) -> int:
+        """Messages queued but not yet delivered"""
+        with self._cond:
+            return len(self._outbox)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until the outbox is empty.
+
+        Returns:
+            True if everything was delivered (or dropped) before `timeout`
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # A starting worker may still be reading the previous run's outbox
+            while self._outbox or (self._worker is not None and not self._loaded):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self) -> None:
+        """Stop the worker and persist whatever is still queued"""
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+        self.save()
+
+    # --- Persistence ---
+
+    def _load(self) -> None:
+        if not self.outbox_file or not os.path.exists(self.outbox_file):
+            return
+        try:
+            saved = jsonio.read_file(self.outbox_file) or []
+        except (jsonio.JSONDecodeError, OSError) as e:
+            print(f"[Discord] ❌ Could not read {self.outbox_file}: {e}, starting empty")
+            return
+        saved = [entry for entry in saved if isinstance(entry, dict) and isinstance(entry.get("payload"), dict)]
+        if saved:
+            # Older than anything queued since start-up
+            with self._cond:
+                self._outbox.extendleft(reversed(saved))
+            print(f"[Discord] 🔁 Resending {len(saved)} message(s) left from a previous run")
+
+    def save(self) -> None:
+        """Write the outbox to disk if it changed (atomic replace)"""
+        if not self.outbox_file:
+            return
+        with self._write_lock:
+            with self._cond:
+                # Never overwrite the previous run's messages before they were read
+                if not self._loaded or not self._dirty:
+                    return
+                snapshot = list(self._outbox)
+                self._dirty = False
+            try:
+                jsonio.write_file(self.outbox_file, snapshot, indent=False)
+            except Exception as e:
+                print(f"[Discord] ❌ Error saving outbox: {e}")
+                with self._cond:
+                    self._dirty = True
+
+    # --- Worker ---
+
+    def start(self) -> None:
+        """Start the worker (resends a previous run's outbox); a no-op without a webhook URL"""
+        if not self.url:
+            return
+        with self._cond:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="discord-notifier", daemon=True)
+            self._worker.start()
+        atexit.register(self.save)
+
+    def _coalesce(self) -> Tuple[int, Dict]:
+        """Leading outbox entries that fit one request, and the merged payload"""
+        # Caller holds the lock
+        first = self._outbox[0]["payload"]
+        totals = _measure(first)
+        if totals is None:
+            return 1, first
+        content_size, _, embed_chars = totals
+        embeds = list(first.get("embeds") or ())
+        payloads = [first]
+        for entry in itertools.islice(self._outbox, 1, None):
+            size = _measure(entry["payload"])
+            if size is None or content_size + 1 + size[0] > CONTENT_LIMIT or embed_chars + size[2] > EMBED_TOTAL_LIMIT:
+                break
+            # Per-post messages are single-field embeds; they share embeds once merged
+            candidate = _merge_field_embeds(embeds + list(entry["payload"].get("embeds") or ()))
+            if len(candidate) > MAX_EMBEDS:
+                break
+            payloads.append(entry["payload"])
+            embeds = candidate
+            content_size += 1 + size[0]
+            embed_chars += size[2]
+        if len(payloads) == 1:
+            return 1, first
+
+        merged: Dict = {}
+        content = "\n".join(p["content"] for p in payloads if p.get("content"))
+        if content:
+            merged["content"] = content
+        if embeds:
+            merged["embeds"] = embeds
+        return len(payloads), merged
+
+    def _send(self, payload: Dict) -> Tuple[str, float]:
+        """
+        One delivery attempt.
+
+        Returns:
+            (outcome, seconds to wait before the next request); outcome is
+            "sent", "rejected" (drop it), "rate_limited" or "error" (retry)
+        """
+        try:
+            response = _post_webhook(self.url, payload)
+        except Exception as e:
+            print(f"[Discord] Error sending notification: {e}")
+            return "error", 0.0
+
+        headers = response.headers
+        if response.status_code == 429:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            retry_after = (_seconds(body.get("retry_after") if isinstance(body, dict) else None)
+                           or _seconds(headers.get("Retry-After"))
+                           or _seconds(headers.get("X-RateLimit-Reset-After"))
+                           or 1.0)
+            print(f"[Discord] ⏳ Rate limited, retrying in {retry_after:.2f}s")
+            return "rate_limited", retry_after
+        if response.status_code >= 500:
+            print(f"[Discord] Webhook returned {response.status_code}, will retry")
+            return "error", 0.0
+        if response.status_code >= 400:
+            print(f"[Discord] ❌ Webhook rejected message ({response.status_code}): {response.text[:200]}")
+            return "rejected", 0.0
+
+        # Bucket drained: wait for it to refill instead of earning a 429
+        wait = 0.0
+        if headers.get("X-RateLimit-Remaining") == "0":
+            wait = _seconds(headers.get("X-RateLimit-Reset-After")) or 0.0
+        return "sent", wait
+
+    def _run(self) -> None:
+        self._load()
+        with self._cond:
+            self._loaded = True
+            self._cond.notify_all()
+        backoff = 1.0
+
+        while not self._stopped.is_set():
+            with self._cond:
+                while not self._outbox and not self._stopped.is_set():
+                    self._cond.wait()
+                if self._stopped.is_set():
+                    break
+                count, payload = self._coalesce()
+            self.save()
+
+            outcome, wait = self._send(payload)
+            metrics.inc("discord_messages_total", outcome=outcome)
+
+            if outcome in ("sent", "rejected"):
+                backoff = 1.0
+                now = time.time()
+                with self._cond:
+                    for _ in range(count):
+                        entry = self._outbox.popleft()
+                        if outcome == "sent":
+                            metrics.observe("discord_queue_seconds", max(0.0, now - entry.get("queued_at", now)))
+                    self._dirty = True
+                    self._cond.notify_all()
+                self.save()
+            elif outcome == "error":
+                wait = backoff
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+            if wait > 0:
+                self._stopped.wait(wait)
+
+
+_notifier: Optional[DiscordNotifier] = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier() -> DiscordNotifier:
+    """The shared notifier (its worker starts with the first message)"""
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                _notifier = DiscordNotifier()
+    return _notifier
+
+def send_notification(post: Post):
     """Send a single post notification (legacy/fallback)"""
     payload = {
         "content": sanitize(
             f"🎨 **New Commission Found**\n"
-            f"👤 {post['author']}\n"
-            f"📍 {post.get('location', 'Unknown')}\n"
-            f"🔗 {post.get('web_url', post['url'])}\n\n"
-            f"{post['text'][:900]}"
+            f"👤 {post.author}\n"
+            f"📍 {post.location or 'Unknown'}\n"
+            f"🔗 {post.web_url or post.url}\n\n"
+            f"{post.text[:900]}"
         )
     }
-    try:
-        response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
-        response.raise_for_status()
-    except Exception as e:
-        print("[Discord] Error sending notification:", e)
+    get_notifier().enqueue([payload])
+
+def _post_field(number: int, post: Post) -> Dict:
+    """One post as an embed field"""
+    confidence = post.ai.confidence if post.ai else 0
+    value = "\n".join((
+        f"🔗 {post.web_url or post.url}",
+        f"📊 Confidence: {confidence:.0%}",
+        f"💬 {sanitize(post.text[:200])}...",
+    ))
+    return {
+        "name": _truncate(sanitize(f"#{number} — {post.author}"), FIELD_NAME_LIMIT),
+        "value": _truncate(value, FIELD_VALUE_LIMIT),
+        "inline": False,
+    }
+
+def pack_posts(posts: List[Post]) -> List[List[Tuple[int, Dict]]]:
+    """
+    Pack posts, in order, into as few webhook messages as the limits allow.
+
+    Each post becomes an embed field; a message holds MAX_EMBEDS embeds of
+    MAX_FIELDS fields, EMBED_TOTAL_LIMIT characters in all. Fields fill the
+    current message until the next one does not fit (next-fit), so every
+    message holds a contiguous run of post numbers and the digest reads in
+    order.
 
-def send_batch_notification(posts: List[Dict]):
+    Returns:
+        Per message, its (post number, field) pairs
     """
-    Send ONE Discord message containing ALL qualified posts from this fetch cycle.
-    Handles Discord's 2000 character limit by splitting into multiple messages if needed.
+    capacity = MAX_EMBEDS * MAX_FIELDS
+    bins: List[List[Tuple[int, Dict]]] = []
+    room = 0
+    for number, post in enumerate(posts, 1):
+        field = _post_field(number, post)
+        size = _length(field["name"]) + _length(field["value"])
+        if not bins or size > room or len(bins[-1]) >= capacity:
+            bins.append([])
+            room = EMBED_TOTAL_LIMIT
+        bins[-1].append((number, field))
+        room -= size
+    return bins
+
+def build_batch_messages(posts: List[Post]) -> List[Dict]:
+    """Webhook payloads for a cycle's qualified posts (see pack_posts)"""
+    packed = pack_posts(posts)
+    header = f"🎨 **Found {len(posts)} New Commission Request(s)**"
+    messages = []
+    for part, items in enumerate(packed, 1):
+        fields = [field for _, field in items]
+        embeds = [{"color": EMBED_COLOR, "fields": fields[start:start + MAX_FIELDS]}
+                  for start in range(0, len(fields), MAX_FIELDS)]
+        content = header if len(packed) == 1 else f"{header} — part {part}/{len(packed)}"
+        messages.append({"content": content, "embeds": embeds})
+    return messages
+
+def notify_qualified(number: int, post: Post) -> None:
+    """
+    Queue one qualified post as soon as its verdict is in.
+
+    Each post is a one-field embed; the worker merges queued posts into
+    full messages (see DiscordNotifier._coalesce), so a busy cycle still
+    sends few requests.
+    """
+    get_notifier().enqueue([{"embeds": [{"color": EMBED_COLOR, "fields": [_post_field(number, post)]}]}])
+
+def send_cycle_summary(qualified: int) -> None:
+    """Queue the end-of-cycle line after the posts sent by notify_qualified()"""
+    if qualified:
+        content = f"🎨 **Found {qualified} New Commission Request(s)** this cycle"
+    else:
+        print("Skipping Discord notification: No new posts found.")
+        content = "🎨 **Commission Scan Complete**\n\n❌ No new commission requests found in this cycle."
+    get_notifier().enqueue([{"content": content}])
+
+def send_batch_notification(posts: List[Post]):
+    """
+    Send all qualified posts from this fetch cycle in as few Discord messages
+    as the embed limits allow (see pack_posts).
+    Messages are queued for the background notifier; this never waits on Discord.
     """
     if not posts:
         print("Skipping Discord notification: No new posts found.")
         payload = {
             "content": "🎨 **Commission Scan Complete**\n\n❌ No new commission requests found in this cycle."
         }
-        try:
-            response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
-            response.raise_for_status()
-        except Exception as e:
-            print("[Discord] Error sending empty batch notification:", e)
+        get_notifier().enqueue([payload])
         return
 
-    
-    # Build the batch message
-    header = f"🎨 **Found {len(posts)} New Commission Request(s)**\n\n"
-    
-    messages = []
-    current_message = header
-    
-    for i, post in enumerate(posts, 1):
-        confidence = post.get("ai", {}).get("confidence", 0)
-        
-        post_block = (
-            f"**#{i}** — {post['author']}\n"
-            f"🔗 {post.get('web_url', post['url'])}\n"
-            f"📊 Confidence: {confidence:.0%}\n"
-            f"💬 {sanitize(post['text'][:200])}...\n"
-            f"{'─' * 40}\n\n"
-        )
-        
-        # Check if adding this post would exceed Discord's 2000 char limit
-        if len(current_message + post_block) > 1900:
-            messages.append(current_message)
-            current_message = post_block
-        else:
-            current_message += post_block
-    
-    # Add the last message
-    if current_message:
-        messages.append(current_message)
-    
-    # Send all messages
-    for msg in messages:
-        payload = {"content": msg}
-        try:
-            response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)    
-            response.raise_for_status()    
-        except Exception as e:
-            print("[Discord] Error sending batch notification:", e)
-                
+    get_notifier().enqueue(build_batch_messages(posts))
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from .config import settings
+
+# Cycles a post that could not be classified is retried before it is dropped
+MAX_RETRY_ATTEMPTS = 3
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+
+
+class FetchState:
+    """
+    Per-keyword high-water marks for incremental searchPosts fetching.
+
+    Stores the newest post timestamp and URI seen for every keyword. New
+    marks are staged with `advance()` while a cycle runs and only written
+    by `commit()` once the cycle's posts are safely stored, so a crash
+    mid-cycle resumes from the last completed cycle. The file (default
+    FETCH_STATE_FILE) is read on first use.
+
+    Posts that were fetched but could not be classified are kept in a retry
+    list (`retry_posts()` / `set_retry()`) and fed into the next cycle, so
+    marks keep advancing even when some verdicts fail.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._marks: Dict[str, Dict[str, str]] = {}
+        self._pending: Dict[str, Dict[str, str]] = {}
+        self._retry: List[Dict] = []
+        self._pending_retry: Optional[List[Dict]] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        # Caller holds the lock
+        self._loaded = True
+        if self.path is None:
+            self.path = settings.FETCH_STATE_FILE
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("marks"), dict):
+                self._marks = data["marks"]
+                self._retry = [entry for entry in data.get("retry") or [] if isinstance(entry, dict)]
+            elif isinstance(data, dict):
+                # Files written before the retry list hold the marks alone
+                self._marks = data
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[FetchState] ❌ Could not read {self.path}: {e}, starting fresh")
+
+    def high_water_mark(self, keyword: str) -> Optional[Dict]:
+        """
+        Committed mark for a keyword.
+
+        Returns:
+            {"time": datetime, "uri": str} or None if the keyword is new
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            mark = self._marks.get(keyword)
+
+        if not mark:
+            return None
+        mark_time = _parse_time(mark.get("indexed_at"))
+        if mark_time is None:
+            return None
+        return {"time": mark_time, "uri": mark.get("uri")}
+
+    def advance(self, keyword: str, indexed_at: str, uri: str) -> None:
+        """Stage a newer mark for `keyword` (applied on commit)"""
+        new_time = _parse_time(indexed_at)
+        if new_time is None:
+            return
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            current = self._pending.get(keyword) or self._marks.get(keyword)
+            if current:
+                current_time = _parse_time(current.get("indexed_at"))
+                if current_time is not None and current_time >= new_time:
+                    return
+            self._pending[keyword] = {"indexed_at": indexed_at, "uri": uri}
+
+    def retry_posts(self) -> List[Dict]:
+        """
+        Posts left unclassified by earlier cycles.
+
+        Returns:
+            [{"post": post record, "attempts": cycles tried so far}, ...]
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return [dict(entry) for entry in self._retry]
+
+    def set_retry(self, entries: List[Dict]) -> None:
+        """
+        Stage the retry list for the next cycle (applied on commit).
+
+        Entries that reached MAX_RETRY_ATTEMPTS are dropped.
+        """
+        kept = [entry for entry in entries if entry.get("attempts", 0) < MAX_RETRY_ATTEMPTS]
+        if len(kept) < len(entries):
+            print(f"[FetchState] ⚠️  Giving up on {len(entries) - len(kept)} post(s) "
+                  f"after {MAX_RETRY_ATTEMPTS} failed classifications")
+        with self._lock:
+            self._pending_retry = kept
+
+    def commit(self) -> None:
+        """Apply staged marks and retry list and persist them (atomic replace)"""
+        with self._lock:
+            if not self._pending and self._pending_retry is None:
+                return
+            if not self._loaded:
+                self._load()
+            self._marks.update(self._pending)
+            count = len(self._pending)
+            self._pending = {}
+            if self._pending_retry is not None:
+                self._retry = self._pending_retry
+                self._pending_retry = None
+            snapshot = {"marks": dict(self._marks), "retry": list(self._retry)}
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_file, self.path)
+            print(f"[FetchState] ✅ Advanced high-water marks for {count} keyword(s)"
+                  + (f", {len(snapshot['retry'])} post(s) to retry" if snapshot["retry"] else ""))
+        except Exception as e:
+            print(f"[FetchState] ❌ Error saving fetch state: {e}")
+
+    def discard(self) -> None:
+        """Drop staged marks and retry list (e.g. after a failed cycle)"""
+        with self._lock:
+            self._pending = {}
+            self._pending_retry = None
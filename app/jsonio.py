@@ -0,0 +1,130 @@
+"""
+JSON encode/decode with an optional fast backend.
+
+Uses orjson or msgspec when installed and falls back to the stdlib json
+module otherwise. Select a backend with JSON_BACKEND (auto, orjson,
+msgspec, stdlib). Decode errors are always raised as json.JSONDecodeError,
+so callers handle every backend the same way.
+
+The backend is picked on the first call, not at import.
+"""
+import json
+import os
+from typing import Any, Optional, Union
+from .config import settings
+
+JSONDecodeError = json.JSONDecodeError
+
+# Selected backend name ("orjson", "msgspec" or "stdlib"), None until first use
+BACKEND: Optional[str] = None
+
+_orjson = None
+_msgspec = None
+_msgspec_error = None
+
+
+def _select_backend() -> None:
+    global BACKEND, _orjson, _msgspec, _msgspec_error
+    requested = settings.JSON_BACKEND
+
+    if requested in ("auto", "orjson"):
+        try:
+            import orjson as _orjson
+        except ImportError:
+            _orjson = None
+
+    if _orjson is None and requested in ("auto", "msgspec"):
+        try:
+            import msgspec
+            _msgspec, _msgspec_error = msgspec.json, msgspec.DecodeError
+        except ImportError:
+            _msgspec = None
+
+    if _orjson is not None:
+        BACKEND = "orjson"
+    elif _msgspec is not None:
+        BACKEND = "msgspec"
+    else:
+        BACKEND = "stdlib"
+        if requested not in ("auto", "stdlib"):
+            print(f"[JSON] {requested} not installed, using stdlib json")
+
+
+def backend() -> str:
+    """Name of the backend in use (selected now if nothing was encoded yet)"""
+    if BACKEND is None:
+        _select_backend()
+    return BACKEND
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Parse a JSON document (str or UTF-8 bytes)"""
+    if BACKEND is None:
+        _select_backend()
+    if _orjson is not None:
+        return _orjson.loads(data)
+    if _msgspec is not None:
+        try:
+            return _msgspec.decode(data)
+        except _msgspec_error as e:
+            raise json.JSONDecodeError(str(e), data if isinstance(data, str) else "", 0) from None
+    if not isinstance(data, str):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, indent: Optional[bool] = None) -> bytes:
+    """
+    Serialize to UTF-8 bytes (non-ASCII characters kept as-is).
+
+    Args:
+        obj: JSON-compatible value
+        indent: Pretty-print with 2-space indentation (defaults to not JSON_COMPACT)
+    """
+    if BACKEND is None:
+        _select_backend()
+    if indent is None:
+        indent = not settings.JSON_COMPACT
+    if _orjson is not None:
+        return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2 if indent else 0)
+    if _msgspec is not None:
+        encoded = _msgspec.encode(obj)
+        return _msgspec.format(encoded, indent=2) if indent else encoded
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False,
+                      separators=None if indent else (",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a str (compact unless `indent`)"""
+    if BACKEND is None:
+        _select_backend()
+    if _orjson is None and _msgspec is None:
+        return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False,
+                          separators=None if indent else (",", ":"))
+    return dumps_bytes(obj, indent=indent).decode("utf-8")
+
+
+def read_file(path: str) -> Any:
+    """
+    Parse a JSON file.
+
+    Returns:
+        Parsed value, or None if the file is empty / whitespace only
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    if not content.strip():
+        return None
+    return loads(content)
+
+
+def write_file(path: str, obj: Any, indent: Optional[bool] = None) -> None:
+    """Write `obj` to `path` atomically (temp file + replace)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(dumps_bytes(obj, indent=indent))
+    os.replace(tmp_file, path)
+
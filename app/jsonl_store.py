@@ -0,0 +1,190 @@
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional
+from . import jsonio
+from .config import settings
+
+# Compaction: rewrite the log once JSONL_COMPACT_RATIO of its lines are dead
+# (expired or tombstoned), but don't bother below JSONL_COMPACT_MIN_LINES
+
+TOMBSTONE_KEY = "_deleted"
+
+
+def _live_key(post: Dict) -> str:
+    """Identity of a post in the log: its URL, or a digest of its contents when it has none"""
+    url = post.get("url")
+    if url:
+        return url
+    return "sha1:" + hashlib.sha1(jsonio.dumps(post).encode("utf-8")).hexdigest()
+
+
+class JsonlStore:
+    """
+    Append-only JSON Lines post log.
+
+    Each cycle appends only new posts, plus a tombstone line for every
+    post the in-memory store dropped (expiry / size limit), with fsync.
+    When dead lines make up more than `compact_ratio` of the file, the
+    live posts are rewritten to a fresh file in a background thread.
+    """
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None,
+                 compact_ratio: float = None, compact_min_lines: int = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_ratio = settings.JSONL_COMPACT_RATIO if compact_ratio is None else compact_ratio
+        self.compact_min_lines = settings.JSONL_COMPACT_MIN_LINES if compact_min_lines is None else compact_min_lines
+        self._live_urls = set()
+        self._line_count = 0
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    # --- Loading ---
+
+    def load(self) -> List[Dict]:
+        """Replay the log into a list of live posts (oldest first)"""
+        with self._lock:
+            if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+                self._migrate()
+
+            posts: Dict[str, Dict] = {}
+            line_count = 0
+
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line_no, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        line_count += 1
+                        try:
+                            record = jsonio.loads(line)
+                        except jsonio.JSONDecodeError:
+                            record = None
+                        if not isinstance(record, dict):
+                            # A torn final line after a crash is expected; skip it
+                            print(f"[Storage] ⚠️  Skipping unreadable line {line_no} in {self.path}")
+                            continue
+
+                        if TOMBSTONE_KEY in record:
+                            posts.pop(record[TOMBSTONE_KEY], None)
+                        else:
+                            key = _live_key(record)
+                            posts.pop(key, None)
+                            posts[key] = record
+
+            self._live_urls = set(posts)
+            self._line_count = line_count
+            return list(posts.values())
+
+    def _migrate(self) -> None:
+        """One-time conversion of the legacy JSON array file"""
+        try:
+            legacy = jsonio.read_file(self.legacy_path) or []
+        except (OSError, jsonio.JSONDecodeError) as e:
+            print(f"[Storage] ❌ Could not migrate {self.legacy_path}: {e}")
+            return
+
+        if not isinstance(legacy, list):
+            print(f"[Storage] Warning: {self.legacy_path} is not a list, skipping migration")
+            return
+
+        self._write_full(legacy)
+        print(f"[Storage] 🔁 Migrated {len(legacy)} posts from {self.legacy_path} to {self.path}")
+
+    # --- Writing ---
+
+    def _write_full(self, posts: List[Dict]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_file = self.path + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for post in posts:
+                f.write(jsonio.dumps(post))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.path)
+
+    def append(self, posts: List[Dict], new_posts: List[Dict]) -> None:
+        """
+        Persist one cycle's changes.
+
+        Args:
+            posts: Full in-memory store after compaction
+            new_posts: Posts added during this cycle
+        """
+        with self._lock:
+            current_urls = {_live_key(post) for post in posts}
+            removed = self._live_urls - current_urls
+
+            lines = [jsonio.dumps({TOMBSTONE_KEY: url}) for url in removed]
+            added = 0
+            for post in new_posts:
+                if _live_key(post) in current_urls:
+                    lines.append(jsonio.dumps(post))
+                    added += 1
+
+            if lines:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines))
+                    f.write("\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self._line_count += len(lines)
+            self._live_urls = current_urls
+
+        print(f"[Storage] ✅ Appended {added} posts ({len(removed)} tombstones) to {self.path}")
+        self._maybe_compact(posts)
+
+    def rewrite(self, posts: List[Dict]) -> None:
+        """Synchronously replace the log with exactly `posts`"""
+        with self._lock:
+            self._write_full(posts)
+            self._live_urls = {_live_key(post) for post in posts}
+            self._line_count = len(posts)
+
+    # --- Compaction ---
+
+    def dead_ratio(self) -> float:
+        if not self._line_count:
+            return 0.0
+        return (self._line_count - len(self._live_urls)) / self._line_count
+
+    def _maybe_compact(self, posts: List[Dict]) -> None:
+        if self._line_count < self.compact_min_lines or self.dead_ratio() <= self.compact_ratio:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+
+        snapshot = list(posts)
+        print(f"[Storage] 🧹 Compacting {self.path} in background "
+              f"({self.dead_ratio():.0%} of {self._line_count} lines are dead)")
+        self._compactor = threading.Thread(
+            target=self._compact, args=(snapshot, self._line_count), name="jsonl-compact", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact(self, snapshot: List[Dict], expected_lines: int) -> None:
+        try:
+            with self._lock:
+                if self._line_count != expected_lines:
+                    # Something was appended after the snapshot; retry next cycle
+                    print("[Storage] ⚠️  Log changed before compaction started, skipping")
+                    return
+                self._write_full(snapshot)
+                self._line_count = len(snapshot)
+            print(f"[Storage] ✅ Compacted {self.path} to {len(snapshot)} posts")
+        except Exception as e:
+            print(f"[Storage] ❌ Compaction failed: {e}")
+
+    def wait_for_compaction(self, timeout: Optional[float] = None) -> None:
+        if self._compactor is not None:
+            self._compactor.join(timeout)
@@ -0,0 +1,256 @@
+import datetime
+import heapq
+import itertools
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds until a rate-limit window resets.
+
+    Accepts Groq's duration format ("7.66s", "2m59.56s", "1h2m", "450ms")
+    and plain seconds ("12", as sent in Retry-After).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _seconds_until_tomorrow() -> float:
+    now = datetime.datetime.now()
+    tomorrow = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return (tomorrow - now).total_seconds()
+
+
+class _KeyState:
+    __slots__ = ("key", "key_id", "in_flight", "remaining_requests", "remaining_tokens",
+                 "requests_reset_at", "cool_until", "disabled", "version")
+
+    def __init__(self, key: str, key_id: str):
+        self.key = key
+        self.key_id = key_id
+        self.in_flight = 0
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.cool_until = 0.0
+        self.disabled = False
+        self.version = 0
+
+
+class KeyPool:
+    """
+    Scheduler handing out Groq API keys by remaining rate-limit headroom.
+
+    Every response's x-ratelimit-* headers update the key's remaining
+    requests/tokens for the current minute. A key that runs out, answers
+    429 or exhausts its daily token budget moves to a cool-down heap until
+    its reset time instead of anyone sleeping blindly. Ready keys sit in a
+    max-headroom heap, so picking a key is O(log n); stale heap entries are
+    skipped lazily via a per-key version number.
+    """
+
+    def __init__(self, keys: Iterable[str], anonymize: Callable[[str], str], concurrency: int = 2,
+                 has_budget: Optional[Callable[[str], bool]] = None, min_tokens: int = 0):
+        """
+        Args:
+            keys: Real API keys
+            anonymize: Key → stable id used for logs and usage tracking (computed once per key)
+            concurrency: In-flight requests allowed per key
+            has_budget: Called with the key id; False parks the key until tomorrow
+            min_tokens: Park a key whose remaining tokens this minute fall below this
+        """
+        self.concurrency = max(1, concurrency)
+        self.has_budget = has_budget
+        self.min_tokens = min_tokens
+        self._states: Dict[str, _KeyState] = {}
+        for key in keys:
+            key_id = anonymize(key)
+            if key_id not in self._states:
+                self._states[key_id] = _KeyState(key, key_id)
+
+        self._ready: List[Tuple] = []      # (priority..., seq, version, key_id)
+        self._cooling: List[Tuple] = []    # (cool_until, version, key_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        for state in self._states.values():
+            self._push_ready(state)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    # --- heap maintenance (caller holds the condition) ---
+
+    def _push_ready(self, state: _KeyState) -> None:
+        state.version += 1
+        if state.disabled or state.in_flight >= self.concurrency:
+            return
+        tokens = state.remaining_tokens if state.remaining_tokens is not None else float("inf")
+        requests = state.remaining_requests if state.remaining_requests is not None else float("inf")
+        heapq.heappush(self._ready, (state.in_flight, -tokens, -requests, next(self._seq),
+                                     state.version, state.key_id))
+
+    def _cool(self, state: _KeyState, seconds: float) -> None:
+        state.cool_until = max(state.cool_until, time.monotonic() + seconds)
+        state.version += 1
+        heapq.heappush(self._cooling, (state.cool_until, state.version, state.key_id))
+
+    def _wake_cooled(self, now: float) -> None:
+        while self._cooling and self._cooling[0][0] <= now:
+            _, version, key_id = heapq.heappop(self._cooling)
+            state = self._states[key_id]
+            if version == state.version:
+                state.cool_until = 0.0
+                state.remaining_requests = None
+                state.remaining_tokens = None
+                self._push_ready(state)
+
+    def _pop_ready(self) -> Optional[_KeyState]:
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            state = self._states[entry[-1]]
+            if entry[-2] != state.version:
+                continue
+            if self.has_budget is not None and not self.has_budget(state.key_id):
+                print(f"[AI] Key {state.key_id} reached its daily budget — parked until tomorrow")
+                self._cool(state, _seconds_until_tomorrow())
+                continue
+            if state.remaining_requests is not None and state.remaining_requests <= 0:
+                # In-flight requests already used up the last known window
+                self._cool(state, max(0.05, state.requests_reset_at - time.monotonic()))
+                continue
+            return state
+        return None
+
+    # --- public API ---
+
+    def acquire(self, max_wait: float = 60.0) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Reserve a slot on the key with the most headroom.
+
+        Blocks while every key is busy or cooling down, but never longer
+        than `max_wait` seconds.
+
+        Returns:
+            (real_key, key_id) or (None, None) if no key becomes available in time
+        """
+        deadline = time.monotonic() + max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._wake_cooled(now)
+                state = self._pop_ready()
+                if state is not None:
+                    state.in_flight += 1
+                    if state.remaining_requests is not None:
+                        state.remaining_requests -= 1
+                    self._push_ready(state)
+                    return state.key, state.key_id
+
+                # Nothing ready: wait for a release or the next cool-down to end
+                busy = any(s.in_flight for s in self._states.values() if not s.disabled)
+                next_wake = self._cooling[0][0] if self._cooling else None
+                if now >= deadline or (not busy and (next_wake is None or next_wake > deadline)):
+                    return None, None
+                wake_at = deadline if next_wake is None else min(deadline, next_wake)
+                self._cond.wait(max(0.0, wake_at - now))
+
+    def release(self, key_id: str, headers: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Free a slot and record the rate-limit state from the response headers.
+        """
+        with self._cond:
+            state = self._states[key_id]
+            state.in_flight = max(0, state.in_flight - 1)
+
+            cool_for = 0.0
+            if headers:
+                remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+                remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+                requests_reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+                if requests_reset is not None:
+                    state.requests_reset_at = time.monotonic() + requests_reset
+                if remaining_requests is not None:
+                    # Other requests on this key are still in flight and will use some of it
+                    state.remaining_requests = remaining_requests - state.in_flight
+                    if remaining_requests <= 0:
+                        cool_for = requests_reset or 1.0
+                if remaining_tokens is not None:
+                    state.remaining_tokens = remaining_tokens
+                    if remaining_tokens < self.min_tokens:
+                        cool_for = max(cool_for, parse_reset(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+            if cool_for > 0:
+                self._cool(state, cool_for)
+            elif state.cool_until <= time.monotonic():
+                self._push_ready(state)
+            self._cond.notify_all()
+
+    def rate_limited(self, key_id: str, headers: Optional[Mapping[str, str]] = None,
+                     default: float = 5.0) -> float:
+        """
+        Free a slot after a 429 and park the key until its limit resets.
+
+        Returns:
+            Cool-down in seconds
+        """
+        headers = headers or {}
+        cool_for = (
+            parse_reset(headers.get("retry-after"))
+            or max(parse_reset(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                   parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0.0)
+            or default
+        )
+        with self._cond:
+            state = self._states[key_id]
+            state.in_flight = max(0, state.in_flight - 1)
+            state.remaining_requests = 0
+            self._cool(state, cool_for)
+            self._cond.notify_all()
+        return cool_for
+
+    def disable(self, key_id: str) -> None:
+        """Free a slot and stop handing out a key for the rest of the process (auth/org errors)"""
+        with self._cond:
+            state = self._states[key_id]
+            state.in_flight = max(0, state.in_flight - 1)
+            state.disabled = True
+            state.version += 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> List[Dict]:
+        """Current per-key scheduler state (for logs and metrics)"""
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    "key_id": s.key_id,
+                    "in_flight": s.in_flight,
+                    "remaining_requests": s.remaining_requests,
+                    "remaining_tokens": s.remaining_tokens,
+                    "cooling_for": round(max(0.0, s.cool_until - now), 1),
+                    "disabled": s.disabled,
+                }
+                for s in self._states.values()
+            ]
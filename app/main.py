@@ -1,72 +1,157 @@
 from requests import post
 from .keywords import KEYWORDS
-from .bluesky import fetch_all, fetch_all_since_timestamp, filter_recent_posts, at_uri_to_web_url
-from .ai_agent import classify_post
-from .storage import load_data, save_data, add_post, is_duplicate
-from .discord_notify import send_batch_notification
-# from .config import FETCH_INTERVAL_HOURS
+from .bluesky import (
+    JetstreamConsumer, fetch_all, stream_all_since_timestamp, filter_recent_posts, at_uri_to_web_url,
+)
+from .ai_agent import classify_stream, classification_cache, get_llm_stats, save_usage
+from . import metrics, preclassifier
+from .storage import PostStore, open_store
+from .fetch_state import FetchState
+from .models import Post
+from .discord_notify import get_notifier, notify_qualified, send_cycle_summary
+from .transport import print_connection_stats
+from .config import settings
 from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Optional
+import itertools
 import traceback
+import time
 import os
-import dotenv
 
-# Load environment variables
-dotenv.load_dotenv()
-
-# Load fetch interval from config or use default
-FETCH_INTERVAL_HOURS = int(os.getenv("FETCH_INTERVAL_HOURS"))
-# Calculate recency window from config
-RECENCY_WINDOW_SECONDS = FETCH_INTERVAL_HOURS * 3600  # Convert hours to seconds
-# RECENCY_WINDOW_SECONDS = 100
-
-# Overlap window to handle scheduler delays (Render-safe)
+# Overlap window for the first cycle after a start (no previous cycle to resume from)
 OVERLAP_SECONDS = 30 * 60  # 30 minutes
 
+# Posts can reach search a little after their createdAt; later cycles
+# reach back this far before the previous cycle's start
+INDEXING_LAG_SECONDS = 5 * 60
+
 
 # Choose fetching strategy
 USE_TIMESTAMP_FETCH = True  # Set to False to use old method (fetch all + filter)
 
+# Per-keyword high-water marks: keywords seen before resume exactly where the
+# last completed cycle stopped; the cutoff window only applies to new keywords
+fetch_state = FetchState()
+
+# Realtime mode: seconds between store compaction / cache writes
+REALTIME_FLUSH_SECONDS = 60
+
+# Start time of the last cycle whose posts were all stored and classified
+last_cycle_started: Optional[datetime] = None
+
 
 def normalize(post):
     """
     Normalize BlueSky post structure to internal format
     
     Args:
-        post: Raw post from BlueSky API
+        post: Raw post from BlueSky API (or an already reduced Post)
     
     Returns:
-        Normalized post dict
+        Post record
     """
+    if isinstance(post, Post):
+        return post
+    return Post.from_api(post)
+
+
+def _cycle_counts(recent: int = 0, qualified: int = 0, duplicates: int = 0,
+                  rejected: int = 0, errors: int = 0) -> Dict[str, int]:
     return {
-        "url": post.get("uri"),
-        "text": post.get("record", {}).get("text", ""),
-        "author": post.get("author", {}).get("handle"),
-        "location": post.get("author", {}).get("location")
+        "recent": recent,
+        "qualified": qualified,
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "errors": errors,
     }
 
 
-def run_pipeline():
-    """Main pipeline: fetch → filter → classify → store → notify"""
+def _finish_cycle(started: float, counts: Optional[Dict[str, int]] = None,
+                  write_record: bool = True) -> Optional[Dict]:
+    """
+    Record cycle totals and append this cycle's metrics record to METRICS_FILE.
+
+    Realtime batches pass write_record=False; run_realtime writes one record
+    per flush interval instead of one per micro-batch.
+    """
+    metrics.observe("cycle_seconds", time.perf_counter() - started)
+    for outcome, count in (counts or {}).items():
+        if count:
+            metrics.inc("posts_total", count, outcome=outcome)
+    if not write_record:
+        return None
+    record = metrics.cycle_record(reset=True)
+    record["counts"] = counts
+    metrics.write_cycle_record(record)
+    return record
+
+
+def save_caches() -> None:
+    """Write the verdict cache, API usage and new pre-classifier labels"""
+    classification_cache.save()
+    save_usage()
+    preclassifier.flush_labels()
+
+
+def run_pipeline(pages: Optional[Iterable[List[Post]]] = None, store: Optional[PostStore] = None) -> Dict[str, int]:
+    """
+    Main pipeline: fetch → filter → classify → store → notify
+
+    The stages overlap: fetch workers stream pages through a bounded queue,
+    each page is deduplicated and handed to the classification workers, and
+    verdicts are stored and queued for Discord as they come back, so a cycle
+    takes about as long as its slowest stage rather than the sum of all of
+    them.
+
+    Args:
+        pages: Posts to process instead of running a keyword sweep (the
+            realtime consumer passes its micro-batches here); keyword marks
+            are left alone and Discord only hears about qualified posts.
+            Realtime batches skip the banners, compaction and cache/usage
+            writes; run_realtime does those on its own schedule
+        store: Open store to use and leave open (opened and closed per
+            call when None)
+
+    Returns:
+        Cycle counts: {"recent", "qualified", "duplicates", "rejected", "errors"}
+        (the scheduler adapts its interval to them)
+    """
+    global last_cycle_started
+    
+    cycle_started = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    # Recency window: one fetch interval
+    recency_window_seconds = settings.FETCH_INTERVAL_HOURS * 3600
+    
+    realtime = pages is not None
+    own_store = store is None
     
-    print("\n" + "="*80)
-    print("[Pipeline] 🚀 Starting fetch cycle...")
-    print("="*80)
+    if not realtime:
+        print("\n" + "="*80)
+        print("[Pipeline] 🚀 Starting fetch cycle...")
+        print("="*80)
     
     try:
         # Load existing posts
-        stored = load_data()
-        print(f"[Pipeline] 📚 Loaded {len(stored)} existing posts from storage")
+        if own_store:
+            store = open_store()
+            print(f"[Pipeline] 📚 Loaded {len(store)} existing posts from storage")
         
         # Fetch posts using selected strategy
-        if USE_TIMESTAMP_FETCH:
+        if realtime:
+            # Micro-batches from the Jetstream consumer, nothing to fetch
+            pass
+        elif USE_TIMESTAMP_FETCH:
             # Strategy 1: Timestamp-based fetching (more efficient)
 
             # cutoff_time = datetime.now(timezone.utc) - timedelta(seconds=RECENCY_WINDOW_SECONDS)
-            now_utc = datetime.now(timezone.utc)
-
-            cutoff_time = now_utc - timedelta(
-                seconds=RECENCY_WINDOW_SECONDS + OVERLAP_SECONDS
-            )
+            if last_cycle_started is not None:
+                # Resume from the previous completed cycle, however long ago it ran
+                cutoff_time = last_cycle_started - timedelta(seconds=INDEXING_LAG_SECONDS)
+            else:
+                cutoff_time = cycle_started - timedelta(
+                    seconds=recency_window_seconds + OVERLAP_SECONDS
+                )
 
 
             # base_time = datetime(2026, 2, 6, 3, 10, tzinfo=timezone.utc)  # your chosen time
@@ -75,9 +160,8 @@ def run_pipeline():
 
             print("Cutoff time = ", cutoff_time)
             print(f"[Pipeline] 🔍 Fetching posts since {cutoff_time.strftime('%Y-%m-%d %H:%M:%S UTC')}...")
-            print("Fetching post since last " , FETCH_INTERVAL_HOURS, " hours")
-            recent_posts = fetch_all_since_timestamp(KEYWORDS, since=cutoff_time)
-            print(f"[Pipeline] ✅ Fetched {len(recent_posts)} recent posts")
+            # Pages stream in while later keywords are still downloading
+            pages = stream_all_since_timestamp(KEYWORDS, since=cutoff_time, state=fetch_state)
             print("This is Strategy 1 timestamp-based fetching")
         else:
             # Strategy 2: Fetch all + filter (old method with pagination)
@@ -88,27 +172,34 @@ def run_pipeline():
             if not posts:
                 print("[Pipeline] ⚠️  No posts fetched, ending cycle")
                 try:
-                    send_batch_notification(posts)
-                    print(f"[Pipeline] 📤 Sent batch notification to Discord ({len(posts)} posts)")
+                    with metrics.timed("notify_seconds"):
+                        send_cycle_summary(0)
+                    print(f"[Pipeline] 📤 Queued cycle summary for Discord (0 posts)")
                 except Exception as e:
                     print(f"[Pipeline] ❌ Discord notification failed: {e}")
                     traceback.print_exc()
-                return
+                if own_store:
+                    store.close()
+                _finish_cycle(started, _cycle_counts())
+                return _cycle_counts()
             
             # Filter for recency
-            print(f"[Pipeline] ⏰ Filtering for posts from last {FETCH_INTERVAL_HOURS} hours ({RECENCY_WINDOW_SECONDS}s)...")
-            recent_posts = filter_recent_posts(posts, seconds=RECENCY_WINDOW_SECONDS)
+            print(f"[Pipeline] ⏰ Filtering for posts from last {settings.FETCH_INTERVAL_HOURS} hours ({recency_window_seconds}s)...")
+            recent_posts = filter_recent_posts(posts, seconds=recency_window_seconds)
             print(f"[Pipeline] ✅ {len(recent_posts)} posts are recent")
+            pages = [recent_posts]
         
-        if not recent_posts:
-            print("[Pipeline] ℹ️  No recent posts found, ending cycle")
-            try:
-                send_batch_notification(recent_posts)
-                print(f"[Pipeline] 📤 Sent batch notification to Discord ({len(recent_posts)} posts)")
-            except Exception as e:
-                print(f"[Pipeline] ❌ Discord notification failed: {e}")
-                traceback.print_exc()
-            return
+        # Posts earlier cycles could not classify go first
+        retry_attempts: Dict[str, int] = {}
+        if not realtime:
+            retry_page = []
+            for entry in fetch_state.retry_posts():
+                post = Post.from_dict(entry["post"])
+                retry_attempts[post.url] = entry.get("attempts", 0)
+                retry_page.append(post)
+            if retry_page:
+                print(f"[Pipeline] 🔁 Retrying {len(retry_page)} post(s) left unclassified by earlier cycles")
+                pages = itertools.chain([retry_page], pages)
         
         # Track new qualified posts for batch notification
         new_qualified_posts = []
@@ -116,112 +207,203 @@ def run_pipeline():
         duplicate_count = 0
         rejected_count = 0
         error_count = 0
+        failed_posts = []
+        recent_count = 0
+        seen_urls = set()
         
-        print(f"[Pipeline] 🤖 Processing {len(recent_posts)} recent posts...")
+        if not realtime:
+            print(f"[Pipeline] 🤖 Processing posts as they arrive...")
         
-        for i, raw in enumerate(recent_posts, 1):
-            try:
-                # Normalize post structure
-                post = normalize(raw)
-
-                # Clean text (IMPORTANT: before checks & classification)
-                post["text"] = post["text"].strip()
-                
-                # Skip invalid posts
-                if not post["url"] or not post["text"]:
-                    print(f"[Pipeline] [{i}/{len(recent_posts)}] ⚠️  Skipping invalid post (missing URL or text)")
-                    error_count += 1
-                    continue
-                
-                # Check for duplicates (URL-based)
-                if is_duplicate(stored, post["url"]):
-                    print(f"[Pipeline] [{i}/{len(recent_posts)}] 🔄 Duplicate: {post['author']}")
-                    duplicate_count += 1
-                    continue
-                
-                # AI Classification
-                print(f"[Pipeline] [{i}/{len(recent_posts)}] 🧠 Classifying: {post['author'][:30]}")
-                ai_result = classify_post(post["text"], use_two_stage=True)
+        def candidate_batches():
+            """Stage 1: normalize, validate and deduplicate each page before any AI call"""
+            nonlocal recent_count, error_count, duplicate_count
+            for page in pages:
+                batch = []
+                for raw in page:
+                    recent_count += 1
+                    i = recent_count
+                    try:
+                        normalize_started = time.perf_counter()
+                        
+                        # Normalize post structure
+                        post = normalize(raw)
 
-                
+                        # Clean text (IMPORTANT: before checks & classification)
+                        post.text = post.text.strip()
+                        metrics.observe("normalize_seconds", time.perf_counter() - normalize_started)
+                        
+                        # Skip invalid posts
+                        if not post.url or not post.text:
+                            print(f"[Pipeline] [{i}] ⚠️  Skipping invalid post (missing URL or text)")
+                            error_count += 1
+                            continue
+                        
+                        # Check for duplicates (URL-based, against storage and this cycle)
+                        with metrics.timed("dedup_seconds"):
+                            duplicate = post.url in seen_urls or store.is_duplicate(post.url)
+                        if duplicate:
+                            print(f"[Pipeline] [{i}] 🔄 Duplicate: {post.author}")
+                            duplicate_count += 1
+                            continue
+                        
+                        seen_urls.add(post.url)
+                        batch.append(((i, post), post.text))
+                        
+                    except Exception as e:
+                        print(f"[Pipeline] [{i}] ❌ Error processing post: {e}")
+                        traceback.print_exc()
+                        error_count += 1
+                        continue
+                if batch:
+                    yield batch
+        
+        # Stage 2: classification workers; stage 3: keep qualified posts as verdicts arrive
+        for (i, post), ai_result in classify_stream(candidate_batches()):
+            try:
                 if not ai_result:
-                    print(f"[Pipeline] [{i}/{len(recent_posts)}] ❌ Classification failed")
+                    print(f"[Pipeline] [{i}] ❌ Classification failed")
                     error_count += 1
+                    failed_posts.append({"post": post.to_dict(), "attempts": retry_attempts.get(post.url, 0) + 1})
                     continue
                 
                 # Check if it's a commission request
-                if not ai_result.get("is_commission"):
-                    print(f"[Pipeline] [{i}/{len(recent_posts)}] 🚫 Not a commission")
+                if not ai_result.is_commission:
+                    print(f"[Pipeline] [{i}] 🚫 Not a commission")
                     rejected_count += 1
                     continue
 
-                confidence = ai_result.get("confidence", 0.0)
+                confidence = ai_result.confidence
 
                 if confidence < 0.75:
-                    print(f"[Pipeline] [{i}/{len(recent_posts)}] ⚠️ Low confidence ({confidence:.0%}), skipping")
+                    print(f"[Pipeline] [{i}] ⚠️ Low confidence ({confidence:.0%}), skipping")
                     rejected_count += 1
                     continue
-
-
                 
                 # Build web URL
-                username = post["author"]
-                web_url = at_uri_to_web_url(post["url"], username)
-                post["web_url"] = web_url
+                post.web_url = at_uri_to_web_url(post.url, post.author)
                 
                 # Store AI result
-                post["ai"] = ai_result
+                post.ai = ai_result
                 
                 # Add to storage using helper function
-                stored = add_post(stored, post)
+                with metrics.timed("store_add_seconds"):
+                    added = store.add_post(post)
+                if not added:
+                    duplicate_count += 1
+                    continue
                 new_qualified_posts.append(post)
                 
-                confidence = ai_result.get("confidence", 0)
-                print(f"[Pipeline] [{i}/{len(recent_posts)}] ✅ QUALIFIED ({confidence:.0%}): {post['author']}")
+                print(f"[Pipeline] [{i}] ✅ QUALIFIED ({confidence:.0%}): {post.author}")
+                
+                # Hand it to the background notifier now rather than at the end of the cycle
+                try:
+                    with metrics.timed("notify_seconds"):
+                        notify_qualified(len(new_qualified_posts), post)
+                except Exception as e:
+                    print(f"[Pipeline] [{i}] ❌ Discord notification failed: {e}")
                 
                 processed_count += 1
                 
             except Exception as e:
-                print(f"[Pipeline] [{i}/{len(recent_posts)}] ❌ Error processing post: {e}")
+                print(f"[Pipeline] [{i}] ❌ Error processing post: {e}")
                 traceback.print_exc()
                 error_count += 1
                 continue
         
+        if not realtime:
+            with metrics.timed("json_save_seconds"):
+                save_caches()
+        
+        if not recent_count:
+            print("[Pipeline] ℹ️  No recent posts found, ending cycle")
+            if own_store:
+                store.close()
+            if not realtime:
+                fetch_state.commit()
+                last_cycle_started = cycle_started
+                try:
+                    with metrics.timed("notify_seconds"):
+                        send_cycle_summary(0)
+                    print(f"[Pipeline] 📤 Queued cycle summary for Discord (0 posts)")
+                except Exception as e:
+                    print(f"[Pipeline] ❌ Discord notification failed: {e}")
+                    traceback.print_exc()
+            _finish_cycle(started, _cycle_counts(), write_record=not realtime)
+            return _cycle_counts()
+        
         # Save all changes
         if new_qualified_posts:
-            save_data(stored)
+            # Expire old posts and cap size once per cycle, not per insert
+            # (realtime batches only append; run_realtime compacts periodically)
+            with metrics.timed("store_save_seconds"):
+                if not realtime:
+                    store.compact()
+                store.save(new_posts=new_qualified_posts)
             print(f"\n[Pipeline] 💾 Saved {len(new_qualified_posts)} new posts to storage")
-            
-            # Send batch notification
-            try:
-                send_batch_notification(new_qualified_posts)
-                print(f"[Pipeline] 📤 Sent batch notification to Discord ({len(new_qualified_posts)} posts)")
-            except Exception as e:
-                print(f"[Pipeline] ❌ Discord notification failed: {e}")
-                traceback.print_exc()
-        else:
+        elif not realtime:
             print("\n[Pipeline] ℹ️  No new qualified posts found")
+        
+        # Qualified posts went out as their verdicts arrived; this is the summary line
+        if not realtime:
             try:
-                send_batch_notification(new_qualified_posts)
-                print(f"[Pipeline] 📤 Sent batch notification to Discord ({len(new_qualified_posts)} posts)")
+                with metrics.timed("notify_seconds"):
+                    send_cycle_summary(len(new_qualified_posts))
+                print(f"[Pipeline] 📤 Queued cycle summary for Discord ({len(new_qualified_posts)} posts)")
             except Exception as e:
                 print(f"[Pipeline] ❌ Discord notification failed: {e}")
                 traceback.print_exc()
         
-        # Print summary
-        print("\n" + "="*80)
-        print("[Pipeline] 📊 CYCLE SUMMARY")
-        print("="*80)
-        if USE_TIMESTAMP_FETCH:
-            print(f"Recent posts:        {len(recent_posts)}")
+        # Every keyword's mark advances; posts without a verdict are retried next cycle
+        if not realtime:
+            fetch_state.set_retry(failed_posts)
+            fetch_state.commit()
+            last_cycle_started = cycle_started
+        
+        counts = _cycle_counts(
+            recent=recent_count,
+            qualified=len(new_qualified_posts),
+            duplicates=duplicate_count,
+            rejected=rejected_count,
+            errors=error_count,
+        )
+        
+        if realtime:
+            print(f"[Realtime] ⚡ Batch: {recent_count} posts, {len(new_qualified_posts)} qualified, "
+                  f"{duplicate_count} duplicates, {rejected_count} rejected, {error_count} errors")
         else:
-            print(f"Total fetched:       {len(posts)}")
-            print(f"Recent posts:        {len(recent_posts)}")
-        print(f"Duplicates:          {duplicate_count}")
-        print(f"Rejected:            {rejected_count}")
-        print(f"Errors:              {error_count}")
-        print(f"✅ NEW QUALIFIED:    {len(new_qualified_posts)}")
-        print("="*80 + "\n")
+            # Print summary
+            print("\n" + "="*80)
+            print("[Pipeline] 📊 CYCLE SUMMARY")
+            print("="*80)
+            if not USE_TIMESTAMP_FETCH:
+                print(f"Total fetched:       {len(posts)}")
+            print(f"Recent posts:        {recent_count}")
+            print(f"Duplicates:          {duplicate_count}")
+            print(f"Rejected:            {rejected_count}")
+            print(f"Errors:              {error_count}")
+            cache_stats = classification_cache.stats(reset=True)
+            print(f"Cache hits/misses:   {cache_stats['hits']}/{cache_stats['misses']}")
+            local_stats = preclassifier.stats(reset=True)
+            print(f"LLM calls avoided:   {local_stats['accepted'] + local_stats['rejected']} "
+                  f"(local accept {local_stats['accepted']}, reject {local_stats['rejected']}, "
+                  f"escalated {local_stats['escalated']})")
+            llm_stats = get_llm_stats(reset=True)
+            if llm_stats["posts"]:
+                print(f"LLM requests:        {llm_stats['requests']} for {llm_stats['posts']} posts "
+                      f"(~{llm_stats['tokens'] // llm_stats['posts']} tokens/post)")
+            print(f"✅ NEW QUALIFIED:    {len(new_qualified_posts)}")
+            print_connection_stats()
+        
+        if own_store:
+            store.close()
+        
+        record = _finish_cycle(started, counts, write_record=not realtime)
+        if record is not None:
+            print("Time per stage:")
+            metrics.print_stage_summary(record)
+            print("="*80 + "\n")
+        
+        return counts
         
     except KeyboardInterrupt:
         print("\n[Pipeline] ⚠️  Interrupted by user")
@@ -230,12 +412,59 @@ def run_pipeline():
     except Exception as e:
         print(f"\n[Pipeline] ❌ CRITICAL ERROR: {e}")
         traceback.print_exc()
+        fetch_state.discard()
+        _finish_cycle(started, write_record=not realtime)
         raise
 
 
+def run_realtime() -> None:
+    """
+    Realtime mode: run every Jetstream micro-batch through the pipeline.
+
+    The store stays open across batches and each batch only appends its
+    qualified posts. Compaction, cache/usage writes and the metrics record
+    happen every REALTIME_FLUSH_SECONDS instead of per batch. The
+    consumer's resume cursor only advances once a batch has been
+    classified and stored, so a crash replays the batch after restart.
+    """
+    consumer = JetstreamConsumer(KEYWORDS)
+    store = open_store()
+    print(f"[Realtime] 📚 Loaded {len(store)} existing posts from storage")
+    print(f"[Realtime] 📡 Watching Jetstream for {len(KEYWORDS)} keywords...")
+
+    def flush() -> None:
+        with metrics.timed("store_save_seconds"):
+            store.compact()
+            store.save(new_posts=[])
+        with metrics.timed("json_save_seconds"):
+            save_caches()
+        metrics.write_cycle_record(metrics.cycle_record(reset=True))
+        stats = consumer.stats
+        print(f"[Realtime] {stats['matched']} matches from {stats['posts']} posts "
+              f"({stats['reconnects']} reconnects, {stats['bad_events']} bad events)")
+
+    last_flush = time.monotonic()
+    try:
+        for batch in consumer.batches():
+            try:
+                run_pipeline(pages=[batch], store=store)
+            except KeyboardInterrupt:
+                raise
+            except Exception:
+                # run_pipeline already logged it; keep consuming, the cursor stays put
+                continue
+            consumer.commit()
+            if time.monotonic() - last_flush >= REALTIME_FLUSH_SECONDS:
+                flush()
+                last_flush = time.monotonic()
+    finally:
+        flush()
+        store.close()
+
+
 if __name__ == "__main__":
     from .scheduler import run_forever
-    from flask import Flask
+    from flask import Flask, Response, request
     import threading
 
     app = Flask(__name__)
@@ -248,6 +477,13 @@ if __name__ == "__main__":
             "uptime": "running"
         }
 
+    @app.route("/metrics")
+    def metrics_endpoint():
+        # ?format=json returns the last cycle's record instead of Prometheus text
+        if request.args.get("format") == "json":
+            return metrics.last_cycle() or {}
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
     def start_pipeline():
         print("""
         ╔═══════════════════════════════════════════════════════════╗
@@ -255,8 +491,14 @@ if __name__ == "__main__":
         ║   Monitoring BlueSky for commission requests               ║
         ╚═══════════════════════════════════════════════════════════╝
         """)
+        # Resend notifications a previous run could not deliver
+        get_notifier().start()
         try:
-            run_forever(run_pipeline)
+            # "search": scheduled keyword sweeps; "jetstream": realtime firehose consumer
+            if settings.INGEST_MODE == "jetstream":
+                run_realtime()
+            else:
+                run_forever(run_pipeline)
         except KeyboardInterrupt:
             print("\n[Main] 👋 Shutting down gracefully...")
         except Exception as e:
@@ -0,0 +1,107 @@
+import re
+from typing import Dict, FrozenSet, Iterable, Set, Tuple
+
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """
+    Build a prefix-factored regex for `patterns`.
+
+    Shared prefixes appear once in the expression. Optional tails are
+    greedy, so the longest pattern at a position wins.
+    """
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if terminal else body
+
+    return build(trie)
+
+
+class MatchResult(dict):
+    """{category: set of matched patterns}; categories without hits read as empty"""
+
+    def __missing__(self, category: str) -> FrozenSet[str]:
+        return frozenset()
+
+
+class MultiPatternMatcher:
+    """
+    Single-pass, case-insensitive substring matcher over named pattern lists.
+
+    All patterns are compiled into one regex at construction. A scan walks
+    the text once, taking the longest pattern starting at each match position;
+    every pattern contained in that match is then known to occur as well,
+    so the result lists every pattern hit (same semantics as
+    `pattern in text.lower()` for each pattern).
+
+    This keeps every stage-1 list behind one scan result; it is not
+    reliably faster than separate `in` checks (see benchmarks/bench_matcher.py).
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories: Dict[str, FrozenSet[str]] = {
+            name: frozenset(p.lower() for p in patterns if p) for name, patterns in categories.items()
+        }
+        all_patterns = set().union(*self.categories.values()) if self.categories else set()
+
+        # Which categories each pattern belongs to
+        pattern_categories: Dict[str, Set[str]] = {p: set() for p in all_patterns}
+        for name, patterns in self.categories.items():
+            for pattern in patterns:
+                pattern_categories[pattern].add(name)
+
+        # Every (category, pattern) hit implied by matching each pattern: a
+        # match also contains every shorter pattern found inside it
+        self._implied: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            p: tuple(
+                (name, q) for q in all_patterns if q in p for name in sorted(pattern_categories[q])
+            )
+            for p in all_patterns
+        }
+
+        if all_patterns:
+            self._regex = re.compile(_trie_regex(all_patterns))
+        else:
+            self._regex = None
+
+    def scan(self, text: str) -> MatchResult:
+        """
+        Find every pattern occurring in `text`.
+
+        Args:
+            text: Text to scan (any case)
+
+        Returns:
+            MatchResult mapping category → set of matched patterns
+        """
+        hits = MatchResult()
+        if self._regex is None or not text:
+            return hits
+
+        # search() skips ahead in C to the next candidate position; restarting
+        # one character after each match start also catches overlapping hits
+        search = self._regex.search
+        text_lower = text.lower()
+        seen = set()
+        match = search(text_lower)
+        while match is not None:
+            longest = match.group()
+            if longest not in seen:
+                seen.add(longest)
+                for name, pattern in self._implied[longest]:
+                    if name in hits:
+                        hits[name].add(pattern)
+                    else:
+                        hits[name] = {pattern}
+            match = search(text_lower, match.start() + 1)
+        return hits
@@ -0,0 +1,262 @@
+"""
+In-process counters and latency histograms for the pipeline stages.
+
+Stages record into a module-level registry (`observe`, `inc`, `timed`).
+`render()` produces the Prometheus text format served on /metrics, and
+`cycle_record()` summarises everything recorded since the previous call,
+which `run_pipeline` writes to METRICS_FILE once per cycle (one JSON line
+per cycle; an empty METRICS_FILE disables the dump).
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import jsonio
+from .config import settings
+
+# Upper bounds in seconds; wide enough for both dict lookups and Groq calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+HELP = {
+    "bluesky_fetch_keyword_seconds": "Time to page through searchPosts for one keyword",
+    "bluesky_request_seconds": "searchPosts HTTP round trip",
+    "bluesky_requests_total": "searchPosts requests by outcome",
+    "bluesky_fetch_capped_total": "Keyword fetches stopped by max_posts before reaching the last mark",
+    "rate_limit_wait_seconds": "Time spent blocked on a rate limiter",
+    "normalize_seconds": "Post normalisation and validation",
+    "dedup_seconds": "Duplicate check against storage and the current cycle",
+    "groq_key_wait_seconds": "Time waiting for a Groq key with headroom",
+    "groq_request_seconds": "Groq chat completion round trip per key",
+    "groq_requests_total": "Groq requests by key and outcome",
+    "groq_tokens_total": "Groq tokens used per key",
+    "classify_group_seconds": "Classification of one batch of posts, parsing included",
+    "store_add_seconds": "Adding one qualified post to storage",
+    "store_save_seconds": "Saving storage at the end of a cycle",
+    "json_save_seconds": "Writing cache/usage/label files at the end of a cycle",
+    "discord_request_seconds": "Discord webhook round trip",
+    "discord_messages_total": "Discord webhook requests by outcome",
+    "discord_queue_seconds": "Time from queueing a Discord message to its delivery",
+    "notify_seconds": "Queueing a qualified post or cycle summary for Discord",
+    "posts_total": "Posts by pipeline outcome",
+    "cycle_seconds": "Duration of a full pipeline cycle",
+}
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum", "cycle_count", "cycle_sum", "cycle_max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.cycle_count = 0
+        self.cycle_sum = 0.0
+        self.cycle_max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.cycle_count += 1
+        self.cycle_sum += value
+        if value > self.cycle_max:
+            self.cycle_max = value
+
+
+class _Counter:
+    __slots__ = ("value", "cycle_value")
+
+    def __init__(self):
+        self.value = 0.0
+        self.cycle_value = 0.0
+
+
+_histograms: Dict[str, Dict[_LabelKey, _Histogram]] = {}
+_counters: Dict[str, Dict[_LabelKey, _Counter]] = {}
+_lock = threading.Lock()
+_last_cycle: Optional[Dict] = None
+
+
+def _label_key(labels: Dict[str, object]) -> _LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record one duration (seconds) in histogram `name`"""
+    key = _label_key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Add `amount` to counter `name`"""
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        counter = series.get(key)
+        if counter is None:
+            counter = series[key] = _Counter()
+        counter.value += amount
+        counter.cycle_value += amount
+
+
+@contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    """Time the block into histogram `name` (also when it raises)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: _LabelKey, le: str = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    with _lock:
+        for name in sorted(_counters):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, counter in sorted(_counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {counter.value:g}")
+
+        for name in sorted(_histograms):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, le=format(bound, 'g'))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def quantile(name: str, q: float) -> Optional[float]:
+    """
+    Estimated q-quantile of histogram `name` across all its label sets.
+
+    Interpolates linearly inside the bucket holding the quantile (the same
+    estimate Prometheus' histogram_quantile makes), so it is only as
+    precise as BUCKETS. Returns None when nothing was observed.
+    """
+    with _lock:
+        series = list(_histograms.get(name, {}).values())
+        buckets = [sum(h.buckets[i] for h in series) for i in range(len(BUCKETS) + 1)]
+    total = sum(buckets)
+    if not total:
+        return None
+
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        if count and cumulative + count >= rank:
+            lower = BUCKETS[index - 1] if index > 0 else 0.0
+            if index == len(BUCKETS):
+                return lower  # +Inf bucket: the largest finite bound is all we know
+            return lower + (BUCKETS[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return BUCKETS[-1]
+
+
+def cycle_record(reset: bool = True) -> Dict:
+    """
+    Everything recorded since the last reset, as one JSON-ready record.
+
+    Histograms are summarised per label set as {"count", "total", "mean",
+    "max"} seconds; counters as their increase.
+    """
+    global _last_cycle
+
+    record = {"time": datetime.now(timezone.utc).isoformat(), "stages": {}, "counters": {}}
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            rows = []
+            for key, histogram in sorted(series.items()):
+                if not histogram.cycle_count:
+                    continue
+                rows.append(dict(
+                    key,
+                    count=histogram.cycle_count,
+                    total=round(histogram.cycle_sum, 4),
+                    mean=round(histogram.cycle_sum / histogram.cycle_count, 4),
+                    max=round(histogram.cycle_max, 4),
+                ))
+                if reset:
+                    histogram.cycle_count = 0
+                    histogram.cycle_sum = 0.0
+                    histogram.cycle_max = 0.0
+            if rows:
+                record["stages"][name] = rows
+
+        for name, series in sorted(_counters.items()):
+            rows = []
+            for key, counter in sorted(series.items()):
+                if not counter.cycle_value:
+                    continue
+                rows.append(dict(key, value=counter.cycle_value))
+                if reset:
+                    counter.cycle_value = 0.0
+            if rows:
+                record["counters"][name] = rows
+
+    if reset:
+        _last_cycle = record
+    return record
+
+
+def last_cycle() -> Optional[Dict]:
+    """The record returned by the most recent cycle_record(reset=True)"""
+    return _last_cycle
+
+
+def write_cycle_record(record: Dict, path: str = None) -> None:
+    """Append a cycle record as one JSON line"""
+    path = settings.METRICS_FILE if path is None else path
+    if not path:
+        return
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(jsonio.dumps(record) + "\n")
+    except Exception as e:
+        print(f"[Metrics] ❌ Error writing cycle record: {e}")
+
+
+def print_stage_summary(record: Dict) -> None:
+    """Per-stage time totals from a cycle record, slowest first"""
+    totals = []
+    for name, rows in record["stages"].items():
+        total = sum(row["total"] for row in rows)
+        count = sum(row["count"] for row in rows)
+        slowest = max(row["max"] for row in rows)
+        totals.append((total, name, count, slowest))
+    for total, name, count, slowest in sorted(totals, reverse=True):
+        print(f"  {name:<32} {total:>8.2f}s over {count:>6} (max {slowest:.2f}s)")
@@ -0,0 +1,122 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+
+@dataclass(slots=True)
+class Classification:
+    """AI verdict for one post (stored under the post's "ai" key)"""
+
+    is_commission: bool
+    confidence: float
+    reason: str = "No reason provided"
+    content_hash: Optional[str] = None
+    timestamp: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "is_commission": self.is_commission,
+            "confidence": self.confidence,
+            "reason": self.reason,
+            "content_hash": self.content_hash,
+        }
+        if self.timestamp is not None:
+            data["timestamp"] = self.timestamp
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Classification":
+        return cls(
+            is_commission=bool(data.get("is_commission", False)),
+            confidence=float(data.get("confidence", 0.0)),
+            reason=data.get("reason", "No reason provided"),
+            content_hash=data.get("content_hash"),
+            timestamp=data.get("timestamp"),
+        )
+
+
+@dataclass(slots=True)
+class Post:
+    """
+    A BlueSky post reduced to the fields the pipeline uses.
+
+    Built from the raw searchPosts object at fetch time, so the full API
+    payload (profile, embeds, labels, counts) is dropped straight away.
+    `to_dict()` / `from_dict()` convert to and from the stored JSON layout.
+    """
+
+    url: str
+    text: str
+    author: Optional[str] = None
+    location: Optional[str] = None
+    created_at: Optional[str] = None
+    matched_keywords: List[str] = field(default_factory=list)
+    web_url: Optional[str] = None
+    ai: Optional[Classification] = None
+
+    @classmethod
+    def from_api(cls, raw: Dict[str, Any]) -> "Post":
+        """Reduce a raw searchPosts result"""
+        record = raw.get("record") or {}
+        author = raw.get("author") or {}
+        return cls(
+            url=raw.get("uri"),
+            text=record.get("text") or "",
+            author=author.get("handle"),
+            location=author.get("location"),
+            created_at=record.get("createdAt") or raw.get("indexedAt"),
+            matched_keywords=raw.get("matched_keywords") or [],
+        )
+
+    @classmethod
+    def from_jetstream(cls, event: Dict[str, Any]) -> "Post":
+        """
+        Build from a Jetstream app.bsky.feed.post create event.
+
+        Jetstream only carries the author's DID, which bsky.app profile
+        links accept in place of a handle.
+        """
+        commit = event.get("commit") or {}
+        record = commit.get("record") or {}
+        did = event.get("did")
+        return cls(
+            url=f"at://{did}/{commit.get('collection')}/{commit.get('rkey')}",
+            text=record.get("text") or "",
+            author=did,
+            created_at=record.get("createdAt"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "url": self.url,
+            "text": self.text,
+            "author": self.author,
+            "location": self.location,
+        }
+        if self.created_at is not None:
+            data["created_at"] = self.created_at
+        if self.matched_keywords:
+            data["matched_keywords"] = list(self.matched_keywords)
+        if self.web_url is not None:
+            data["web_url"] = self.web_url
+        if self.ai is not None:
+            data["ai"] = self.ai.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Post":
+        ai = data.get("ai")
+        return cls(
+            url=data.get("url"),
+            text=data.get("text") or "",
+            author=data.get("author"),
+            location=data.get("location"),
+            created_at=data.get("created_at"),
+            matched_keywords=data.get("matched_keywords") or [],
+            web_url=data.get("web_url"),
+            ai=Classification.from_dict(ai) if ai else None,
+        )
+
+
+def as_record(post: Union[Post, Dict[str, Any]]) -> Dict[str, Any]:
+    """Storage layout for a Post (dicts pass through unchanged)"""
+    return post.to_dict() if isinstance(post, Post) else post
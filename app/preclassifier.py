@@ -0,0 +1,281 @@
+"""
+Local CPU-only pre-classifier.
+
+A hashed word n-gram logistic regression trained on posts the LLM has
+already labeled. High-confidence posts are decided locally; only the
+uncertain middle band is escalated to Groq.
+
+Train (or retrain) from history with:
+    python -m app.preclassifier train
+"""
+import os
+import re
+import sys
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import jsonio, storage
+from .config import settings
+
+N_FEATURES = 2 ** 18
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_BIAS_INDEX = 0  # every post has the bias feature, so no row is ever empty
+
+
+def _hash(token: str) -> int:
+    # crc32 is stable across processes (unlike hash()); 0 is reserved for the bias
+    return 1 + zlib.crc32(token.encode("utf-8")) % (N_FEATURES - 1)
+
+
+def featurize(text: str) -> np.ndarray:
+    """Hashed unigram + bigram feature indices for one post"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    indices = [_BIAS_INDEX]
+    indices.extend(_hash(token) for token in tokens)
+    indices.extend(_hash(a + " " + b) for a, b in zip(tokens, tokens[1:]))
+    return np.unique(np.asarray(indices, dtype=np.int64))
+
+
+def _stack(rows: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Flatten feature rows into (indices, row start offsets) for reduceat"""
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    offsets = np.zeros(len(rows), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    return np.concatenate(rows), offsets
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class PreClassifier:
+    """Hashed n-gram logistic regression with vectorised batch scoring"""
+
+    def __init__(self, weights: Optional[np.ndarray] = None):
+        self.weights = weights
+
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        P(commission request) for each text.
+
+        Args:
+            texts: Post texts
+
+        Returns:
+            Array of probabilities (all 0.5 when no model is loaded)
+        """
+        if not texts:
+            return np.zeros(0)
+        if not self.ready:
+            return np.full(len(texts), 0.5)
+        indices, offsets = _stack([featurize(text) for text in texts])
+        return _sigmoid(np.add.reduceat(self.weights[indices], offsets))
+
+    def fit(self, texts: Sequence[str], labels: Sequence[bool], epochs: int = 300,
+            learning_rate: float = 0.5, l2: float = 1e-4) -> "PreClassifier":
+        """Full-batch gradient descent with class-balanced sample weights"""
+        y = np.asarray(labels, dtype=np.float64)
+        rows = [featurize(text) for text in texts]
+        indices, offsets = _stack(rows)
+        lengths = np.diff(np.append(offsets, len(indices)))
+
+        positives = max(1.0, y.sum())
+        negatives = max(1.0, len(y) - y.sum())
+        sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+        weights = np.zeros(N_FEATURES)
+        for _ in range(epochs):
+            p = _sigmoid(np.add.reduceat(weights[indices], offsets))
+            residual = np.repeat((p - y) * sample_weight, lengths)
+            gradient = np.zeros(N_FEATURES)
+            np.add.at(gradient, indices, residual)
+            weights -= learning_rate * (gradient / len(y) + l2 * weights)
+
+        self.weights = weights.astype(np.float32)
+        return self
+
+    def save(self, path: str = None) -> None:
+        path = settings.PRECLASSIFIER_MODEL_FILE if path is None else path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        nonzero = np.flatnonzero(self.weights)
+        tmp_file = path + ".tmp.npz"
+        np.savez_compressed(tmp_file, indices=nonzero, values=self.weights[nonzero])
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path: str = None) -> "PreClassifier":
+        path = settings.PRECLASSIFIER_MODEL_FILE if path is None else path
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            weights = np.zeros(N_FEATURES, dtype=np.float32)
+            weights[data["indices"]] = data["values"]
+        return cls(weights)
+
+
+# --- Runtime state shared with ai_agent ---
+
+_model: Optional[PreClassifier] = None
+_model_lock = threading.Lock()
+_pending_labels: List[Dict] = []
+_stats = {"accepted": 0, "rejected": 0, "escalated": 0}
+_stats_lock = threading.Lock()
+
+
+def get_model() -> PreClassifier:
+    """Lazily load the trained model (an empty model escalates everything)"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = PreClassifier.load()
+                if _model.ready:
+                    print(f"[PreClassifier] Loaded model from {settings.PRECLASSIFIER_MODEL_FILE}")
+    return _model
+
+
+def score_batch(texts: Sequence[str]) -> np.ndarray:
+    return get_model().score_batch(texts)
+
+
+def decide(probability: float, threshold: float = None) -> Optional[bool]:
+    """
+    Local verdict for a score.
+
+    Decides locally when P(commission) >= threshold (accept) or
+    <= 1 - threshold (reject); threshold defaults to PRECLASSIFIER_CONFIDENCE.
+
+    Returns:
+        True (accept) / False (reject) when confident, None to escalate
+    """
+    if threshold is None:
+        threshold = settings.PRECLASSIFIER_CONFIDENCE
+    if not settings.PRECLASSIFIER_ENABLED or not get_model().ready:
+        decision = None
+    elif probability >= threshold:
+        decision = True
+    elif probability <= 1.0 - threshold:
+        decision = False
+    else:
+        decision = None
+
+    key = {True: "accepted", False: "rejected", None: "escalated"}[decision]
+    with _stats_lock:
+        _stats[key] += 1
+    return decision
+
+
+def record_label(text: str, is_commission: bool, confidence: float) -> None:
+    """Buffer an LLM verdict as future training data (written by flush_labels)"""
+    with _stats_lock:
+        _pending_labels.append({"text": text, "is_commission": bool(is_commission), "confidence": confidence})
+
+
+def flush_labels() -> None:
+    """Append buffered LLM verdicts to the labeled history file"""
+    with _stats_lock:
+        if not _pending_labels:
+            return
+        batch = list(_pending_labels)
+        _pending_labels.clear()
+
+    path = settings.PRECLASSIFIER_HISTORY_FILE
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in batch:
+                f.write(jsonio.dumps(record) + "\n")
+    except Exception as e:
+        print(f"[PreClassifier] ❌ Could not write labeled history: {e}")
+
+
+def stats(reset: bool = False) -> Dict[str, int]:
+    """Local accept/reject/escalate counts (accepted + rejected = LLM calls avoided)"""
+    with _stats_lock:
+        result = dict(_stats)
+        if reset:
+            for key in _stats:
+                _stats[key] = 0
+    return result
+
+
+# --- Training ---
+
+def load_training_data(posts_file: str = None, history_file: str = None) -> Tuple[List[str], List[bool]]:
+    """
+    Labeled texts from stored posts (LLM-approved) and the verdict history.
+    Later labels for the same text win.
+
+    Posts are read through storage.open_store, so every backend (JSON,
+    JSONL, SQLite) is covered; the backend follows `posts_file`'s
+    extension when one is given.
+    """
+    history_file = settings.PRECLASSIFIER_HISTORY_FILE if history_file is None else history_file
+    labeled: Dict[str, bool] = {}
+
+    if posts_file is None:
+        store = storage.open_store()
+    else:
+        backend = "sqlite" if posts_file.endswith((".db", ".sqlite", ".sqlite3")) else "json"
+        store = storage.open_store(backend, posts_file)
+    try:
+        for post in store.records():
+            ai = post.get("ai") or {}
+            text = (post.get("text") or "").strip()
+            if text and "is_commission" in ai:
+                labeled[text] = bool(ai["is_commission"])
+    finally:
+        store.close()
+
+    if os.path.exists(history_file):
+        with open(history_file, "rb") as f:
+            for line in f:
+                try:
+                    record = jsonio.loads(line)
+                except jsonio.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                text = (record.get("text") or "").strip()
+                if text:
+                    labeled[text] = bool(record.get("is_commission"))
+
+    return list(labeled), list(labeled.values())
+
+
+def train(model_file: str = None) -> Optional[PreClassifier]:
+    """Train on the labeled history and save the model"""
+    model_file = settings.PRECLASSIFIER_MODEL_FILE if model_file is None else model_file
+    texts, labels = load_training_data()
+    positives = sum(labels)
+    negatives = len(labels) - positives
+    print(f"[PreClassifier] Training on {len(labels)} posts ({positives} positive, {negatives} negative)")
+
+    if positives == 0 or negatives == 0:
+        print("[PreClassifier] ⚠️  Need both positive and negative examples, not training")
+        return None
+
+    model = PreClassifier().fit(texts, labels)
+    scores = model.score_batch(texts)
+    accuracy = float(np.mean((scores >= 0.5) == np.asarray(labels)))
+    model.save(model_file)
+    print(f"[PreClassifier] ✅ Saved model to {model_file} (training accuracy {accuracy:.1%})")
+    return model
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "train":
+        train()
+    else:
+        print(__doc__)
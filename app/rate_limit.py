@@ -0,0 +1,72 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Every request takes one token, so callers can burst up to `capacity`
+    requests and then settle at `rate` requests per second.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: Tokens added per second (sustained requests/sec)
+            capacity: Maximum burst size (defaults to `rate`)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available without blocking.
+
+        Returns:
+            0.0 on success, otherwise the seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            # Refilling starts at _last, which pause() may have pushed into the future
+            return (tokens - self._tokens) / self.rate + max(0.0, self._last - now)
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket and refill nothing for `seconds` (the server said to back off)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = 0.0
+            self._last = max(self._last, now + seconds)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until tokens are available, then take them.
+
+        Returns:
+            Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
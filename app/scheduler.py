@@ -8,42 +8,109 @@
 #         time.sleep(10)  # For testing purposes, sleep for 10 seconds instead of hours
 
 
+import threading
 import time
 from datetime import datetime
-# from .config import FETCH_INTERVAL_HOURS
-import os
-import dotenv
+from typing import Callable, Dict, Optional
+from .config import settings
+
+# Adaptive cadence: SCHEDULER_MIN_INTERVAL_MINUTES / SCHEDULER_MAX_INTERVAL_HOURS
+# bound the interval, SCHEDULER_BUSY_POSTS qualified posts per cycle counts as
+# busy (shorten) — a cycle with none counts as idle (lengthen)
+
+# Held while a cycle runs: a second trigger is skipped, never run concurrently
+_cycle_lock = threading.Lock()
+
+
+class AdaptiveInterval:
+    """
+    Cycle interval that follows post volume.
 
-# Load environment variables
-dotenv.load_dotenv()
+    Busy cycles (>= `busy_posts` qualified posts) halve the interval, idle
+    cycles (none) stretch it by half, and anything in between moves it
+    halfway back to the base interval. Always clamped to [minimum, maximum].
+    """
+
+    def __init__(self, base: float, minimum: float, maximum: float, busy_posts: int = None):
+        self.minimum = min(minimum, base)
+        self.maximum = max(maximum, base)
+        self.base = base
+        self.busy_posts = settings.SCHEDULER_BUSY_POSTS if busy_posts is None else busy_posts
+        self.seconds = base
+
+    def update(self, counts: Optional[Dict[str, int]]) -> float:
+        """Next interval in seconds given the finished cycle's counts (None = failed cycle)"""
+        if counts is None:
+            self.seconds = self.base
+        else:
+            qualified = counts.get("qualified", 0)
+            if qualified >= self.busy_posts:
+                self.seconds /= 2
+            elif qualified == 0:
+                self.seconds *= 1.5
+            else:
+                self.seconds += (self.base - self.seconds) / 2
+        self.seconds = max(self.minimum, min(self.maximum, self.seconds))
+        return self.seconds
+
+
+def run_cycle(task: Callable[[], Optional[Dict[str, int]]]) -> Optional[Dict[str, int]]:
+    """
+    Run one cycle unless another one is still in progress.
+
+    Returns:
+        The task's result, or None if the cycle was skipped
+    """
+    if not _cycle_lock.acquire(blocking=False):
+        print("[Scheduler] ⚠️  Previous cycle still running, skipping this trigger")
+        return None
+    try:
+        return task()
+    finally:
+        _cycle_lock.release()
+
+
+def _fmt(seconds: float) -> str:
+    return f"{seconds / 3600:.2f} hours" if seconds >= 3600 else f"{seconds / 60:.1f} minutes"
 
-# Load fetch interval from config or use default
-FETCH_INTERVAL_HOURS = int(os.getenv("FETCH_INTERVAL_HOURS"))
 
 def run_forever(task):
     """
-    Run the task continuously at the specified interval.
+    Run the task continuously on a fixed cadence.
+    
+    Cycles start `interval` seconds after the previous cycle *started*, so
+    the pipeline's own run time does not push the schedule back. A cycle
+    that overruns its slot is followed immediately by the next one (missed
+    slots are dropped, never queued or run in parallel). The interval
+    adapts to the qualified-post count the task returns.
     
     Args:
-        task: Function to execute on each cycle
+        task: Function to execute on each cycle (may return cycle counts)
     """
-    interval_seconds = FETCH_INTERVAL_HOURS * 3600
+    interval = AdaptiveInterval(
+        base=settings.FETCH_INTERVAL_HOURS * 3600,
+        minimum=settings.SCHEDULER_MIN_INTERVAL_MINUTES * 60,
+        maximum=settings.SCHEDULER_MAX_INTERVAL_HOURS * 3600,
+    )
     
     print(f"[Scheduler] Starting continuous operation")
-    print(f"[Scheduler] Interval: {FETCH_INTERVAL_HOURS} hours ({interval_seconds} seconds)")
+    print(f"[Scheduler] Interval: {settings.FETCH_INTERVAL_HOURS} hours ({interval.seconds:.0f} seconds), "
+          f"adapting between {_fmt(interval.minimum)} and {_fmt(interval.maximum)}")
     
     cycle_count = 0
     
     while True:
         cycle_count += 1
+        started = time.monotonic()
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         print(f"\n{'='*60}")
         print(f"[Scheduler] Cycle #{cycle_count} - {timestamp}")
         print(f"{'='*60}")
         
+        counts = None
         try:
-            task()
+            counts = run_cycle(task)
             print(f"[Scheduler] Cycle #{cycle_count} completed successfully")
         except KeyboardInterrupt:
             print("\n[Scheduler] Interrupted by user. Shutting down...")
@@ -52,10 +119,24 @@ def run_forever(task):
             print(f"[Scheduler] ERROR in cycle #{cycle_count}: {e}")
             print(f"[Scheduler] Continuing to next cycle...")
         
-        print(f"[Scheduler] Sleeping for {FETCH_INTERVAL_HOURS} hours...")
-        print(f"[Scheduler] Next run at: {datetime.fromtimestamp(time.time() + interval_seconds).strftime('%Y-%m-%d %H:%M:%S')}")
+        elapsed = time.monotonic() - started
+        seconds = interval.update(counts if isinstance(counts, dict) else None)
+        
+        # Fixed cadence from cycle start; skip slots the cycle overran
+        next_start = started + seconds
+        if next_start < time.monotonic():
+            print(f"[Scheduler] ⚠️  Cycle took {elapsed:.0f}s, longer than the {_fmt(seconds)} interval")
+            next_start = time.monotonic()
         
-        time.sleep(interval_seconds)
+        wait = next_start - time.monotonic()
+        print(f"[Scheduler] Cycle took {elapsed:.0f}s; next interval {_fmt(seconds)}")
+        print(f"[Scheduler] Next run at: {datetime.fromtimestamp(time.time() + wait).strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        try:
+            time.sleep(max(0.0, wait))
+        except KeyboardInterrupt:
+            print("\n[Scheduler] Interrupted by user. Shutting down...")
+            break
         # time.sleep(10)  # For testing purposes, sleep for 10 seconds instead of hours
 
 # Alternative: Use this for testing with shorter intervals
@@ -69,7 +150,7 @@ def run_forever_testing(task, test_interval_seconds=10):
         print(f"\n[Test Cycle #{cycle_count}] {datetime.now().strftime('%H:%M:%S')}")
         
         try:
-            task()
+            run_cycle(task)
         except KeyboardInterrupt:
             print("\n[Scheduler] Stopped by user")
             break
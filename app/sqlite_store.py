@@ -0,0 +1,202 @@
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .storage import (
+    MAX_STORAGE_AGE_DAYS,
+    MAX_STORAGE_SIZE,
+    PostStore,
+    load_data,
+    to_record,
+)
+from .models import Post
+from . import jsonio
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    url           TEXT NOT NULL,
+    content_hash  TEXT,
+    classified_at REAL,
+    data          TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_url ON posts (url);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_content_hash ON posts (content_hash);
+CREATE INDEX IF NOT EXISTS idx_posts_classified_at ON posts (classified_at);
+"""
+
+
+def _classified_at(post: Dict) -> Optional[float]:
+    """Epoch seconds of ai.timestamp (None if missing or unparseable)"""
+    timestamp_str = post.get("ai", {}).get("timestamp")
+    if not timestamp_str:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp_str.replace("Z", "+00:00")).timestamp()
+    except (ValueError, AttributeError):
+        return None
+
+
+class SqlitePostStore(PostStore):
+    """
+    SQLite storage engine (WAL mode).
+
+    Unique indexes on url and content_hash make dedup a single index
+    probe; the classified_at index serves recency queries, pruning and
+    export. The full post is kept as JSON in the `data` column. Posts from
+    `legacy_path` (a JSON array file) are imported into an empty database.
+    """
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None):
+        if not path.endswith(SQLITE_EXTENSIONS):
+            path = os.path.splitext(path)[0] + ".db"
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        if legacy_path and len(self) == 0 and os.path.exists(legacy_path):
+            legacy = load_data(legacy_path)
+            if legacy:
+                inserted = self.add_posts(legacy)
+                self._conn.commit()
+                print(f"[Storage] 🔁 Migrated {inserted} posts from {legacy_path} to {path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def is_duplicate(self, url: str, content_hash: Optional[str] = None) -> bool:
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM posts WHERE url = ?", (url,)).fetchone():
+                return True
+            if content_hash and self._conn.execute(
+                "SELECT 1 FROM posts WHERE content_hash = ?", (content_hash,)
+            ).fetchone():
+                print(f"[Storage] 🔍 Duplicate content detected (different URL)")
+                return True
+        return False
+
+    def _row(self, post) -> tuple:
+        post = to_record(post)
+        if "ai" not in post:
+            post["ai"] = {}
+        if "timestamp" not in post["ai"]:
+            post["ai"]["timestamp"] = datetime.now(timezone.utc).isoformat()
+        return (
+            post.get("url"),
+            post["ai"].get("content_hash"),
+            _classified_at(post),
+            jsonio.dumps(post),
+        )
+
+    def add_post(self, post: Post) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO posts (url, content_hash, classified_at, data) VALUES (?, ?, ?, ?)",
+                self._row(post),
+            )
+        if cursor.rowcount == 0:
+            print(f"[Storage] 🚫 Duplicate detected, skipping")
+            return False
+        return True
+
+    def add_posts(self, posts: Iterable) -> int:
+        """Bulk insert, skipping duplicates; returns rows inserted"""
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO posts (url, content_hash, classified_at, data) VALUES (?, ?, ?, ?)",
+                (row for row in map(self._row, posts) if row[0]),
+            )
+            return self._conn.total_changes - before
+
+    def compact(self, max_age_days: int = MAX_STORAGE_AGE_DAYS, max_size: int = MAX_STORAGE_SIZE) -> None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).timestamp()
+        with self._lock:
+            pruned = self._conn.execute(
+                "DELETE FROM posts WHERE classified_at < ?", (cutoff,)
+            ).rowcount
+
+            # Keep the newest `max_size` rows by insertion order
+            row = self._conn.execute(
+                "SELECT id FROM posts ORDER BY id DESC LIMIT 1 OFFSET ?", (max_size,)
+            ).fetchone()
+            trimmed = 0
+            if row:
+                trimmed = self._conn.execute("DELETE FROM posts WHERE id <= ?", (row[0],)).rowcount
+
+        if pruned > 0:
+            print(f"[Storage] 🗑️  Pruned {pruned} old posts (>{max_age_days} days)")
+        if trimmed > 0:
+            print(f"[Storage] ⚠️  Storage limit reached, removing {trimmed} oldest posts")
+
+    def get_recent_posts(self, hours: int = 24) -> List[Post]:
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours)).timestamp()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM posts WHERE classified_at >= ? ORDER BY classified_at", (cutoff,)
+            ).fetchall()
+        return [Post.from_dict(jsonio.loads(data)) for (data,) in rows]
+
+    def records(self) -> Iterator[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM posts ORDER BY id").fetchall()
+        for (data,) in rows:
+            yield jsonio.loads(data)
+
+    def save(self, new_posts: Optional[List[Post]] = None) -> None:
+        try:
+            with self._lock:
+                self._conn.commit()
+            print(f"[Storage] ✅ Committed {len(new_posts) if new_posts is not None else 'pending'} "
+                  f"new posts to {self.path}")
+        except sqlite3.Error as e:
+            print(f"[Storage] ❌ Error saving data: {e}")
+
+    def export_to_csv(self, output_file: str = "data/posts_export.csv") -> None:
+        try:
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+            count = 0
+            with self._lock, open(output_file, "w", newline="", encoding="utf-8") as f:
+                fieldnames = ["timestamp", "author", "url", "text", "is_commission", "confidence", "reason"]
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+
+                for (data,) in self._conn.execute("SELECT data FROM posts ORDER BY classified_at"):
+                    post = jsonio.loads(data)
+                    ai_data = post.get("ai", {})
+                    writer.writerow({
+                        "timestamp": ai_data.get("timestamp", ""),
+                        "author": post.get("author", ""),
+                        "url": post.get("web_url", post.get("url", "")),
+                        "text": post.get("text", "")[:500],
+                        "is_commission": ai_data.get("is_commission", False),
+                        "confidence": ai_data.get("confidence", 0.0),
+                        "reason": ai_data.get("reason", ""),
+                    })
+                    count += 1
+
+            print(f"[Storage] ✅ Exported {count} posts to {output_file}")
+
+        except Exception as e:
+            print(f"[Storage] ❌ Export failed: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
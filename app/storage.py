@@ -1,49 +1,106 @@
-import json
 import os
-from typing import List, Dict, Optional
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
 from datetime import datetime, timezone, timedelta
-# from .config import DATA_FILE
-import os
-import dotenv
-
-# Load environment variables
-dotenv.load_dotenv()
+from .config import settings
+from .jsonl_store import JsonlStore
+from . import jsonio
+from .models import Post, as_record
 
 # Configuration
 MAX_STORAGE_AGE_DAYS = 30  # Archive posts older than this
 MAX_STORAGE_SIZE = 10000    # Maximum posts to keep
 
-DATA_FILE = os.getenv("DATA_FILE", default="data/posts.json")
+# DATA_FILE picks the format: posts.json (JSON array), posts.jsonl (append-only
+# JSON Lines, migrating LEGACY_DATA_FILE on first run) or posts.db, which
+# selects STORAGE_BACKEND=sqlite unless it is set explicitly
+
+_jsonl_stores: Dict[str, JsonlStore] = {}
+
 
-def load_data() -> List[Dict]:
-    """Load stored posts from JSON file"""
-    if not os.path.exists(DATA_FILE):
+def _jsonl_store_for(path: str) -> Optional[JsonlStore]:
+    """JSONL log for `path`, or None when `path` is a plain JSON file"""
+    if not path.endswith(".jsonl"):
+        return None
+    store = _jsonl_stores.get(path)
+    if store is None:
+        legacy = settings.LEGACY_DATA_FILE if path == settings.DATA_FILE else os.path.splitext(path)[0] + ".json"
+        store = _jsonl_stores[path] = JsonlStore(path, legacy_path=legacy)
+    return store
+
+
+class DedupIndex:
+    """
+    Hash-set index over stored post URLs and content hashes.
+    
+    Gives constant-time duplicate checks regardless of store size. Build it
+    once after loading and keep it in sync through add_post() and pruning.
+    """
+    
+    def __init__(self, posts: Iterable[Dict] = ()):
+        self.urls = set()
+        self.hashes = set()
+        for post in posts:
+            self.add(post)
+    
+    def __len__(self) -> int:
+        return len(self.urls)
+    
+    def add(self, post: Dict) -> None:
+        url = post.get("url")
+        if url:
+            self.urls.add(url)
+        content_hash = post.get("ai", {}).get("content_hash")
+        if content_hash:
+            self.hashes.add(content_hash)
+    
+    def discard(self, post: Dict) -> None:
+        self.urls.discard(post.get("url"))
+        self.hashes.discard(post.get("ai", {}).get("content_hash"))
+    
+    def contains(self, url: Optional[str], content_hash: Optional[str] = None) -> bool:
+        if url in self.urls:
+            return True
+        if content_hash and content_hash in self.hashes:
+            print(f"[Storage] 🔍 Duplicate content detected (different URL)")
+            return True
+        return False
+
+def load_data(data_file: Optional[str] = None) -> List[Dict]:
+    """Load stored posts from JSON file (or replay the JSONL log)"""
+    path = data_file or settings.DATA_FILE
+    jsonl_store = _jsonl_store_for(path)
+    if jsonl_store is not None:
+        try:
+            return jsonl_store.load()
+        except Exception as e:
+            print(f"[Storage] ❌ Unexpected error loading data: {e}")
+            return []
+    
+    if not os.path.exists(path):
         return []
 
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            
-            if not content:
-                return []
-            
-            data = json.loads(content)
-            
-            # Validate data structure
-            if not isinstance(data, list):
-                print("[Storage] Warning: Invalid data structure, resetting")
-                return []
-            
-            return data
+        data = jsonio.read_file(path)
+        
+        if data is None:
+            return []
+        
+        # Validate data structure
+        if not isinstance(data, list):
+            print("[Storage] Warning: Invalid data structure, resetting")
+            return []
+        
+        return data
 
-    except json.JSONDecodeError as e:
+    except jsonio.JSONDecodeError as e:
         print(f"[Storage] ❌ Invalid JSON detected: {e}")
         print("[Storage] Creating backup and resetting storage")
         
         # Backup corrupted file
-        if os.path.exists(DATA_FILE):
-            backup_path = f"{DATA_FILE}.backup.{int(datetime.now().timestamp())}"
-            os.rename(DATA_FILE, backup_path)
+        if os.path.exists(path):
+            backup_path = f"{path}.backup.{int(datetime.now().timestamp())}"
+            os.rename(path, backup_path)
             print(f"[Storage] Corrupted file backed up to: {backup_path}")
         
         return []
@@ -53,19 +110,43 @@ def load_data() -> List[Dict]:
         return []
 
 
-def save_data(data: List[Dict]) -> None:
-    """Save posts to JSON file with atomic write"""
+def load_data_with_index(data_file: Optional[str] = None) -> Tuple[List[Dict], DedupIndex]:
+    """Load stored posts and build their dedup index in one pass"""
+    posts = load_data(data_file)
+    return posts, DedupIndex(posts)
+
+
+def save_data(data: List[Dict], new_posts: Optional[List[Dict]] = None,
+              data_file: Optional[str] = None) -> None:
+    """
+    Save posts to JSON file with atomic write
+    
+    With the JSONL backend only `new_posts` (plus tombstones for posts
+    dropped since the last save) are appended; without `new_posts` the
+    whole log is rewritten.
+    
+    Args:
+        data: All stored posts
+        new_posts: Posts added during this cycle
+        data_file: Target file (defaults to DATA_FILE)
+    """
+    path = data_file or settings.DATA_FILE
+    jsonl_store = _jsonl_store_for(path)
+    if jsonl_store is not None:
+        try:
+            if new_posts is None:
+                jsonl_store.rewrite(data)
+                print(f"[Storage] ✅ Saved {len(data)} posts")
+            else:
+                jsonl_store.append(data, new_posts)
+        except Exception as e:
+            print(f"[Storage] ❌ Error saving data: {e}")
+        return
+    
     try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-        
-        # Write to temporary file first (atomic operation)
-        tmp_file = DATA_FILE + ".tmp"
-        with open(tmp_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        # Atomic replace (safe on crashes)
-        os.replace(tmp_file, DATA_FILE)
+        # Temporary file + atomic replace (safe on crashes);
+        # indented unless JSON_COMPACT is set
+        jsonio.write_file(path, data)
         
         print(f"[Storage] ✅ Saved {len(data)} posts")
         
@@ -73,7 +154,8 @@ def save_data(data: List[Dict]) -> None:
         print(f"[Storage] ❌ Error saving data: {e}")
 
 
-def is_duplicate(posts: List[Dict], url: str, content_hash: Optional[str] = None) -> bool:
+def is_duplicate(posts: List[Dict], url: str, content_hash: Optional[str] = None,
+                 index: Optional[DedupIndex] = None) -> bool:
     """
     Check if post is duplicate using URL and/or content hash
     
@@ -81,10 +163,14 @@ def is_duplicate(posts: List[Dict], url: str, content_hash: Optional[str] = None
         posts: List of stored posts
         url: Post URL
         content_hash: SHA-256 hash of post content (optional but recommended)
+        index: Dedup index for `posts` (O(1) lookup instead of a list scan)
     
     Returns:
         True if duplicate found, False otherwise
     """
+    if index is not None:
+        return index.contains(url, content_hash)
+    
     for post in posts:
         # Check URL match (exact)
         if post.get("url") == url:
@@ -98,13 +184,15 @@ def is_duplicate(posts: List[Dict], url: str, content_hash: Optional[str] = None
     return False
 
 
-def prune_old_posts(posts: List[Dict], max_age_days: int = MAX_STORAGE_AGE_DAYS) -> List[Dict]:
+def prune_old_posts(posts: List[Dict], max_age_days: int = MAX_STORAGE_AGE_DAYS,
+                    index: Optional[DedupIndex] = None) -> List[Dict]:
     """
     Remove posts older than max_age_days
     
     Args:
         posts: List of posts
         max_age_days: Maximum age in days
+        index: Dedup index to keep in sync with removed posts
     
     Returns:
         Filtered list of recent posts
@@ -128,6 +216,8 @@ def prune_old_posts(posts: List[Dict], max_age_days: int = MAX_STORAGE_AGE_DAYS)
                 post_date = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
                 if post_date >= cutoff_date:
                     recent_posts.append(post)
+                elif index is not None:
+                    index.discard(post)
             except (ValueError, AttributeError):
                 # Keep post if timestamp parsing fails (assume recent)
                 recent_posts.append(post)
@@ -142,13 +232,15 @@ def prune_old_posts(posts: List[Dict], max_age_days: int = MAX_STORAGE_AGE_DAYS)
     return recent_posts
 
 
-def limit_storage_size(posts: List[Dict], max_size: int = MAX_STORAGE_SIZE) -> List[Dict]:
+def limit_storage_size(posts: List[Dict], max_size: int = MAX_STORAGE_SIZE,
+                       index: Optional[DedupIndex] = None) -> List[Dict]:
     """
     Limit storage to most recent N posts
     
     Args:
         posts: List of posts
         max_size: Maximum number of posts to keep
+        index: Dedup index to keep in sync with removed posts
     
     Returns:
         List limited to max_size most recent posts
@@ -161,16 +253,80 @@ def limit_storage_size(posts: List[Dict], max_size: int = MAX_STORAGE_SIZE) -> L
     removed_count = len(posts) - max_size
     print(f"[Storage] ⚠️  Storage limit reached, removing {removed_count} oldest posts")
     
+    if index is not None:
+        for post in posts[:removed_count]:
+            index.discard(post)
+    
     return posts[-max_size:]
 
 
-def add_post(posts: List[Dict], new_post: Dict) -> List[Dict]:
+def _post_timestamp(post: Dict) -> Optional[datetime]:
+    timestamp_str = post.get("ai", {}).get("timestamp")
+    if not timestamp_str:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+
+
+def compact_posts(posts: List[Dict], index: Optional[DedupIndex] = None,
+                  max_age_days: int = MAX_STORAGE_AGE_DAYS,
+                  max_size: int = MAX_STORAGE_SIZE) -> List[Dict]:
     """
-    Add new post with automatic deduplication and pruning
+    Expire old posts and enforce the size limit in one pass per cycle
+    
+    Posts are appended in classification order, so `ai.timestamp` grows
+    along the list. Expiry walks from the old end and stops at the first
+    post inside the window, so only expired posts get parsed. Posts without
+    a usable timestamp skip the age check and stay where they are, as in
+    prune_old_posts(); the size limit then drops the oldest positions.
+    
+    Args:
+        posts: List of posts (oldest first)
+        index: Dedup index to keep in sync with removed posts
+        max_age_days: Maximum age in days
+        max_size: Maximum number of posts to keep
+    
+    Returns:
+        Compacted list of posts
+    """
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+    
+    kept = []
+    pruned_count = 0
+    stop = len(posts)
+    
+    for position, post in enumerate(posts):
+        post_date = _post_timestamp(post)
+        if post_date is None:
+            kept.append(post)
+            continue
+        if post_date >= cutoff_date:
+            stop = position
+            break
+        pruned_count += 1
+        if index is not None:
+            index.discard(post)
+    
+    if pruned_count > 0:
+        print(f"[Storage] 🗑️  Pruned {pruned_count} old posts (>{max_age_days} days)")
+    
+    kept.extend(posts[stop:])
+    return limit_storage_size(kept, max_size, index=index)
+
+
+def add_post(posts: List[Dict], new_post: Dict, index: Optional[DedupIndex] = None) -> List[Dict]:
+    """
+    Append new post with automatic deduplication
+    
+    Insertion is append-only; run compact_posts() once at the end of the
+    cycle to expire old posts and enforce the size limit.
     
     Args:
         posts: Existing posts
         new_post: New post to add
+        index: Dedup index for `posts`, updated with the new post
     
     Returns:
         Updated posts list
@@ -186,18 +342,14 @@ def add_post(posts: List[Dict], new_post: Dict) -> List[Dict]:
     url = new_post.get("url")
     content_hash = new_post.get("ai", {}).get("content_hash")
     
-    if is_duplicate(posts, url, content_hash):
+    if is_duplicate(posts, url, content_hash, index=index):
         print(f"[Storage] 🚫 Duplicate detected, skipping")
         return posts
     
     # Add post
     posts.append(new_post)
-    
-    # Prune old posts
-    posts = prune_old_posts(posts)
-    
-    # Limit storage size
-    posts = limit_storage_size(posts)
+    if index is not None:
+        index.add(new_post)
     
     return posts
 
@@ -266,4 +418,113 @@ def export_to_csv(posts: List[Dict], output_file: str = "data/posts_export.csv")
         print(f"[Storage] ✅ Exported {len(posts)} posts to {output_file}")
         
     except Exception as e:
-        print(f"[Storage] ❌ Export failed: {e}")
\ No newline at end of file
+        print(f"[Storage] ❌ Export failed: {e}")
+
+def to_record(post: Union[Post, Dict]) -> Dict:
+    """Stored layout of a post, stamping the classification time on the Post itself"""
+    if isinstance(post, Post) and post.ai is not None and post.ai.timestamp is None:
+        post.ai.timestamp = datetime.now(timezone.utc).isoformat()
+    return as_record(post)
+
+
+class PostStore(ABC):
+    """
+    Storage engine interface used by the pipeline.
+    
+    Implementations: JsonPostStore (posts.json / posts.jsonl, in-memory list)
+    and SqlitePostStore (indexed SQLite database, see sqlite_store.py).
+    """
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+    
+    @abstractmethod
+    def is_duplicate(self, url: str, content_hash: Optional[str] = None) -> bool:
+        ...
+    
+    @abstractmethod
+    def add_post(self, post: Post) -> bool:
+        """Insert a post; returns False if it was a duplicate"""
+    
+    @abstractmethod
+    def compact(self, max_age_days: int = MAX_STORAGE_AGE_DAYS, max_size: int = MAX_STORAGE_SIZE) -> None:
+        """Expire old posts and enforce the size limit"""
+    
+    @abstractmethod
+    def get_recent_posts(self, hours: int = 24) -> List[Post]:
+        ...
+    
+    @abstractmethod
+    def records(self) -> Iterator[Dict]:
+        """Every stored post in its stored layout, oldest first"""
+    
+    @abstractmethod
+    def save(self, new_posts: Optional[List[Post]] = None) -> None:
+        """Persist changes made this cycle"""
+    
+    @abstractmethod
+    def export_to_csv(self, output_file: str = "data/posts_export.csv") -> None:
+        ...
+    
+    def close(self) -> None:
+        pass
+
+
+class JsonPostStore(PostStore):
+    """JSON / JSONL file backend: posts live in a list with a DedupIndex"""
+    
+    def __init__(self, data_file: Optional[str] = None):
+        self.data_file = data_file or settings.DATA_FILE
+        self.posts, self.index = load_data_with_index(self.data_file)
+    
+    def __len__(self) -> int:
+        return len(self.posts)
+    
+    def is_duplicate(self, url: str, content_hash: Optional[str] = None) -> bool:
+        return self.index.contains(url, content_hash)
+    
+    def add_post(self, post: Post) -> bool:
+        before = len(self.posts)
+        self.posts = add_post(self.posts, to_record(post), index=self.index)
+        return len(self.posts) > before
+    
+    def compact(self, max_age_days: int = MAX_STORAGE_AGE_DAYS, max_size: int = MAX_STORAGE_SIZE) -> None:
+        self.posts = compact_posts(self.posts, index=self.index, max_age_days=max_age_days, max_size=max_size)
+    
+    def get_recent_posts(self, hours: int = 24) -> List[Post]:
+        return [Post.from_dict(post) for post in get_recent_posts(self.posts, hours)]
+    
+    def records(self) -> Iterator[Dict]:
+        return iter(list(self.posts))
+    
+    def save(self, new_posts: Optional[List[Post]] = None) -> None:
+        if new_posts is not None:
+            new_posts = [to_record(post) for post in new_posts]
+        save_data(self.posts, new_posts=new_posts, data_file=self.data_file)
+    
+    def export_to_csv(self, output_file: str = "data/posts_export.csv") -> None:
+        export_to_csv(self.posts, output_file)
+
+
+def open_store(backend: Optional[str] = None, data_file: Optional[str] = None) -> PostStore:
+    """
+    Open the configured storage engine
+    
+    Args:
+        backend: "json" or "sqlite" (defaults to STORAGE_BACKEND)
+        data_file: Storage path (defaults to DATA_FILE)
+    
+    Returns:
+        PostStore instance with existing posts available
+    """
+    backend = (backend or settings.STORAGE_BACKEND).lower()
+    
+    if backend == "sqlite":
+        from .sqlite_store import SqlitePostStore
+        return SqlitePostStore(data_file or settings.DATA_FILE, legacy_path=settings.LEGACY_DATA_FILE)
+    
+    if backend != "json":
+        print(f"[Storage] Unknown STORAGE_BACKEND '{backend}', using json")
+    
+    return JsonPostStore(data_file)
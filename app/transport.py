@@ -0,0 +1,200 @@
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import settings
+
+# Sessions are sized by HTTP_POOL_CONNECTIONS / HTTP_POOL_MAXSIZE; requests use
+# the host's HTTP_TIMEOUTS entry, else HTTP_DEFAULT_TIMEOUT. Groq clients get
+# GROQ_MAX_RETRIES SDK-level retries (0 lets the key pool move a 429 to
+# another key at once).
+
+
+def _parse_timeouts(spec: str) -> Dict[str, float]:
+    timeouts = {}
+    for item in spec.split(","):
+        host, _, value = item.partition("=")
+        if host.strip() and value.strip():
+            try:
+                timeouts[host.strip().lower()] = float(value)
+            except ValueError:
+                print(f"[Transport] Ignoring invalid timeout entry: {item!r}")
+    return timeouts
+
+
+_host_timeouts: Optional[Dict[str, float]] = None
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# Counter snapshot taken at the last report, so stats can be shown per cycle
+_last_snapshot: Dict[str, Dict[str, int]] = {}
+
+_groq_clients: Dict[str, object] = {}
+_groq_lock = threading.Lock()
+_groq_stats = {"created": 0, "reused": 0}
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).netloc or "").lower()
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Return the pooled keep-alive session for the host of `url`.
+
+    Args:
+        url: Any URL on the target host
+
+    Returns:
+        Shared requests.Session for that host
+    """
+    host = _host(url)
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def timeout_for(url: str) -> float:
+    """Configured timeout for the host of `url`"""
+    global _host_timeouts
+    if _host_timeouts is None:
+        _host_timeouts = _parse_timeouts(settings.HTTP_TIMEOUTS)
+    return _host_timeouts.get(_host(url), settings.HTTP_DEFAULT_TIMEOUT)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request through the host's pooled session.
+
+    Args:
+        method: HTTP method
+        url: Target URL
+        **kwargs: Passed to requests (timeout defaults to the host's timeout)
+
+    Returns:
+        requests.Response
+    """
+    kwargs.setdefault("timeout", timeout_for(url))
+    return get_session(url).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def get_groq_client(api_key: str):
+    """
+    Return one cached Groq client per API key (keeps its HTTP pool warm).
+
+    Args:
+        api_key: Groq API key
+
+    Returns:
+        groq.Groq client
+    """
+    client = _groq_clients.get(api_key)
+    if client is not None:
+        with _groq_lock:
+            _groq_stats["reused"] += 1
+        return client
+
+    with _groq_lock:
+        client = _groq_clients.get(api_key)
+        if client is None:
+            # The SDK is heavy to import, so it is only loaded for the first client
+            from groq import Groq
+            client = Groq(api_key=api_key, max_retries=settings.GROQ_MAX_RETRIES)
+            _groq_clients[api_key] = client
+            _groq_stats["created"] += 1
+        else:
+            _groq_stats["reused"] += 1
+    return client
+
+
+def _pool_counters() -> Dict[str, Dict[str, int]]:
+    """Cumulative urllib3 request/connection counters per host"""
+    counters = {}
+    for host, session in list(_sessions.items()):
+        requests_sent = 0
+        connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        counters[host] = {"requests": requests_sent, "connections": connections}
+    return counters
+
+
+def connection_stats(reset: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Connection reuse counters since the last reset.
+
+    Args:
+        reset: Start a new measurement window after reading
+
+    Returns:
+        {host: {"requests", "connections", "reused"}} plus a "groq" entry
+        counting cached client hits
+    """
+    global _last_snapshot
+
+    current = _pool_counters()
+    stats = {}
+    for host, counts in current.items():
+        previous = _last_snapshot.get(host, {"requests": 0, "connections": 0})
+        sent = counts["requests"] - previous["requests"]
+        opened = counts["connections"] - previous["connections"]
+        stats[host] = {"requests": sent, "connections": opened, "reused": max(0, sent - opened)}
+
+    with _groq_lock:
+        stats["groq"] = {
+            "clients": len(_groq_clients),
+            "created": _groq_stats["created"],
+            "reused": _groq_stats["reused"],
+        }
+        if reset:
+            _groq_stats["created"] = 0
+            _groq_stats["reused"] = 0
+
+    if reset:
+        _last_snapshot = current
+
+    return stats
+
+
+def print_connection_stats(reset: bool = True) -> Optional[Dict[str, Dict[str, int]]]:
+    """Print per-host connection reuse for the current cycle"""
+    stats = connection_stats(reset=reset)
+    for host, counts in stats.items():
+        if host == "groq":
+            print(f"[Transport] groq: {counts['clients']} client(s), "
+                  f"{counts['created']} created, {counts['reused']} reused")
+        elif counts["requests"]:
+            print(f"[Transport] {host}: {counts['requests']} requests over "
+                  f"{counts['connections']} new connection(s) ({counts['reused']} reused)")
+    return stats
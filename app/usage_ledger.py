@@ -0,0 +1,160 @@
+import atexit
+import datetime
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, Optional
+from .config import settings
+
+_KEY_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+
+# Ceiling on the retry delay after failed writes
+MAX_FLUSH_BACKOFF_SECONDS = 300.0
+
+
+def _write_atomic(path: str, content: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_file, path)
+
+
+class UsageLedger:
+    """
+    In-memory daily token usage per (anonymised) API key.
+
+    Both files are read once at construction. `add()` and `reset_if_new_day()`
+    only touch memory; changes are written by a debounced background flush
+    `flush_interval` seconds after the first unsaved change, and once more at
+    interpreter exit. Writes are atomic (temp file + replace); a failed write
+    keeps the changes and retries with exponential backoff (capped at
+    MAX_FLUSH_BACKOFF_SECONDS).
+    """
+
+    def __init__(self, usage_file: str, reset_file: str, key_ids: Iterable[str] = (),
+                 anonymize: Optional[Callable[[str], str]] = None,
+                 flush_interval: float = None):
+        self.usage_file = usage_file
+        self.reset_file = reset_file
+        # Seconds between a usage change and its write to disk
+        self.flush_interval = settings.USAGE_FLUSH_SECONDS if flush_interval is None else flush_interval
+        self._usage: Dict[str, int] = {key_id: 0 for key_id in key_ids}
+        self._reset_date: Optional[str] = None
+        self._dirty = False
+        self._reset_dirty = False
+        self._timer: Optional[threading.Timer] = None
+        # Consecutive failed writes, for the retry backoff
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+        self._load(anonymize)
+        atexit.register(self.flush)
+
+    def _load(self, anonymize: Optional[Callable[[str], str]]) -> None:
+        if os.path.exists(self.usage_file):
+            try:
+                with open(self.usage_file, "r", encoding="utf-8") as f:
+                    raw_usage = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[AI] ❌ Could not read {self.usage_file}: {e}, starting from zero")
+                raw_usage = {}
+
+            for key, used in raw_usage.items() if isinstance(raw_usage, dict) else ():
+                if not key or not isinstance(used, int):
+                    continue
+                # Old files stored full keys: migrate them to their anonymised id once
+                if not _KEY_ID_RE.match(key):
+                    if anonymize is None:
+                        continue
+                    key = anonymize(key)
+                    self._dirty = True
+                self._usage[key] = self._usage.get(key, 0) + used
+
+        if os.path.exists(self.reset_file):
+            try:
+                with open(self.reset_file, "r", encoding="utf-8") as f:
+                    self._reset_date = f.read().strip() or None
+            except OSError:
+                self._reset_date = None
+
+    def used(self, key_id: str) -> int:
+        return self._usage.get(key_id, 0)
+
+    def add(self, key_id: str, tokens: int) -> int:
+        """Record `tokens` for a key; returns the key's new daily total"""
+        with self._lock:
+            total = self._usage.get(key_id, 0) + tokens
+            self._usage[key_id] = total
+            self._mark_dirty()
+        return total
+
+    def reset_if_new_day(self) -> bool:
+        """Zero all counters on the first call of a new day (cached date, no file I/O)"""
+        today = datetime.date.today().isoformat()
+        if self._reset_date == today:
+            return False
+        with self._lock:
+            if self._reset_date == today:
+                return False
+            for key_id in self._usage:
+                self._usage[key_id] = 0
+            self._reset_date = today
+            self._reset_dirty = True
+            self._mark_dirty()
+        print("[AI] Daily API usage reset.")
+        return True
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._usage)
+
+    def _mark_dirty(self) -> None:
+        # Caller holds the lock
+        self._dirty = True
+        if self._timer is None:
+            self._schedule(self.flush_interval)
+
+    def _schedule(self, delay: float) -> None:
+        # Caller holds the lock
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        """Write pending changes now (atomic replace)"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                usage = dict(self._usage)
+                reset_date = self._reset_date if self._reset_dirty else None
+                self._dirty = False
+                self._reset_dirty = False
+
+            try:
+                _write_atomic(self.usage_file, json.dumps(usage, indent=2))
+                if reset_date is not None:
+                    _write_atomic(self.reset_file, reset_date)
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                    self._reset_dirty = self._reset_dirty or reset_date is not None
+                    self._failures += 1
+                    delay = min(max(self.flush_interval, 1.0) * 2 ** (self._failures - 1),
+                                MAX_FLUSH_BACKOFF_SECONDS)
+                    # Nothing else would write these changes before exit
+                    self._schedule(delay)
+                print(f"[AI] ❌ Error saving API usage: {e}, retrying in {delay:.0f}s")
+                return
+            with self._lock:
+                self._failures = 0
@@ -0,0 +1,199 @@
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketClosed(Exception):
+    """The connection was closed by the server or dropped"""
+
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept value for a Sec-WebSocket-Key (RFC 6455 §4.2.2)"""
+    digest = hashlib.sha1((key + _GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """One final frame; clients must mask, servers must not"""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = bytes(b ^ key[i & 3] for i, b in enumerate(payload))
+    return bytes(header) + payload
+
+
+class WebSocket:
+    """
+    Minimal blocking WebSocket client (RFC 6455), enough for Jetstream.
+
+    Text and binary messages are returned whole (fragments are joined),
+    pings are answered and a close frame raises WebSocketClosed. No
+    extensions are negotiated, so permessage-deflate is never used.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._buffer = bytearray()
+        self.closed = False
+
+    @classmethod
+    def connect(cls, url: str, timeout: float = 30.0,
+                headers: Optional[Dict[str, str]] = None) -> "WebSocket":
+        """
+        Open a ws:// or wss:// connection and complete the handshake.
+
+        Args:
+            url: Endpoint including path and query string
+            timeout: Connect/handshake timeout and read timeout afterwards
+            headers: Extra request headers (e.g. User-Agent)
+        """
+        parsed = urlparse(url)
+        secure = parsed.scheme == "wss"
+        host = parsed.hostname
+        port = parsed.port or (443 if secure else 80)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+
+        sock = socket.create_connection((host, port), timeout=timeout)
+        try:
+            if secure:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            key = base64.b64encode(os.urandom(16)).decode("ascii")
+            lines = [
+                f"GET {path} HTTP/1.1",
+                f"Host: {host}" if parsed.port is None else f"Host: {host}:{port}",
+                "Upgrade: websocket",
+                "Connection: Upgrade",
+                f"Sec-WebSocket-Key: {key}",
+                "Sec-WebSocket-Version: 13",
+            ]
+            lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+            sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("ascii"))
+
+            ws = cls(sock)
+            response = ws._read_until(b"\r\n\r\n").decode("latin-1")
+            status_line, *header_lines = response.split("\r\n")
+            if " 101 " not in status_line + " ":
+                raise WebSocketClosed(f"Handshake failed: {status_line}")
+            received = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                received[name.strip().lower()] = value.strip()
+            if received.get("sec-websocket-accept") != accept_key(key):
+                raise WebSocketClosed("Handshake failed: bad Sec-WebSocket-Accept")
+            return ws
+        except Exception:
+            sock.close()
+            raise
+
+    def _read_exact(self, count: int) -> bytes:
+        while len(self._buffer) < count:
+            chunk = self._sock.recv(max(65536, count - len(self._buffer)))
+            if not chunk:
+                self.closed = True
+                raise WebSocketClosed("Connection dropped")
+            self._buffer += chunk
+        data = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        return data
+
+    def _read_until(self, marker: bytes) -> bytes:
+        while marker not in self._buffer:
+            chunk = self._sock.recv(4096)
+            if not chunk:
+                raise WebSocketClosed("Connection dropped during handshake")
+            self._buffer += chunk
+        end = self._buffer.index(marker) + len(marker)
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+    def _read_frame(self):
+        first, second = self._read_exact(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read_exact(8))[0]
+        key = self._read_exact(4) if second & 0x80 else None
+        payload = self._read_exact(length)
+        if key:
+            payload = bytes(b ^ key[i & 3] for i, b in enumerate(payload))
+        return bool(first & 0x80), first & 0x0F, payload
+
+    def recv(self) -> Union[str, bytes]:
+        """Next text (str) or binary (bytes) message; blocks until one arrives"""
+        opcode, data = self._recv_message()
+        return data.decode("utf-8") if opcode == OP_TEXT else data
+
+    def recv_bytes(self) -> bytes:
+        """Next message's raw payload, text messages left undecoded"""
+        return self._recv_message()[1]
+
+    def _recv_message(self) -> Tuple[int, bytes]:
+        opcode = None
+        parts = []
+        while True:
+            final, frame_op, payload = self._read_frame()
+            if frame_op == OP_PING:
+                self._send(OP_PONG, payload)
+                continue
+            if frame_op == OP_PONG:
+                continue
+            if frame_op == OP_CLOSE:
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else None
+                self.close()
+                raise WebSocketClosed(f"Closed by server (code {code})")
+            if frame_op != OP_CONTINUATION:
+                opcode = frame_op
+            parts.append(payload)
+            if final:
+                return opcode, b"".join(parts)
+
+    def _send(self, opcode: int, payload: bytes) -> None:
+        self._sock.sendall(encode_frame(opcode, payload, mask=True))
+
+    def send(self, message: Union[str, bytes]) -> None:
+        if isinstance(message, str):
+            self._send(OP_TEXT, message.encode("utf-8"))
+        else:
+            self._send(OP_BINARY, message)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send(OP_CLOSE, struct.pack("!H", 1000))
+        except OSError:
+            pass
+        try:
+            self._sock.close()
+        except OSError:
+            pass
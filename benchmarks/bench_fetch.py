@@ -0,0 +1,108 @@
+"""
+Benchmark the keyword sweep against a local searchPosts stub.
+
+Usage:
+    python -m benchmarks.bench_fetch [--keywords N] [workers ...]
+
+First runs the old sequential sweep (one keyword at a time, fixed 0.5 s
+sleeps between pages and 1.5 s between keywords), then the concurrent
+sweep at each worker count under explicit rate limits:
+
+    production   BLUESKY_RATE_LIMIT=8     BLUESKY_RATE_BURST=10
+    unthrottled  BLUESKY_RATE_LIMIT=1000  BLUESKY_RATE_BURST=1000
+
+The production rows show what the limiter allows; the unthrottled rows
+show how far the worker pool itself scales. The baseline really sleeps,
+so only the first N keywords are swept (default 24).
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from app import bluesky, jsonio, transport
+from app.config import settings
+from app.keywords import KEYWORDS
+from .stub_servers import BlueSkyStub
+
+# (name, BLUESKY_RATE_LIMIT, BLUESKY_RATE_BURST)
+SCENARIOS = [
+    ("production", 8.0, 10.0),
+    ("unthrottled", 1000.0, 1000.0),
+]
+
+# The sleeps the sweep used before the worker pool and token bucket
+PAGE_SLEEP = 0.5
+KEYWORD_SLEEP = 1.5
+
+
+def sequential_sleep_sweep(keywords):
+    """The old sweep: one keyword at a time with fixed sleeps between requests"""
+    for index, keyword in enumerate(keywords):
+        if index:
+            time.sleep(KEYWORD_SLEEP)
+        cursor = None
+        while True:
+            params = {"q": keyword, "limit": 100, "sort": "latest", "lang": "en"}
+            if cursor:
+                params["cursor"] = cursor
+            data = jsonio.loads(transport.get(settings.BLUESKY_API_URL, params=params).content)
+            cursor = data.get("cursor")
+            if not data.get("posts") or not cursor:
+                break
+            time.sleep(PAGE_SLEEP)
+
+
+def use_rate_limit(rate: float, burst: float) -> None:
+    os.environ["BLUESKY_RATE_LIMIT"] = str(rate)
+    os.environ["BLUESKY_RATE_BURST"] = str(burst)
+    settings.reload()
+    bluesky.reset_rate_limiter()
+
+
+def main():
+    args = sys.argv[1:]
+    keyword_count = 24
+    if args[:1] == ["--keywords"]:
+        keyword_count = int(args[1])
+        args = args[2:]
+    workers_list = [int(w) for w in args] or [1, 4, 8, 16]
+    keywords = KEYWORDS[:keyword_count]
+    since = datetime.now(timezone.utc) - timedelta(hours=2)
+
+    stub = BlueSkyStub(posts_per_keyword=150, latency=0.05, shared_every=3).start()
+    try:
+        os.environ["BLUESKY_API_URL"] = stub.url
+        settings.reload()
+
+        print(f"{len(keywords)} keywords, {stub.latency * 1000:.0f} ms stub latency\n")
+        print(f"{'scenario':<12} {'rate':>6} {'burst':>6} {'workers':>8} {'seconds':>8} "
+              f"{'requests':>9} {'posts':>6} {'speedup':>8}")
+
+        stub.request_count = 0
+        started = time.perf_counter()
+        sequential_sleep_sweep(keywords)
+        baseline = time.perf_counter() - started
+        print(f"{'sequential':<12} {'-':>6} {'-':>6} {1:>8} {baseline:>8.2f} "
+              f"{stub.request_count:>9} {'-':>6} {1:>7.1f}x")
+
+        for name, rate, burst in SCENARIOS:
+            for workers in workers_list:
+                # Fresh bucket per run so every run starts with a full burst
+                use_rate_limit(rate, burst)
+                stub.request_count = 0
+                started = time.perf_counter()
+                # Silence the per-keyword merge report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    posts = bluesky.fetch_all_since_timestamp(keywords, since, max_workers=workers)
+                elapsed = time.perf_counter() - started
+                print(f"{name:<12} {rate:>6g} {burst:>6g} {workers:>8} {elapsed:>8.2f} "
+                      f"{stub.request_count:>9} {len(posts):>6} {baseline / elapsed:>7.1f}x")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Replay Jetstream events through JetstreamConsumer and time how long a
+matching post takes to reach the pipeline.
+
+Usage:
+    python -m benchmarks.bench_jetstream [recording.jsonl] [rate]
+
+Without a recording, 20000 synthetic events (1 in 50 a commission
+request) are replayed. `rate` is events per second (default: 2000, about
+live firehose volume for posts; 0 = as fast as possible).
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from app.bluesky import JetstreamConsumer
+from app.keywords import KEYWORDS
+from .stub_servers import JetstreamReplayStub, synthetic_jetstream_frames
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].replace(".", "").isdigit() else None
+    rate = float(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].replace(".", "").isdigit() else 2000.0
+
+    if path:
+        stub = JetstreamReplayStub.from_file(path, rate=rate).start()
+    else:
+        stub = JetstreamReplayStub(synthetic_jetstream_frames(20_000), rate=rate).start()
+    total_events = len(stub.frames)
+
+    latencies = []
+    matched = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        consumer = JetstreamConsumer(KEYWORDS, url=stub.url, cursor_file=os.path.join(tmp, "cursor.json"))
+
+        def stop_when_drained():
+            # Done once every event has arrived and every match has been handed out
+            while consumer.stats["events"] < total_events or matched < consumer.stats["matched"]:
+                time.sleep(0.01)
+            consumer.stop()
+
+        threading.Thread(target=stop_when_drained, daemon=True).start()
+        started = time.perf_counter()
+        for batch in consumer.batches():
+            now = time.perf_counter()
+            for post in batch:
+                latencies.append(now - stub.sent_at[post.url])
+            matched += len(batch)
+            consumer.commit()
+        elapsed = time.perf_counter() - started
+
+    stub.stop()
+    print(f"\n{total_events} events replayed in {elapsed:.1f}s "
+          f"({consumer.stats['events'] / elapsed:,.0f} events/s received)")
+    print(f"Matched {matched} posts in {consumer.stats['matched']} events")
+    print(f"Event → batch latency: p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms, max {max(latencies, default=0) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
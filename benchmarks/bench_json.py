@@ -0,0 +1,76 @@
+"""
+Time posts.json load/save with each JSON backend, indented and compact.
+
+Usage:
+    python -m benchmarks.bench_json [posts]    (default: 10000)
+
+The "legacy" row is the previous code path (read the file as text, strip,
+json.loads; json.dump with indent=2). Backends that are not installed are
+skipped.
+"""
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from app import jsonio
+from app.config import settings
+from .bench_storage import synthetic_posts
+
+REPEATS = 5
+
+
+def best_of(fn) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def legacy_save(path, posts):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(posts, f, indent=2, ensure_ascii=False)
+
+
+def legacy_load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read().strip()
+    return json.loads(content)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    posts = list(synthetic_posts(count))
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posts.json")
+
+        save = best_of(lambda: legacy_save(path, posts))
+        load = best_of(lambda: legacy_load(path))
+        rows.append(("legacy", "indent", save, load, os.path.getsize(path)))
+
+        for backend in ("stdlib", "msgspec", "orjson"):
+            os.environ["JSON_BACKEND"] = backend
+            settings.reload()
+            module = importlib.reload(jsonio)
+            if module.backend() != backend:
+                continue
+            for indent in (True, False):
+                save = best_of(lambda: module.write_file(path, posts, indent=indent))
+                load = best_of(lambda: module.read_file(path))
+                assert module.read_file(path) == posts
+                rows.append((backend, "indent" if indent else "compact", save, load, os.path.getsize(path)))
+
+    print(f"\n{count} posts, best of {REPEATS}")
+    print(f"{'backend':>8} {'layout':>8} {'save ms':>9} {'load ms':>9} {'size KB':>9}")
+    for backend, layout, save, load, size in rows:
+        print(f"{backend:>8} {layout:>8} {save * 1000:>9.1f} {load * 1000:>9.1f} {size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
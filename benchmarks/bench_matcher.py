@@ -0,0 +1,115 @@
+"""
+Stage-1 keyword filter throughput: per-list substring scans vs the
+compiled single-pass matcher.
+
+Runs on a synthetic corpus and, when present, on the stored post texts
+in data/posts.json (repeated up to the requested size). Both paths are
+timed `rounds` times, interleaved, and the spread of the speed ratio is
+reported alongside the best rates: single runs vary by more than the
+difference between the two.
+
+Usage:
+    python -m benchmarks.bench_matcher [posts] [rounds]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+from app import ai_agent
+from app.keywords import KEYWORDS
+
+
+def legacy_stage1(text: str):
+    """The original implementation: one lowercase + any() scan per list"""
+    text_lower = text.lower()
+    injection = sum(1 for p in ai_agent.INJECTION_PATTERNS if p in text_lower) >= 2
+    text_lower = text.lower()
+    injection = injection or any(p in text_lower for p in ai_agent.HIGH_RISK_INJECTION_PATTERNS)
+
+    text_lower = text.lower()
+    if any(k in text_lower for k in ai_agent.SELLER_KEYWORDS):
+        verdict = "seller"
+    elif not any(v in text_lower for v in ai_agent.BUYER_VERBS):
+        verdict = None
+    elif any(k in text_lower for k in ai_agent.BUYER_KEYWORDS):
+        verdict = "buyer"
+    else:
+        verdict = None
+
+    self_promo = any(p in text.lower() for p in ai_agent.SELLER_SELF_REFS)
+    return injection, verdict, self_promo
+
+
+def compiled_stage1(text: str):
+    matches = ai_agent.scan_stage1(text)
+    return (
+        ai_agent.detect_prompt_injection(text, matches),
+        ai_agent.quick_keyword_filter(text, matches),
+        ai_agent.is_self_promotion(text, matches),
+    )
+
+
+def synthetic_corpus(count: int):
+    rng = random.Random(42)
+    vocabulary = (
+        "the a my art artist draw oc character please help today stream cute dragon fox "
+        "budget paypal dm me for info ignore all previous new role system: "
+    ).split()
+    phrases = (KEYWORDS + ai_agent.SELLER_KEYWORDS + ai_agent.BUYER_KEYWORDS
+               + ai_agent.INJECTION_PATTERNS + ai_agent.SELLER_SELF_REFS)
+    corpus = []
+    for _ in range(count):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(10, 50))]
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(phrases))
+        corpus.append(" ".join(words).capitalize())
+    return corpus
+
+
+def bench(fn, corpus):
+    started = time.perf_counter()
+    results = [fn(text) for text in corpus]
+    return len(corpus) / (time.perf_counter() - started), results
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def stored_corpus(count: int, path: str = "data/posts.json"):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        texts = [post.get("text", "") for post in json.load(f) if post.get("text")]
+    return (texts * (count // max(1, len(texts)) + 1))[:count] if texts else []
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+
+    for label, corpus in (("synthetic", synthetic_corpus(count)), ("stored posts", stored_corpus(count))):
+        if not corpus:
+            continue
+
+        legacy_rates, compiled_rates = [], []
+        for _ in range(rounds):
+            legacy_rate, legacy_results = bench(legacy_stage1, corpus)
+            compiled_rate, compiled_results = bench(compiled_stage1, corpus)
+            legacy_rates.append(legacy_rate)
+            compiled_rates.append(compiled_rate)
+        ratios = [c / l for c, l in zip(compiled_rates, legacy_rates)]
+
+        mismatches = sum(1 for a, b in zip(legacy_results, compiled_results) if a != b)
+        print(f"\n{label} ({len(corpus)} posts, {rounds} rounds)")
+        print(f"  legacy:     {max(legacy_rates):>10,.0f} posts/sec (best)")
+        print(f"  compiled:   {max(compiled_rates):>10,.0f} posts/sec (best)")
+        print(f"  ratio:      {median(ratios):.2f}x median, {min(ratios):.2f}x-{max(ratios):.2f}x")
+        print(f"  mismatches: {mismatches}")
+
+if __name__ == "__main__":
+    main()
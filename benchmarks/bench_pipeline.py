@@ -0,0 +1,207 @@
+"""
+Run the whole pipeline offline against local BlueSky, Groq and Discord stubs.
+
+Usage:
+    python -m benchmarks.bench_pipeline [posts ...] [options]    (default: 1000 10000 100000)
+
+Options:
+    --keys N              Groq API keys (default: one per 6000 posts, at least 4,
+                          so the 2M tokens/key daily budget is not the bottleneck)
+    --bluesky-latency S   searchPosts latency in seconds (default: 0.02)
+    --groq-latency S      chat completion latency in seconds (default: 0.05)
+    --discord-latency S   webhook latency in seconds (default: 0.02)
+    --throttle-every N    answer every Nth searchPosts request with 429
+    --discord-429-every N answer every Nth webhook request with 429
+    --shared-every N      every Nth post is returned by every keyword
+    --verbose             show the pipeline's own output
+
+Each corpus size runs one cold `run_pipeline()` cycle in a fresh
+interpreter with its own temporary data directory, so imports, caches and
+peak RSS do not leak between sizes. Latency percentiles come from the
+app's own stage histograms (app.metrics). Discord messages are delivered
+in the background; "drain s" is how long they took to go out after the
+cycle returned.
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Posts served per search phrase; larger corpora add synthetic phrases
+POSTS_PER_KEYWORD = 150
+
+# Posts one key can classify before MAX_DAILY_TOKENS parks it (~250 tokens/post batched)
+POSTS_PER_KEY = 6000
+
+STAGES = ("bluesky_request_seconds", "groq_request_seconds", "classify_group_seconds",
+          "discord_request_seconds")
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args) -> dict:
+    """One pipeline cycle over `args.child` posts (runs inside the temp dir)"""
+    from .stub_servers import BlueSkyStub, DiscordStub, GroqStub
+
+    from app.keywords import KEYWORDS
+    keys = args.keys or max(4, math.ceil(args.child / POSTS_PER_KEY))
+    phrases = max(1, math.ceil(args.child / POSTS_PER_KEYWORD))
+    keywords = [KEYWORDS[i % len(KEYWORDS)] + ("" if i < len(KEYWORDS) else f" {i // len(KEYWORDS)}")
+                for i in range(phrases)]
+    per_keyword = math.ceil(args.child / len(keywords))
+
+    # Spread each keyword's posts over the first cycle's window (2h + 30 min overlap)
+    bluesky = BlueSkyStub(posts_per_keyword=per_keyword, spacing_seconds=8000 / per_keyword,
+                          latency=args.bluesky_latency, shared_every=args.shared_every,
+                          throttle_every=args.throttle_every).start()
+    groq = GroqStub(latency=args.groq_latency).start()
+    discord = DiscordStub(latency=args.discord_latency, rate_limit_every=args.discord_429_every).start()
+
+    os.environ.update({
+        "BLUESKY_API_URL": bluesky.url,
+        "BLUESKY_RATE_LIMIT": "1000",
+        "BLUESKY_RATE_BURST": "100",
+        "GROQ_BASE_URL": groq.base_url,
+        "GROQ_API_KEYS": ",".join(f"gsk_bench_{i:04d}" for i in range(keys)),
+        "DISCORD_WEBHOOK_URL": discord.url,
+        "FETCH_INTERVAL_HOURS": "2",
+        "MAX_POSTS_PER_KEYWORD": "100",
+        "API_USAGE_FILE": "data/api_usage.json",
+        "API_RESET_FILE": "data/last_reset.txt",
+        "DISCORD_OUTBOX_FILE": "data/discord_outbox.json",
+        "PRECLASSIFIER_ENABLED": "false",
+    })
+
+    rss_before = _peak_rss_mb()
+    from app import discord_notify, main, metrics
+    main.KEYWORDS = keywords
+
+    started = time.perf_counter()
+    counts = main.run_pipeline()
+    elapsed = time.perf_counter() - started
+
+    # Notifications go out in the background; wait for them before counting requests
+    drain_started = time.perf_counter()
+    discord_notify.get_notifier().flush(timeout=120)
+    drain = time.perf_counter() - drain_started
+
+    result = {
+        "posts": args.child,
+        "keywords": len(keywords),
+        "keys": keys,
+        "seconds": elapsed,
+        "discord_drain_seconds": drain,
+        "posts_per_second": counts["recent"] / elapsed if elapsed else 0.0,
+        "counts": counts,
+        "rss_mb_before": rss_before,
+        "rss_mb_peak": _peak_rss_mb(),
+        "requests": {
+            "bluesky": bluesky.request_count,
+            "bluesky_429": bluesky.throttled_count,
+            "groq": groq.request_count,
+            "discord": discord.request_count,
+            "discord_429": discord.rate_limited_count,
+        },
+        "latency": {
+            stage: {"p50": metrics.quantile(stage, 0.5), "p99": metrics.quantile(stage, 0.99)}
+            for stage in STAGES
+        },
+    }
+    for stub in (bluesky, groq, discord):
+        stub.stop()
+    return result
+
+
+def run_size(posts: int, args) -> dict:
+    """Run one size in a child interpreter and parse its RESULT line"""
+    command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", str(posts)]
+    for name in ("keys", "bluesky_latency", "groq_latency", "discord_latency",
+                 "throttle_every", "discord_429_every", "shared_every"):
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    if args.verbose:
+        command.append("--verbose")
+
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = subprocess.run(command, cwd=tmp, env=env, text=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    lines = proc.stdout.splitlines()
+    if args.verbose:
+        print("\n".join(line for line in lines if not line.startswith("RESULT ")))
+    for line in reversed(lines):
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    print("\n".join(lines[-30:]))
+    raise RuntimeError(f"Benchmark child for {posts} posts failed (exit {proc.returncode})")
+
+
+def _ms(value) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("posts", nargs="*", type=int, default=[1000, 10_000, 100_000])
+    parser.add_argument("--keys", type=int, default=0)
+    parser.add_argument("--bluesky-latency", type=float, default=0.02)
+    parser.add_argument("--groq-latency", type=float, default=0.05)
+    parser.add_argument("--discord-latency", type=float, default=0.02)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--discord-429-every", type=int, default=0)
+    parser.add_argument("--shared-every", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        # Keep the pipeline's chatter out of the way of the result line
+        with open(os.devnull, "w") as devnull:
+            stdout = sys.stdout
+            if not args.verbose:
+                sys.stdout = devnull
+            try:
+                result = run_child(args)
+            finally:
+                sys.stdout = stdout
+        print("RESULT " + json.dumps(result))
+        return
+
+    results = [run_size(posts, args) for posts in args.posts]
+
+    print(f"\n{'posts':>7} {'keys':>5} {'seconds':>8} {'posts/s':>8} {'qualified':>9} {'errors':>6} "
+          f"{'peak MB':>8} {'bsky req':>8} {'groq req':>8} {'discord':>7} {'drain s':>7}")
+    for r in results:
+        peak = "-" if r["rss_mb_peak"] is None else f"{r['rss_mb_peak']:.0f}"
+        print(f"{r['posts']:>7} {r['keys']:>5} {r['seconds']:>8.1f} {r['posts_per_second']:>8.0f} "
+              f"{r['counts']['qualified']:>9} {r['counts']['errors']:>6} {peak:>8} "
+              f"{r['requests']['bluesky']:>8} {r['requests']['groq']:>8} {r['requests']['discord']:>7} "
+              f"{r['discord_drain_seconds']:>7.2f}")
+
+    print(f"\n{'posts':>7} " + " ".join(f"{stage.replace('_seconds', ''):>24}" for stage in STAGES))
+    print(f"{'':>7} " + " ".join(f"{'p50 / p99 ms':>24}" for _ in STAGES))
+    for r in results:
+        cells = [f"{_ms(r['latency'][s]['p50'])} / {_ms(r['latency'][s]['p99'])}" for s in STAGES]
+        print(f"{r['posts']:>7} " + " ".join(f"{cell:>24}" for cell in cells))
+
+    throttled = [r for r in results if r["requests"]["bluesky_429"] or r["requests"]["discord_429"]]
+    for r in throttled:
+        print(f"{r['posts']:>7} posts: {r['requests']['bluesky_429']} searchPosts 429s, "
+              f"{r['requests']['discord_429']} webhook 429s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the JSON and SQLite storage engines at several store sizes.
+
+Usage:
+    python -m benchmarks.bench_storage [size ...]    (default: 10000 100000 1000000)
+
+Each run builds a synthetic store in a temp directory, then times one
+pipeline cycle's worth of storage work: open/load, 1000 dedup checks,
+100 inserts, compaction, save and a 24h recency query.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+
+from app import storage
+from app.sqlite_store import SqlitePostStore
+
+
+def synthetic_posts(count: int):
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        text = f"looking to commission an artist for my OC, budget ${i % 500}, post {i}"
+        yield {
+            "url": f"at://did:plc:bench/app.bsky.feed.post/{i}",
+            "text": text,
+            "author": f"user{i}.bsky.social",
+            "location": None,
+            "web_url": f"https://bsky.app/profile/user{i}.bsky.social/post/{i}",
+            "ai": {
+                "is_commission": True,
+                "confidence": 0.9,
+                "reason": "synthetic",
+                "content_hash": hashlib.sha256(text.encode()).hexdigest(),
+                # Oldest first, spread over ~40 days so compaction has work to do
+                "timestamp": (now - timedelta(seconds=(count - i) * 3456000 / count)).isoformat(),
+            },
+        }
+
+
+def timed(label, results, fn):
+    started = time.perf_counter()
+    value = fn()
+    results[label] = time.perf_counter() - started
+    return value
+
+
+def run_cycle(open_fn, size):
+    results = {}
+    store = timed("open", results, open_fn)
+    probes = [f"at://did:plc:bench/app.bsky.feed.post/{i}" for i in range(0, size, max(1, size // 1000))][:1000]
+    timed("dedup x1000", results, lambda: [store.is_duplicate(url) for url in probes])
+
+    new_posts = list(synthetic_posts(100))
+    for post in new_posts:
+        post["url"] += "-new"
+        post["ai"]["content_hash"] += "-new"
+        post["ai"]["timestamp"] = datetime.now(timezone.utc).isoformat()
+    timed("insert x100", results, lambda: [store.add_post(post) for post in new_posts])
+    timed("compact", results, lambda: store.compact(max_size=size))
+    timed("save", results, lambda: store.save(new_posts=new_posts))
+    timed("recent 24h", results, lambda: store.get_recent_posts(24))
+    store.close()
+    return results
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rows = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "posts.json")
+            db_path = os.path.join(tmp, "posts.db")
+
+            posts = list(synthetic_posts(size))
+            storage.save_data(posts, data_file=json_path)
+            seed = SqlitePostStore(db_path, legacy_path=None)
+            seed.add_posts(posts)
+            seed.close()
+            del posts
+
+            rows.append((size, "json", run_cycle(lambda: storage.JsonPostStore(json_path), size)))
+            rows.append((size, "sqlite", run_cycle(lambda: SqlitePostStore(db_path, legacy_path=None), size)))
+
+    labels = list(rows[0][2])
+    print("\n" + f"{'size':>9} {'engine':>7} " + " ".join(f"{label:>12}" for label in labels) + f" {'total':>9}")
+    for size, engine, results in rows:
+        cells = " ".join(f"{results[label]:>12.4f}" for label in labels)
+        print(f"{size:>9} {engine:>7} {cells} {sum(results.values()):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
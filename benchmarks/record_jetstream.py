@@ -0,0 +1,44 @@
+"""
+Record live Jetstream post events to a JSON Lines file for offline replay.
+
+Usage:
+    python -m benchmarks.record_jetstream out.jsonl [events]    (default: 20000)
+
+Replay the recording with JetstreamReplayStub.from_file(), e.g. through
+`python -m benchmarks.bench_jetstream out.jsonl`.
+"""
+import json
+import sys
+from urllib.parse import urlencode
+
+from app.bluesky import POST_COLLECTION
+from app.config import settings
+from app.ws_client import WebSocket
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    path = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+
+    ws = WebSocket.connect(f"{settings.JETSTREAM_URL}?{urlencode({'wantedCollections': POST_COLLECTION})}")
+    written = 0
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            while written < count:
+                event = json.loads(ws.recv())
+                if event.get("kind") != "commit":
+                    continue
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+                written += 1
+                if written % 1000 == 0:
+                    print(f"{written}/{count} events")
+    finally:
+        ws.close()
+    print(f"Wrote {written} events to {path}")
+
+
+if __name__ == "__main__":
+    main()
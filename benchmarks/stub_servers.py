@@ -0,0 +1,421 @@
+"""
+Local stand-in servers for offline benchmarking.
+
+Run a stub in a background thread and point the app at it through the
+same environment variables used in production, e.g.:
+
+    server = BlueSkyStub(posts_per_keyword=300, latency=0.05).start()
+    os.environ["BLUESKY_API_URL"] = server.url
+"""
+import bisect
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List
+from urllib.parse import urlparse, parse_qs
+
+from app.ws_client import OP_CLOSE, OP_TEXT, accept_key, encode_frame
+
+
+class _StubServer:
+    """Base class: serves `handle_get`/`handle_post` on a free local port"""
+
+    path = "/"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def _count(self) -> None:
+        with self._lock:
+            self.request_count += 1
+
+    def handle_get(self, path: str, query: dict):
+        return 404, {"error": "not found"}, {}
+
+    def handle_post(self, path: str, body: dict, headers: dict = None):
+        return 404, {"error": "not found"}, {}
+
+    def handle_upgrade(self, handler: BaseHTTPRequestHandler) -> bool:
+        """Take over a WebSocket upgrade request; False falls back to handle_get"""
+        return False
+
+    def start(self) -> "_StubServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status, payload, headers):
+                body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub._count()
+                if self.headers.get("Upgrade", "").lower() == "websocket" and stub.handle_upgrade(self):
+                    self.close_connection = True
+                    return
+                if stub.latency:
+                    time.sleep(stub.latency)
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                self._reply(*stub.handle_get(parsed.path, query))
+
+            def do_POST(self):
+                stub._count()
+                if stub.latency:
+                    time.sleep(stub.latency)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else {}
+                self._reply(*stub.handle_post(urlparse(self.path).path, body, dict(self.headers)))
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+
+class BlueSkyStub(_StubServer):
+    """
+    Paginated stand-in for app.bsky.feed.searchPosts.
+
+    Every keyword gets `posts_per_keyword` synthetic posts, newest first,
+    spaced `spacing_seconds` apart. Cursors are plain offsets. With
+    `shared_every=N`, every Nth post is the same URI for all keywords,
+    mimicking overlapping search phrases. With `throttle_every=N`, every
+    Nth request is answered 429 with RateLimit-* headers instead.
+    """
+
+    path = "/xrpc/app.bsky.feed.searchPosts"
+
+    def __init__(self, posts_per_keyword: int = 200, spacing_seconds: float = 60, latency: float = 0.0,
+                 shared_every: int = 0, throttle_every: int = 0):
+        super().__init__(latency)
+        self.posts_per_keyword = posts_per_keyword
+        self.shared_every = shared_every
+        self.spacing_seconds = spacing_seconds
+        self.throttle_every = throttle_every
+        self.throttled_count = 0
+        self.now = datetime.now(timezone.utc)
+
+    def make_post(self, keyword: str, index: int) -> dict:
+        created = (self.now - timedelta(seconds=index * self.spacing_seconds)).isoformat()
+        shared = self.shared_every and index % self.shared_every == 0
+        slug = "shared" if shared else keyword.replace(" ", "-")
+        return {
+            "uri": f"at://did:plc:stub/app.bsky.feed.post/{slug}-{index}",
+            "indexedAt": created,
+            "author": {"handle": f"user{index}.bsky.social"},
+            "record": {"text": f"{keyword} — synthetic post #{index}", "createdAt": created},
+        }
+
+    def handle_get(self, path, query):
+        if path != self.path:
+            return 404, {"error": "not found"}, {}
+
+        if self.throttle_every and self.request_count % self.throttle_every == 0:
+            with self._lock:
+                self.throttled_count += 1
+            return 429, {"error": "RateLimitExceeded", "message": "Rate Limit Exceeded"}, {
+                "ratelimit-limit": 3000,
+                "ratelimit-remaining": 0,
+                "ratelimit-reset": int(time.time()) + 1,
+            }
+
+        keyword = query.get("q", "")
+        limit = min(100, int(query.get("limit", 25)))
+        offset = int(query.get("cursor", 0))
+        end = min(offset + limit, self.posts_per_keyword)
+
+        payload = {"posts": [self.make_post(keyword, i) for i in range(offset, end)]}
+        if end < self.posts_per_keyword:
+            payload["cursor"] = str(end)
+        return 200, payload, {}
+
+
+class GroqStub(_StubServer):
+    """
+    Stand-in for the Groq OpenAI-compatible chat completions endpoint.
+
+    Replies "is_commission": true when the user message contains any of
+    `buyer_markers`; batched prompts ("[1]", "[2]", ... sections) get one
+    verdict per post in a JSON array. With `requests_per_window` set, each
+    API key gets that many requests per `window` seconds, reported in
+    x-ratelimit-* headers and answered with 429 + Retry-After beyond it.
+    Point the SDK at it with GROQ_BASE_URL=<stub.base_url>.
+    """
+
+    path = "/openai/v1/chat/completions"
+
+    def __init__(self, latency: float = 0.0, buyer_markers=("commission", "artist"),
+                 requests_per_window: int = None, window: float = 60.0):
+        super().__init__(latency)
+        self.buyer_markers = tuple(buyer_markers)
+        self.requests_per_window = requests_per_window
+        self.window = window
+        self.rate_limited_count = 0
+        self._windows = {}  # Authorization header → (window start, requests)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def verdict(self, text: str) -> dict:
+        hit = any(marker in text.lower() for marker in self.buyer_markers)
+        return {
+            "is_commission": hit,
+            "confidence": 0.9 if hit else 0.1,
+            "reason": "stub verdict",
+        }
+
+    def _rate_limit_headers(self, api_key: str):
+        """(limited?, headers) for one request on `api_key`"""
+        if not self.requests_per_window:
+            return False, {}
+        with self._lock:
+            now = time.monotonic()
+            start, count = self._windows.get(api_key, (now, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            reset = self.window - (now - start)
+            limited = count >= self.requests_per_window
+            if not limited:
+                count += 1
+                self._windows[api_key] = (start, count)
+            else:
+                self.rate_limited_count += 1
+        headers = {
+            "x-ratelimit-limit-requests": self.requests_per_window,
+            "x-ratelimit-remaining-requests": self.requests_per_window - count,
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+        }
+        if limited:
+            headers["retry-after"] = f"{reset:.2f}"
+        return limited, headers
+
+    def handle_post(self, path, body, headers=None):
+        if path != self.path:
+            return 404, {"error": "not found"}, {}
+
+        limited, rate_headers = self._rate_limit_headers((headers or {}).get("Authorization", ""))
+        if limited:
+            return 429, {"error": {
+                "message": "Rate limit reached for requests",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, rate_headers
+
+        user_text = next(
+            (m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), ""
+        )
+        sections = re.split(r"^\[(\d+)\]$", user_text, flags=re.MULTILINE)
+        if len(sections) > 1:
+            # sections = [preamble, "1", text1, "2", text2, ...]
+            posts = sections[2::2]
+            content = json.dumps([
+                dict(self.verdict(text), id=number) for number, text in enumerate(posts, start=1)
+            ])
+        else:
+            posts = [user_text]
+            content = json.dumps(self.verdict(user_text))
+        return 200, {
+            "id": f"stub-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": 1500 + 30 * len(posts),
+                "completion_tokens": 30 * len(posts),
+                "total_tokens": 1500 + 60 * len(posts),
+            },
+        }, rate_headers
+
+
+class DiscordStub(_StubServer):
+    """
+    Stand-in for a Discord webhook (POST /api/webhooks/<id>/<token>).
+
+    Keeps every accepted payload in `messages` and answers 204 like Discord
+    does without ?wait=true. With `rate_limit_every=N`, every Nth request
+    is answered 429 with a `retry_after` body and X-RateLimit-* headers.
+    """
+
+    path = "/api/webhooks/0/stub"
+
+    def __init__(self, latency: float = 0.0, rate_limit_every: int = 0, retry_after: float = 0.5):
+        super().__init__(latency)
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.rate_limited_count = 0
+        self.messages = []
+
+    def handle_post(self, path, body, headers=None):
+        if path != self.path:
+            return 404, {"message": "Unknown Webhook", "code": 10015}, {}
+
+        with self._lock:
+            if self.rate_limit_every and self.request_count % self.rate_limit_every == 0:
+                self.rate_limited_count += 1
+                return 429, {"message": "You are being rate limited.", "retry_after": self.retry_after,
+                             "global": False}, {
+                    "Retry-After": self.retry_after,
+                    "X-RateLimit-Limit": 5,
+                    "X-RateLimit-Remaining": 0,
+                    "X-RateLimit-Reset-After": self.retry_after,
+                    "X-RateLimit-Bucket": "stub",
+                }
+            self.messages.append(body)
+        return 204, None, {
+            "X-RateLimit-Limit": 5,
+            "X-RateLimit-Remaining": 4,
+            "X-RateLimit-Reset-After": 1,
+            "X-RateLimit-Bucket": "stub",
+        }
+
+
+def synthetic_jetstream_frames(count: int, match_every: int = 50, start_us: int = None) -> List[dict]:
+    """
+    Jetstream commit events for `count` new posts, one every millisecond.
+
+    Every `match_every`-th post asks for a commission; the rest is chatter
+    that no keyword matches.
+    """
+    if start_us is None:
+        start_us = int(time.time() * 1_000_000)
+    frames = []
+    for index in range(count):
+        created = datetime.fromtimestamp((start_us + index * 1000) / 1_000_000, timezone.utc).isoformat()
+        if match_every and index % match_every == 0:
+            text = f"I'm looking to commission an artist for my OC, budget $80 (#{index})"
+        else:
+            text = f"just had the best coffee of my life, post #{index}"
+        frames.append({
+            "did": f"did:plc:stub{index % 997}",
+            "time_us": start_us + index * 1000,
+            "kind": "commit",
+            "commit": {
+                "rev": f"rev{index}",
+                "operation": "create",
+                "collection": "app.bsky.feed.post",
+                "rkey": f"stub{index}",
+                "record": {
+                    "$type": "app.bsky.feed.post",
+                    "createdAt": created,
+                    "langs": ["en"],
+                    "text": text,
+                },
+                "cid": f"cid{index}",
+            },
+        })
+    return frames
+
+
+class JetstreamReplayStub(_StubServer):
+    """
+    WebSocket stand-in for a Jetstream /subscribe endpoint.
+
+    Replays `frames` (recorded Jetstream events, oldest first) to every
+    subscriber at `rate` events per second (0 = as fast as possible),
+    honouring the `cursor` and `wantedCollections` query parameters, then
+    keeps the connection open like a quiet live stream. `sent_at` maps each
+    post's at:// URI to the perf_counter() time it went out, for latency
+    measurements. Point the app at it with JETSTREAM_URL=<stub.url>.
+    """
+
+    path = "/subscribe"
+
+    def __init__(self, frames: Iterable[dict], rate: float = 0.0):
+        super().__init__()
+        self.frames = sorted(frames, key=lambda frame: frame.get("time_us", 0))
+        self.rate = rate
+        self.sent_at = {}
+        self._times = [frame.get("time_us", 0) for frame in self.frames]
+        self._closing = threading.Event()
+
+    @classmethod
+    def from_file(cls, path: str, rate: float = 0.0) -> "JetstreamReplayStub":
+        """Replay a JSON Lines recording (see benchmarks.record_jetstream)"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls((json.loads(line) for line in f if line.strip()), rate=rate)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"ws://{host}:{port}{self.path}"
+
+    def handle_upgrade(self, handler):
+        parsed = urlparse(handler.path)
+        if parsed.path != self.path:
+            return False
+        query = parse_qs(parsed.query)
+        cursor = int(query.get("cursor", ["0"])[0])
+        collections = set(query.get("wantedCollections", []))
+
+        handler.send_response(101, "Switching Protocols")
+        handler.send_header("Upgrade", "websocket")
+        handler.send_header("Connection", "Upgrade")
+        handler.send_header("Sec-WebSocket-Accept", accept_key(handler.headers["Sec-WebSocket-Key"]))
+        handler.end_headers()
+        handler.wfile.flush()
+
+        started = time.perf_counter()
+        sent = 0
+        try:
+            for frame in self.frames[bisect.bisect_left(self._times, cursor):]:
+                if self._closing.is_set():
+                    break
+                commit = frame.get("commit") or {}
+                if collections and commit.get("collection") not in collections:
+                    continue
+                if self.rate:
+                    delay = started + sent / self.rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                did, rkey = frame.get("did"), commit.get("rkey")
+                self.sent_at[f"at://{did}/{commit.get('collection')}/{rkey}"] = time.perf_counter()
+                handler.wfile.write(encode_frame(OP_TEXT, json.dumps(frame).encode("utf-8"), mask=False))
+                handler.wfile.flush()
+                sent += 1
+            self._closing.wait()
+            handler.wfile.write(encode_frame(OP_CLOSE, (1001).to_bytes(2, "big"), mask=False))
+            handler.wfile.flush()
+        except OSError:
+            pass  # subscriber went away
+        return True
+
+    def stop(self) -> None:
+        self._closing.set()
+        super().stop()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    """Point every state file at tmp_path so tests never touch app/ or data/"""
+    for name in ("FETCH_STATE_FILE", "JETSTREAM_CURSOR_FILE", "API_USAGE_FILE", "API_RESET_FILE",
+                 "CLASSIFICATION_CACHE_FILE", "PRECLASSIFIER_MODEL_FILE", "PRECLASSIFIER_HISTORY_FILE",
+                 "DATA_FILE", "DISCORD_OUTBOX_FILE", "METRICS_FILE"):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    monkeypatch.setenv("DISCORD_WEBHOOK_URL", "")
+    settings.reload()
+    yield settings
+    monkeypatch.undo()
+    settings.reload()
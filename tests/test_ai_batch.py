@@ -0,0 +1,135 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import ai_agent
+from app.ai_agent import _classify_group, _parse_batch_output
+
+
+def verdict(number=None, is_commission=True, confidence=0.9):
+    item = {"is_commission": is_commission, "confidence": confidence, "reason": f"post {number}"}
+    if number is not None:
+        item["id"] = number
+    return item
+
+
+# --- _parse_batch_output ---
+
+def test_ids_map_verdicts_regardless_of_order():
+    raw = json.dumps([verdict(3), verdict(1, False), verdict(2)])
+    parsed = _parse_batch_output(raw, 3)
+    assert sorted(parsed) == [1, 2, 3]
+    assert parsed[1]["is_commission"] is False and parsed[3]["reason"] == "post 3"
+
+
+def test_missing_ids_are_left_out():
+    parsed = _parse_batch_output(json.dumps([verdict(1), verdict(3)]), 3)
+    assert sorted(parsed) == [1, 3]
+
+
+def test_duplicate_ids_keep_the_first_verdict():
+    raw = json.dumps([verdict(1, True), verdict(1, False), verdict(2)])
+    parsed = _parse_batch_output(raw, 2)
+    assert parsed[1]["is_commission"] is True and sorted(parsed) == [1, 2]
+
+
+@pytest.mark.parametrize("bad_id", [0, 4, -1, "two", None, [1]])
+def test_out_of_range_or_malformed_ids_are_dropped(bad_id):
+    parsed = _parse_batch_output(json.dumps([verdict(1), dict(verdict(), id=bad_id)]), 3)
+    assert sorted(parsed) == [1]
+
+
+def test_numeric_string_ids_are_accepted():
+    assert sorted(_parse_batch_output(json.dumps([verdict("2"), verdict("1")]), 2)) == [1, 2]
+
+
+def test_items_without_a_boolean_verdict_are_dropped():
+    raw = json.dumps([verdict(1), {"id": 2, "is_commission": "yes"}, {"id": 3}, "text", 7])
+    assert sorted(_parse_batch_output(raw, 3)) == [1]
+
+
+def test_positions_used_only_when_every_post_has_a_verdict():
+    full = json.dumps([verdict(), verdict(is_commission=False)])
+    assert _parse_batch_output(full, 2)[2]["is_commission"] is False
+    assert _parse_batch_output(json.dumps([verdict()]), 2) == {}
+    assert _parse_batch_output(json.dumps([verdict(), {"oops": 1}]), 2) == {}
+
+
+def test_code_fences_prose_and_wrapper_objects_are_tolerated():
+    array = json.dumps([verdict(1), verdict(2)])
+    assert sorted(_parse_batch_output(f"```json\n{array}\n```", 2)) == [1, 2]
+    assert sorted(_parse_batch_output(f"Here you go: {array} Hope this helps", 2)) == [1, 2]
+    assert sorted(_parse_batch_output(json.dumps({"results": json.loads(array)}), 2)) == [1, 2]
+
+
+@pytest.mark.parametrize("raw", ["", "not json", "[{broken", '"a string"', "42", "{}"])
+def test_malformed_output_parses_to_nothing(raw):
+    assert _parse_batch_output(raw, 2) == {}
+
+
+# --- _classify_group ---
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Scripted _complete(): batch replies from `batch`, single replies per post text"""
+    calls = {"batch": [], "single": []}
+    replies = {"batch": None, "single": {}}
+
+    def fake_complete(messages, max_tokens=None, posts=1):
+        if posts > 1:
+            calls["batch"].append(messages[1]["content"])
+            return replies["batch"]
+        text = messages[1]["content"]
+        calls["single"].append(text)
+        return replies["single"].get(text)
+
+    monkeypatch.setattr(ai_agent, "_complete", fake_complete)
+    monkeypatch.setattr(ai_agent, "get_runtime",
+                        lambda: SimpleNamespace(system_prompt="single", batch_system_prompt="batch"))
+    monkeypatch.setattr(ai_agent.classification_cache, "put", lambda key, value: None)
+    monkeypatch.setattr(ai_agent.preclassifier, "record_label", lambda *args: None)
+    return SimpleNamespace(calls=calls, replies=replies)
+
+
+def group(*texts):
+    return [(text, f"hash-{text}", ai_agent.scan_stage1(text), f"key-{text}") for text in texts]
+
+
+def test_group_results_follow_group_order(llm):
+    llm.replies["batch"] = json.dumps([verdict(2, False, 0.2), verdict(1, True, 0.8)])
+    results = _classify_group(group("need art", "hello"))
+    assert [r.is_commission for r in results] == [True, False]
+    assert [r.content_hash for r in results] == ["hash-need art", "hash-hello"]
+    assert llm.calls["single"] == []
+
+
+def test_missing_verdicts_fall_back_to_single_calls(llm):
+    llm.replies["batch"] = json.dumps([verdict(1)])
+    llm.replies["single"] = {"second": json.dumps(verdict(is_commission=False))}
+    results = _classify_group(group("first", "second", "third"))
+    assert llm.calls["single"] == ["second", "third"]
+    assert results[0].is_commission is True
+    assert results[1].is_commission is False
+    assert results[2] is None  # single call failed as well
+
+
+def test_unparseable_or_failed_batch_retries_every_post(llm):
+    llm.replies["single"] = {"a": json.dumps(verdict()), "b": json.dumps(verdict())}
+    for reply in ("I cannot help with that", None):
+        llm.calls["single"].clear()
+        llm.replies["batch"] = reply
+        results = _classify_group(group("a", "b"))
+        assert llm.calls["single"] == ["a", "b"]
+        assert all(r.is_commission for r in results)
+
+
+def test_single_post_group_skips_the_batch_prompt(llm):
+    llm.replies["single"] = {"only": json.dumps(verdict())}
+    assert _classify_group(group("only"))[0].is_commission
+    assert llm.calls["batch"] == []
+
+
+def test_invalid_confidence_is_normalized(llm):
+    llm.replies["batch"] = json.dumps([verdict(1, confidence=7), verdict(2, confidence=True)])
+    assert [r.confidence for r in _classify_group(group("x", "y"))] == [0.5, 0.5]
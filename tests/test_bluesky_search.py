@@ -0,0 +1,85 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from app import bluesky
+from app.config import settings
+from benchmarks.stub_servers import BlueSkyStub
+
+
+class ThrottleOnceStub(BlueSkyStub):
+    """Answers the first request 429 with Retry-After, then serves normally"""
+
+    def __init__(self, retry_after="0.3", **kwargs):
+        super().__init__(**kwargs)
+        self.retry_after = retry_after
+
+    def handle_get(self, path, query):
+        if self.request_count == 1:
+            return 429, {"error": "RateLimitExceeded"}, {"Retry-After": self.retry_after}
+        return super().handle_get(path, query)
+
+
+def use_stub(monkeypatch, stub):
+    monkeypatch.setenv("BLUESKY_API_URL", stub.url)
+    monkeypatch.setenv("BLUESKY_RATE_LIMIT", "1000")
+    monkeypatch.setenv("BLUESKY_RATE_BURST", "1000")
+    settings.reload()
+    bluesky.reset_rate_limiter()
+
+
+@pytest.fixture
+def served(monkeypatch):
+    stubs = []
+
+    def start(stub):
+        stubs.append(stub.start())
+        use_stub(monkeypatch, stub)
+        return stub
+
+    yield start
+    for stub in stubs:
+        stub.stop()
+    bluesky.reset_rate_limiter()
+
+
+def test_429_waits_out_retry_after_then_retries(served):
+    stub = served(ThrottleOnceStub(posts_per_keyword=5))
+    started = time.monotonic()
+    response = bluesky._search({"q": "art", "limit": 100})
+    waited = time.monotonic() - started
+
+    assert response.status_code == 200
+    assert len(response.json()["posts"]) == 5
+    assert stub.request_count == 2
+    assert 0.25 < waited < 2
+
+
+def test_429_pauses_the_shared_bucket():
+    bucket = bluesky.TokenBucket(1000, 1000)
+    bucket.pause(0.2)
+    assert bucket.try_acquire() > 0.15
+    time.sleep(0.25)
+    assert bucket.acquire() < 0.05
+
+
+def test_ratelimit_reset_header_is_honoured_during_a_keyword_fetch(served):
+    # BlueSkyStub answers every 3rd request 429 with RateLimit-Reset one second out
+    stub = served(BlueSkyStub(posts_per_keyword=250, throttle_every=3))
+    posts = bluesky.fetch_posts_since_timestamp("art", datetime.now(timezone.utc) - timedelta(days=1), max_posts=1000)
+    assert len(posts) == 250
+    assert stub.throttled_count == 1
+
+
+def test_gives_up_after_max_retries(served, monkeypatch):
+    class AlwaysThrottled(BlueSkyStub):
+        def handle_get(self, path, query):
+            return 429, {"error": "RateLimitExceeded"}, {"Retry-After": "0"}
+
+    stub = served(AlwaysThrottled())
+    monkeypatch.setattr(bluesky, "SEARCH_MAX_RETRIES", 2)
+    with pytest.raises(requests.exceptions.HTTPError):
+        bluesky._search({"q": "art"})
+    assert stub.request_count == 3
@@ -0,0 +1,78 @@
+import random
+
+from app.discord_notify import (
+    EMBED_COLOR, EMBED_TOTAL_LIMIT, MAX_EMBEDS, MAX_FIELDS, DiscordNotifier, _length, _post_field,
+    build_batch_messages, pack_posts,
+)
+from app.models import Classification, Post
+
+
+def make_posts(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        Post(url=f"at://did:plc:x/app.bsky.feed.post/{i}", text="commission " * rng.randint(1, 40),
+             author=f"user{i}.bsky.social" + "x" * rng.randint(0, 200),
+             ai=Classification(is_commission=True, confidence=0.9))
+        for i in range(count)
+    ]
+
+
+def test_messages_hold_contiguous_runs_in_order():
+    packed = pack_posts(make_posts(300))
+    numbers = [number for items in packed for number, _ in items]
+    assert numbers == list(range(1, 301))
+    assert len(packed) > 1
+
+
+def test_messages_respect_discord_limits():
+    posts = make_posts(700, seed=3)
+    messages = build_batch_messages(posts)
+    for message in messages:
+        assert len(message["embeds"]) <= MAX_EMBEDS
+        fields = [field for embed in message["embeds"] for field in embed["fields"]]
+        assert all(len(embed["fields"]) <= MAX_FIELDS for embed in message["embeds"])
+        assert sum(_length(f["name"]) + _length(f["value"]) for f in fields) <= EMBED_TOTAL_LIMIT
+    assert sum(len(embed["fields"]) for m in messages for embed in m["embeds"]) == 700
+
+
+def test_next_message_starts_only_when_the_next_post_does_not_fit():
+    packed = pack_posts(make_posts(200, seed=5))
+    for items, following in zip(packed, packed[1:]):
+        used = sum(_length(f["name"]) + _length(f["value"]) for _, f in items)
+        _, first = following[0]
+        next_size = _length(first["name"]) + _length(first["value"])
+        assert used + next_size > EMBED_TOTAL_LIMIT or len(items) == MAX_EMBEDS * MAX_FIELDS
+
+
+def test_queued_posts_are_merged_into_full_embeds():
+    notifier = DiscordNotifier(url="", outbox_file="")
+    posts = [Post(url=f"at://did:plc:x/app.bsky.feed.post/{i}", text="commission", author=f"u{i}.bsky.social",
+                  ai=Classification(is_commission=True, confidence=0.9))
+             for i in range(MAX_FIELDS + 3)]
+    for number, post in enumerate(posts, 1):
+        payload = {"embeds": [{"color": EMBED_COLOR, "fields": [_post_field(number, post)]}]}
+        notifier._outbox.append({"payload": payload, "queued_at": 0})
+    notifier._outbox.append({"payload": {"content": "summary"}, "queued_at": 0})
+
+    count, merged = notifier._coalesce()
+
+    assert count == len(posts) + 1
+    assert merged["content"] == "summary"
+    assert [len(embed["fields"]) for embed in merged["embeds"]] == [MAX_FIELDS, 3]
+    assert [field for embed in merged["embeds"] for field in embed["fields"]] == [
+        _post_field(number, post) for number, post in enumerate(posts, 1)
+    ]
+
+
+def test_merging_stops_at_the_embed_character_limit():
+    notifier = DiscordNotifier(url="", outbox_file="")
+    for number, post in enumerate(make_posts(60), 1):
+        payload = {"embeds": [{"color": EMBED_COLOR, "fields": [_post_field(number, post)]}]}
+        notifier._outbox.append({"payload": payload, "queued_at": 0})
+
+    count, merged = notifier._coalesce()
+
+    assert 1 < count < 60
+    fields = [field for embed in merged["embeds"] for field in embed["fields"]]
+    assert len(fields) == count
+    assert sum(_length(f["name"]) + _length(f["value"]) for f in fields) <= EMBED_TOTAL_LIMIT
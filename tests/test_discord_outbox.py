@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from app import discord_notify, jsonio
+from app.discord_notify import DiscordNotifier
+
+URL = "https://discord.invalid/api/webhooks/1/token"
+
+
+class FakeResponse:
+    def __init__(self, status_code=204, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body
+        self.text = "" if body is None else jsonio.dumps(body)
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("no body")
+        return self._body
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    """Stub for _post_webhook: answers with `responses` in turn (204 once they run out)"""
+    calls = []
+    responses = []
+
+    def post(url, payload):
+        calls.append((time.monotonic(), payload))
+        response = responses.pop(0) if responses else FakeResponse()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(discord_notify, "_post_webhook", post)
+    return calls, responses
+
+
+@pytest.fixture
+def notifiers():
+    started = []
+
+    def make(outbox_file):
+        notifier = DiscordNotifier(url=URL, outbox_file=str(outbox_file))
+        started.append(notifier)
+        return notifier
+
+    yield make
+    for notifier in started:
+        notifier.stop()
+
+
+def message(text):
+    # "username" keeps the worker from coalescing messages, so each is its own request
+    return {"content": text, "username": "bot"}
+
+
+def test_429_is_retried_after_retry_after(webhook, notifiers, tmp_path):
+    calls, responses = webhook
+    responses.append(FakeResponse(429, body={"retry_after": 0.2}))
+    notifier = notifiers(tmp_path / "outbox.json")
+
+    notifier.enqueue([message("a")])
+
+    assert notifier.flush(timeout=5)
+    assert [payload for _, payload in calls] == [message("a"), message("a")]
+    assert calls[1][0] - calls[0][0] >= 0.2
+
+
+def test_drained_bucket_delays_the_next_message(webhook, notifiers, tmp_path):
+    calls, responses = webhook
+    responses.append(FakeResponse(headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.2"}))
+    notifier = notifiers(tmp_path / "outbox.json")
+
+    notifier.enqueue([message("a"), message("b")])
+
+    assert notifier.flush(timeout=5)
+    assert [payload for _, payload in calls] == [message("a"), message("b")]
+    assert calls[1][0] - calls[0][0] >= 0.2
+
+
+def test_outbox_is_written_to_disk_until_delivered(monkeypatch, notifiers, tmp_path):
+    outbox_file = tmp_path / "outbox.json"
+    sending, release = threading.Event(), threading.Event()
+
+    def post(url, payload):
+        sending.set()
+        release.wait(5)
+        return FakeResponse()
+
+    monkeypatch.setattr(discord_notify, "_post_webhook", post)
+    notifier = notifiers(outbox_file)
+
+    notifier.enqueue([message("a"), message("b")])
+    assert sending.wait(5)
+    assert [entry["payload"] for entry in jsonio.read_file(str(outbox_file))] == [message("a"), message("b")]
+
+    release.set()
+    assert notifier.flush(timeout=5)
+    notifier.save()
+    assert jsonio.read_file(str(outbox_file)) == []
+
+
+def test_unsent_messages_are_resent_after_a_restart(webhook, notifiers, tmp_path):
+    calls, responses = webhook
+    outbox_file = tmp_path / "outbox.json"
+    responses.append(ConnectionError("webhook unreachable"))
+    first = notifiers(outbox_file)
+
+    first.enqueue([message("a")])
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    first.stop()
+    assert [entry["payload"] for entry in jsonio.read_file(str(outbox_file))] == [message("a")]
+
+    calls.clear()
+    second = notifiers(outbox_file)
+    second.start()
+
+    assert second.flush(timeout=5)
+    assert [payload for _, payload in calls] == [message("a")]
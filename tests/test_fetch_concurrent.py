@@ -0,0 +1,77 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from app import bluesky, jsonio
+from app.fetch_state import FetchState
+
+NOW = datetime.now(timezone.utc)
+KEYWORDS = ["alpha", "beta", "gamma", "delta"]
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.content = jsonio.dumps(data).encode("utf-8")
+
+
+def posts_for(keyword, count=3):
+    return [{"uri": f"at://did:plc:x/app.bsky.feed.post/{keyword}-{i}",
+             "indexedAt": (NOW - timedelta(minutes=i)).isoformat()}
+            for i in range(count)]
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """One page of posts per keyword; keywords in `failing` raise instead"""
+    failing = set()
+
+    def fake_search(params):
+        keyword = params["q"]
+        if keyword in failing:
+            response = requests.Response()
+            response.status_code = 500
+            raise requests.exceptions.HTTPError("500 Server Error", response=response)
+        return FakeResponse({"posts": posts_for(keyword)})
+
+    monkeypatch.setattr(bluesky, "_search", fake_search)
+    return failing
+
+
+def test_results_come_back_in_keyword_order_whatever_order_workers_finish(search):
+    # Each keyword waits for the next one, so workers finish in reverse order
+    done = {keyword: threading.Event() for keyword in KEYWORDS}
+    finished = []
+
+    def fetch(keyword):
+        index = KEYWORDS.index(keyword)
+        if index + 1 < len(KEYWORDS):
+            assert done[KEYWORDS[index + 1]].wait(5)
+        posts = bluesky.fetch_posts(keyword, max_posts=3)
+        finished.append(keyword)
+        done[keyword].set()
+        return posts
+
+    results = bluesky.fetch_keywords_concurrently(fetch, KEYWORDS, max_workers=len(KEYWORDS))
+
+    assert finished == KEYWORDS[::-1]
+    assert results == [posts_for(keyword) for keyword in KEYWORDS]
+
+
+def test_one_failing_keyword_does_not_affect_the_others(search, tmp_path):
+    search.add("beta")
+    state = FetchState(str(tmp_path / "fetch_state.json"))
+
+    posts = bluesky.fetch_all_since_timestamp(KEYWORDS, NOW - timedelta(hours=1), max_workers=len(KEYWORDS),
+                                              state=state)
+    state.commit()
+
+    assert sorted(post["uri"] for post in posts) == sorted(
+        post["uri"] for keyword in KEYWORDS if keyword != "beta" for post in posts_for(keyword)
+    )
+    assert bluesky.last_fetch_report["beta"] == {"raw": 0, "unique": 0}
+    # The failed keyword keeps its window for the next cycle; the others move on
+    assert state.high_water_mark("beta") is None
+    for keyword in ("alpha", "gamma", "delta"):
+        assert state.high_water_mark(keyword)["uri"] == posts_for(keyword)[0]["uri"]
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import bluesky, jsonio
+from app.fetch_state import FetchState
+
+NOW = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.content = jsonio.dumps(data).encode("utf-8")
+
+
+def post(index):
+    """Posts numbered newest first, one minute apart"""
+    return {"uri": f"at://did:plc:x/app.bsky.feed.post/{index}",
+            "indexedAt": (NOW - timedelta(minutes=index)).isoformat()}
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """Serve `pages` (lists of posts) one request at a time"""
+    pages = []
+
+    def fake_search(params):
+        page = int(params.get("cursor") or 0)
+        if page >= len(pages):
+            return FakeResponse({"posts": []})
+        result = pages[page]
+        if isinstance(result, Exception):
+            raise result
+        data = {"posts": result}
+        if page + 1 < len(pages):
+            data["cursor"] = str(page + 1)
+        return FakeResponse(data)
+
+    monkeypatch.setattr(bluesky, "_search", fake_search)
+    return pages
+
+
+def marked_state(tmp_path, index):
+    state = FetchState(str(tmp_path / "state.json"))
+    state.advance("kw", post(index)["indexedAt"], post(index)["uri"])
+    state.commit()
+    return state
+
+
+def mark_uri(state):
+    return state.high_water_mark("kw")["uri"]
+
+
+def test_mark_advances_when_old_post_is_reached(tmp_path, search):
+    search.extend([[post(0), post(1)], [post(2), post(3)]])
+    state = marked_state(tmp_path, 3)
+    posts = bluesky.fetch_posts_since_timestamp("kw", NOW - timedelta(days=1), state=state)
+    state.commit()
+    assert len(posts) == 3
+    assert mark_uri(state) == post(0)["uri"]
+
+
+def test_mark_advances_when_results_run_out(tmp_path, search):
+    search.extend([[post(0), post(1)]])
+    state = FetchState(str(tmp_path / "state.json"))
+    bluesky.fetch_posts_since_timestamp("kw", NOW - timedelta(days=1), state=state)
+    state.commit()
+    assert mark_uri(state) == post(0)["uri"]
+
+
+def test_mark_catches_up_after_max_posts_stops_the_fetch(tmp_path, search):
+    # A backlog of 20 posts since the mark, more than max_posts allows
+    search.extend([[post(i), post(i + 1)] for i in range(0, 20, 2)])
+    state = marked_state(tmp_path, 20)
+    posts = bluesky.fetch_posts_since_timestamp("kw", NOW - timedelta(days=1), max_posts=4, state=state)
+    state.commit()
+    assert len(posts) == 4
+    assert mark_uri(state) == post(0)["uri"]
+
+    # Next cycle: two new posts, then the fetch stops at the new mark
+    search[:] = [[post(-2), post(-1)], [post(0), post(1)], [post(2), post(3)]]
+    posts = bluesky.fetch_posts_since_timestamp("kw", NOW - timedelta(days=1), max_posts=4, state=state)
+    state.commit()
+    assert [p["uri"] for p in posts] == [post(-2)["uri"], post(-1)["uri"]]
+    assert mark_uri(state) == post(-2)["uri"]
+
+
+def test_mark_kept_after_an_error(tmp_path, search):
+    search.extend([[post(0), post(1)], OSError("connection reset")])
+    state = marked_state(tmp_path, 5)
+    bluesky.fetch_posts_since_timestamp("kw", NOW - timedelta(days=1), state=state)
+    state.commit()
+    assert mark_uri(state) == post(5)["uri"]
+
+
+def test_cancellation_propagates_and_keeps_the_mark(tmp_path, search):
+    search.extend([[post(0), post(1)], [post(2), post(3)]])
+    state = marked_state(tmp_path, 5)
+
+    def on_page(keyword, posts):
+        raise bluesky._FetchCancelled()
+
+    with pytest.raises(bluesky._FetchCancelled):
+        bluesky.fetch_posts_since_timestamp("kw", NOW - timedelta(days=1), on_page=on_page, state=state)
+    state.commit()
+    assert mark_uri(state) == post(5)["uri"]
@@ -0,0 +1,105 @@
+import json
+import time
+
+import pytest
+
+from app import bluesky
+from app.bluesky import JetstreamConsumer
+from benchmarks.stub_servers import JetstreamReplayStub, synthetic_jetstream_frames
+
+
+def event(time_us, text="commission an artist please"):
+    return {
+        "did": "did:plc:test",
+        "time_us": time_us,
+        "kind": "commit",
+        "commit": {
+            "operation": "create",
+            "collection": "app.bsky.feed.post",
+            "rkey": f"r{time_us}",
+            "record": {"text": text, "langs": ["en"], "createdAt": "2026-01-01T00:00:00+00:00"},
+        },
+    }
+
+
+@pytest.fixture
+def consumer(tmp_path):
+    return JetstreamConsumer(["commission"], url="ws://127.0.0.1:9/subscribe",
+                             cursor_file=str(tmp_path / "cursor.json"), batch_seconds=0.05)
+
+
+@pytest.mark.parametrize("frame", [
+    b"\xff\xfe not utf-8",
+    b"[1, 2, 3]",
+    b"{not json",
+    json.dumps({"kind": "commit", "commit": "oops", "time_us": 1}).encode(),
+    json.dumps({"kind": "commit", "time_us": 1, "commit": {
+        "operation": "create", "collection": "app.bsky.feed.post", "record": ["x"]}}).encode(),
+])
+def test_bad_frames_are_counted_and_skipped(consumer, frame):
+    consumer._handle_frame(frame)
+    consumer._handle_frame(json.dumps(event(10)).encode())
+    assert consumer.stats["bad_events"] == 1
+    assert consumer.stats["matched"] == 1
+    assert consumer._queue.qsize() == 1
+    assert consumer._last_seen == 10
+
+
+def test_idle_commit_advances_cursor_without_matches(consumer):
+    consumer._handle_frame(json.dumps(event(5, "just coffee")).encode())
+    consumer._idle_commit()
+    assert consumer._cursor == 5
+    assert json.load(open(consumer.cursor_file))["time_us"] == 5
+
+
+def test_idle_commit_waits_for_queued_and_uncommitted_posts(consumer):
+    consumer._handle_frame(json.dumps(event(5)).encode())
+    consumer._idle_commit()
+    assert consumer._cursor is None  # the matched post is still queued
+
+    consumer._queue.get_nowait()
+    consumer._pending_cursor = 5  # handed out, not yet stored
+    consumer._handle_frame(json.dumps(event(9, "just coffee")).encode())
+    consumer._idle_commit()
+    assert consumer._cursor is None
+
+    consumer.commit()
+    consumer._idle_commit()
+    assert consumer._cursor == 9
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_batches_restart_dead_reader(tmp_path, monkeypatch):
+    frames = synthetic_jetstream_frames(200, match_every=100, start_us=1_000_000)
+    stub = JetstreamReplayStub(frames).start()
+    consumer = JetstreamConsumer(["commission"], url=stub.url,
+                                 cursor_file=str(tmp_path / "cursor.json"), batch_seconds=0.1)
+    original = consumer._read_loop
+    calls = []
+
+    def flaky_read_loop():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        original()
+
+    monkeypatch.setattr(consumer, "_read_loop", flaky_read_loop)
+    posts = []
+    try:
+        for batch in consumer.batches():
+            posts.extend(batch)
+            consumer.commit()
+            if len(posts) >= 2:
+                break
+        deadline = time.monotonic() + 5
+        while consumer._last_seen != frames[-1]["time_us"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        consumer._idle_commit()
+    finally:
+        consumer.stop()
+        stub.stop()
+
+    assert consumer.stats["restarts"] == 1
+    assert [post.url for post in posts] == [f"at://{frames[i]['did']}/app.bsky.feed.post/{frames[i]['commit']['rkey']}"
+                                           for i in (0, 100)]
+    assert consumer._cursor == frames[-1]["time_us"]
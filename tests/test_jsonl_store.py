@@ -0,0 +1,51 @@
+from app.jsonl_store import JsonlStore
+
+
+def make_store(tmp_path):
+    return JsonlStore(str(tmp_path / "posts.jsonl"), compact_min_lines=10**6)
+
+
+def test_load_append_load_round_trip_keeps_urlless_posts(tmp_path):
+    store = make_store(tmp_path)
+    first = [{"url": "at://a/1", "text": "one"}, {"text": "no url"}, {"url": "", "text": "empty url"}]
+    store.rewrite(first)
+
+    posts = make_store(tmp_path).load()
+    assert posts == first
+
+    reopened = make_store(tmp_path)
+    posts = reopened.load()
+    new = [{"url": "at://a/2", "text": "two"}, {"text": "another url-less post"}]
+    posts.extend(new)
+    reopened.append(posts, new)
+
+    assert make_store(tmp_path).load() == first + new
+    # Nothing was tombstoned: one line per post
+    assert open(tmp_path / "posts.jsonl").read().count("\n") == len(first) + len(new)
+
+
+def test_dropped_posts_are_tombstoned(tmp_path):
+    store = make_store(tmp_path)
+    store.rewrite([{"url": "at://a/1"}, {"text": "no url"}, {"url": "at://a/2"}])
+
+    posts = store.load()
+    kept = [post for post in posts if post.get("url") != "at://a/1" and "text" not in post]
+    store.append(kept, [])
+
+    assert make_store(tmp_path).load() == [{"url": "at://a/2"}]
+
+
+def test_later_line_replaces_earlier_one_with_same_url(tmp_path):
+    store = make_store(tmp_path)
+    store.rewrite([{"url": "at://a/1", "text": "old"}])
+    posts = store.load()
+    updated = {"url": "at://a/1", "text": "new"}
+    store.append([updated], [updated])
+
+    assert make_store(tmp_path).load() == [updated]
+
+
+def test_unreadable_and_non_object_lines_are_skipped(tmp_path):
+    path = tmp_path / "posts.jsonl"
+    path.write_text('{"url": "at://a/1"}\n42\n[1, 2]\n"text"\nnull\n{"url": "at://a/2"}\n{"url": "at://a/3", "te\n')
+    assert make_store(tmp_path).load() == [{"url": "at://a/1"}, {"url": "at://a/2"}]
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from app.key_pool import KeyPool, parse_reset
+
+
+def make_pool(*keys, concurrency=1, **kwargs):
+    return KeyPool(keys or ("key-a",), anonymize=lambda key: key.upper(), concurrency=concurrency, **kwargs)
+
+
+def timed_acquire(pool, max_wait):
+    started = time.monotonic()
+    result = pool.acquire(max_wait=max_wait)
+    return result, time.monotonic() - started
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("7.66s", 7.66), ("2m59.56s", 179.56), ("1h2m", 3720.0), ("450ms", 0.45), ("12", 12.0),
+    ("", None), (None, None), ("soon", None),
+])
+def test_parse_reset(value, seconds):
+    if seconds is None:
+        assert parse_reset(value) is None
+    else:
+        assert parse_reset(value) == pytest.approx(seconds)
+
+
+def test_rate_limited_key_cools_down_then_is_reused():
+    pool = make_pool("key-a")
+    assert pool.acquire(max_wait=0) == ("key-a", "KEY-A")
+
+    assert pool.rate_limited("KEY-A", {"retry-after": "0.2"}) == pytest.approx(0.2)
+    assert pool.acquire(max_wait=0) == (None, None)
+    assert pool.snapshot()[0]["remaining_requests"] == 0
+
+    result, waited = timed_acquire(pool, max_wait=2)
+    assert result == ("key-a", "KEY-A")
+    assert 0.1 < waited < 1.0
+    # Waking clears the exhausted window so the key is usable again
+    assert pool.snapshot()[0]["remaining_requests"] is None
+
+
+def test_other_keys_serve_while_one_cools():
+    pool = make_pool("key-a", "key-b")
+    key, key_id = pool.acquire(max_wait=0)
+    pool.rate_limited(key_id, {"retry-after": "30"})
+    other = "KEY-B" if key_id == "KEY-A" else "KEY-A"
+    assert pool.acquire(max_wait=0)[1] == other
+
+
+def test_repeated_rate_limits_leave_no_stale_entries():
+    pool = make_pool("key-a", concurrency=2)
+    pool.acquire(max_wait=0)
+    pool.acquire(max_wait=0)
+
+    # Both in-flight requests get a 429; the longer cool-down wins
+    pool.rate_limited("KEY-A", {"retry-after": "0.05"})
+    pool.rate_limited("KEY-A", {"retry-after": "0.3"})
+    time.sleep(0.1)
+    assert pool.acquire(max_wait=0) == (None, None), "woken by the superseded 0.05s entry"
+
+    time.sleep(0.3)
+    assert pool.acquire(max_wait=0)[1] == "KEY-A"
+    assert pool.acquire(max_wait=0)[1] == "KEY-A"
+    # Still at most `concurrency` slots, however many heap entries were pushed
+    assert pool.acquire(max_wait=0) == (None, None)
+    assert pool.snapshot()[0]["in_flight"] == 2
+
+
+def test_disabled_key_is_never_handed_out():
+    pool = make_pool("key-a", "key-b")
+    _, key_id = pool.acquire(max_wait=0)
+    pool.disable(key_id)
+    other = pool.acquire(max_wait=0)[1]
+    assert other != key_id
+    pool.release(other)
+    for _ in range(3):
+        _, got = pool.acquire(max_wait=0)
+        assert got == other
+        pool.release(got)
+
+
+def test_disabling_a_cooling_key_outlasts_its_cool_down():
+    pool = make_pool("key-a")
+    pool.acquire(max_wait=0)
+    pool.rate_limited("KEY-A", {"retry-after": "0.05"})
+    pool.disable("KEY-A")
+    result, waited = timed_acquire(pool, max_wait=0.3)
+    assert result == (None, None)
+    assert pool.snapshot()[0]["disabled"]
+
+
+def test_all_disabled_returns_without_waiting():
+    pool = make_pool("key-a")
+    pool.disable("KEY-A")
+    result, waited = timed_acquire(pool, max_wait=5)
+    assert result == (None, None) and waited < 0.5
+
+
+def test_waits_for_the_first_key_to_finish_cooling():
+    pool = make_pool("key-a", "key-b")
+    for _ in range(2):
+        pool.acquire(max_wait=0)
+    pool.rate_limited("KEY-A", {"retry-after": "0.4"})
+    pool.rate_limited("KEY-B", {"retry-after": "0.15"})
+
+    result, waited = timed_acquire(pool, max_wait=2)
+    assert result[1] == "KEY-B"
+    assert 0.1 < waited < 0.35
+
+
+def test_gives_up_when_no_key_wakes_before_the_deadline():
+    pool = make_pool("key-a")
+    pool.acquire(max_wait=0)
+    pool.rate_limited("KEY-A", {"retry-after": "30"})
+    result, waited = timed_acquire(pool, max_wait=0.2)
+    assert result == (None, None)
+    assert waited < 0.1  # the next wake is past the deadline, so it does not block
+
+
+def test_busy_keys_wake_waiters_on_release():
+    pool = make_pool("key-a")
+    pool.acquire(max_wait=0)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(pool.acquire(max_wait=2)))
+    waiter.start()
+    time.sleep(0.1)
+    pool.release("KEY-A", {"x-ratelimit-remaining-requests": "10", "x-ratelimit-remaining-tokens": "5000"})
+    waiter.join(2)
+    assert results == [("key-a", "KEY-A")]
+
+
+def test_headers_with_no_requests_left_cool_the_key():
+    pool = make_pool("key-a")
+    pool.acquire(max_wait=0)
+    pool.release("KEY-A", {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "0.15s"})
+    assert pool.acquire(max_wait=0) == (None, None)
+    assert pool.acquire(max_wait=1)[1] == "KEY-A"
+
+
+def test_key_without_daily_budget_is_parked():
+    pool = make_pool("key-a", "key-b", has_budget=lambda key_id: key_id != "KEY-A")
+    for _ in range(3):
+        _, key_id = pool.acquire(max_wait=0)
+        assert key_id == "KEY-B"
+        pool.release(key_id)
+    assert next(s for s in pool.snapshot() if s["key_id"] == "KEY-A")["cooling_for"] > 0
@@ -0,0 +1,26 @@
+import random
+
+from app.matcher import MultiPatternMatcher
+
+
+def naive(categories, text):
+    text_lower = text.lower()
+    return {name: {p.lower() for p in patterns if p.lower() in text_lower}
+            for name, patterns in categories.items()}
+
+
+def test_matches_substring_semantics_including_overlaps():
+    categories = {"a": ["art", "my art", "commission", "comm"], "b": ["artist", "t c", "on a"]}
+    matcher = MultiPatternMatcher(categories)
+    rng = random.Random(1)
+    words = ["my", "art", "artist", "commission", "comm", "on", "a", "t", "cats", "My ART"]
+    for _ in range(500):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        hits = matcher.scan(text)
+        assert {name: set(hits[name]) for name in categories} == naive(categories, text), text
+
+
+def test_missing_category_reads_empty():
+    matcher = MultiPatternMatcher({"a": ["x"]})
+    assert matcher.scan("nothing here")["a"] == frozenset()
+    assert not MultiPatternMatcher({}).scan("text")["a"]
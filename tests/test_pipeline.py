@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app import main
+from app.fetch_state import MAX_RETRY_ATTEMPTS, FetchState
+from app.models import Classification, Post
+from app.storage import JsonPostStore
+
+NOW = datetime.now(timezone.utc)
+
+
+def make_post(name):
+    return Post(url=f"at://did:plc:x/app.bsky.feed.post/{name}", text=name, author=f"{name}.bsky.social")
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """run_pipeline with the fetch, the LLM, storage and Discord replaced by fakes"""
+    env = SimpleNamespace(pages=[], verdicts={}, events=[], classified=[],
+                          state=FetchState(str(tmp_path / "fetch_state.json")))
+
+    def fake_stream(keywords, since, state):
+        state.advance("kw", NOW.isoformat(), "at://mark")
+        return iter(env.pages)
+
+    def fake_classify(batches):
+        for batch in batches:
+            for tag, text in batch:
+                env.classified.append(text)
+                env.events.append(("verdict", text))
+                yield tag, env.verdicts.get(text)
+
+    monkeypatch.setattr(main, "fetch_state", env.state)
+    monkeypatch.setattr(main, "last_cycle_started", None)
+    monkeypatch.setattr(main, "stream_all_since_timestamp", fake_stream)
+    monkeypatch.setattr(main, "classify_stream", fake_classify)
+    monkeypatch.setattr(main, "open_store", lambda: JsonPostStore(str(tmp_path / "posts.jsonl")))
+    monkeypatch.setattr(main, "save_caches", lambda: None)
+    monkeypatch.setattr(main, "notify_qualified", lambda number, post: env.events.append(("notify", post.text)))
+    monkeypatch.setattr(main, "send_cycle_summary", lambda qualified: env.events.append(("summary", qualified)))
+    monkeypatch.setattr(main, "print_connection_stats", lambda: None)
+    return env
+
+
+def yes():
+    return Classification(is_commission=True, confidence=0.9)
+
+
+def test_failed_verdicts_are_retried_without_holding_back_marks(pipeline):
+    pipeline.pages = [[make_post("a"), make_post("b")]]
+    pipeline.verdicts = {"a": yes()}
+
+    counts = main.run_pipeline()
+
+    assert counts["qualified"] == 1 and counts["errors"] == 1
+    assert pipeline.state.high_water_mark("kw")["uri"] == "at://mark"
+    assert main.last_cycle_started is not None
+    assert [entry["post"]["text"] for entry in pipeline.state.retry_posts()] == ["b"]
+
+    # Next cycle: the failed post goes first and succeeds this time
+    pipeline.pages = [[make_post("c")]]
+    pipeline.verdicts = {"b": yes(), "c": yes()}
+    pipeline.classified.clear()
+
+    counts = main.run_pipeline()
+
+    assert pipeline.classified == ["b", "c"]
+    assert counts["qualified"] == 2
+    assert pipeline.state.retry_posts() == []
+
+
+def test_qualified_posts_are_notified_as_their_verdicts_arrive(pipeline):
+    pipeline.pages = [[make_post("a"), make_post("b"), make_post("c")]]
+    pipeline.verdicts = {"a": yes(), "c": yes()}
+
+    main.run_pipeline()
+
+    assert pipeline.events == [
+        ("verdict", "a"), ("notify", "a"),
+        ("verdict", "b"),
+        ("verdict", "c"), ("notify", "c"),
+        ("summary", 2),
+    ]
+
+
+def test_posts_that_keep_failing_are_dropped(pipeline):
+    pipeline.pages = [[make_post("bad")]]
+    for attempt in range(1, MAX_RETRY_ATTEMPTS + 1):
+        main.run_pipeline()
+        pipeline.pages = []
+        retry = pipeline.state.retry_posts()
+        if attempt < MAX_RETRY_ATTEMPTS:
+            assert [entry["attempts"] for entry in retry] == [attempt]
+    assert retry == []
+
+
+def test_retry_list_survives_a_restart(pipeline, tmp_path):
+    pipeline.pages = [[make_post("b")]]
+    main.run_pipeline()
+
+    reloaded = FetchState(str(tmp_path / "fetch_state.json"))
+    assert [entry["post"]["url"] for entry in reloaded.retry_posts()] == [make_post("b").url]
+    assert reloaded.high_water_mark("kw")["uri"] == "at://mark"
+
+
+def test_state_file_without_retry_list_still_loads(tmp_path):
+    path = tmp_path / "fetch_state.json"
+    path.write_text('{"kw": {"indexed_at": "2026-01-01T00:00:00+00:00", "uri": "at://old"}}')
+    state = FetchState(str(path))
+    assert state.high_water_mark("kw")["uri"] == "at://old"
+    assert state.retry_posts() == []
@@ -0,0 +1,28 @@
+import pytest
+
+from app import jsonio, preclassifier, storage
+from app.models import Classification, Post
+
+
+@pytest.mark.parametrize("name", ["posts.json", "posts.jsonl", "posts.db"])
+def test_training_data_is_read_from_every_backend(tmp_path, name):
+    posts_file = str(tmp_path / name)
+    backend = "sqlite" if name.endswith(".db") else "json"
+    store = storage.open_store(backend, posts_file)
+    for i, verdict in enumerate([True, False, True]):
+        store.add_post(Post(url=f"at://did:plc:x/app.bsky.feed.post/{i}", text=f"post {i}",
+                            ai=Classification(is_commission=verdict, confidence=0.9)))
+    store.save()
+    store.close()
+
+    history = tmp_path / "history.jsonl"
+    history.write_text("\n".join([
+        jsonio.dumps({"text": "post 2", "is_commission": False}),  # later label wins
+        "not json",
+        "[1, 2]",
+        jsonio.dumps({"text": "post 3", "is_commission": True}),
+    ]) + "\n")
+
+    texts, labels = preclassifier.load_training_data(posts_file, str(history))
+
+    assert dict(zip(texts, labels)) == {"post 0": True, "post 1": False, "post 2": False, "post 3": True}
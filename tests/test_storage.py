@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import storage
+from app.storage import DedupIndex, compact_posts
+
+
+def post(name, days_old=None):
+    ai = {}
+    if days_old is not None:
+        ai["timestamp"] = (datetime.now(timezone.utc) - timedelta(days=days_old)).isoformat()
+    return {"url": f"at://x/{name}", "ai": ai}
+
+
+def urls(posts):
+    return [p["url"].rsplit("/", 1)[1] for p in posts]
+
+
+def test_undated_posts_keep_their_position():
+    posts = [post("old1", 40), post("undated1"), post("old2", 35), post("new1", 5),
+             post("undated2"), post("new2", 1)]
+    index = DedupIndex(posts)
+
+    compacted = compact_posts(posts, index=index, max_age_days=30, max_size=100)
+
+    assert urls(compacted) == ["undated1", "new1", "undated2", "new2"]
+    assert not index.contains("at://x/old1") and index.contains("at://x/undated1")
+
+
+def test_size_limit_drops_oldest_positions_not_undated_posts():
+    posts = [post("new1", 3), post("new2", 2), post("undated"), post("new3", 1)]
+
+    compacted = compact_posts(posts, max_age_days=30, max_size=2)
+
+    assert urls(compacted) == ["undated", "new3"]
+
+
+def test_matches_prune_then_limit():
+    posts = [post(f"p{i}", days_old=None if i % 4 == 0 else 50 - i) for i in range(50)]
+
+    expected = storage.limit_storage_size(storage.prune_old_posts(list(posts), max_age_days=30), 20)
+
+    assert compact_posts(posts, max_age_days=30, max_size=20) == expected
+
+
+def test_post_store_is_abstract():
+    class Partial(storage.PostStore):
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        storage.PostStore()
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.parametrize("backend, name", [("json", "posts.jsonl"), ("sqlite", "posts.db")])
+def test_backends_implement_the_interface(tmp_path, backend, name):
+    store = storage.open_store(backend, str(tmp_path / name))
+    try:
+        assert isinstance(store, storage.PostStore)
+        assert len(store) == 0
+    finally:
+        store.close()
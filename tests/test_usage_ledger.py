@@ -0,0 +1,25 @@
+import json
+
+from app.usage_ledger import MAX_FLUSH_BACKOFF_SECONDS, UsageLedger
+
+
+def test_failed_flush_rearms_the_timer_with_backoff(tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")  # a file where the usage directory should be
+    ledger = UsageLedger(str(blocker / "usage.json"), str(tmp_path / "reset.txt"), flush_interval=60)
+    ledger.add("k" * 16, 5)
+    ledger._timer.cancel()
+
+    delays = []
+    for _ in range(5):
+        ledger.flush()
+        assert ledger._timer is not None
+        ledger._timer.cancel()
+        delays.append(ledger._timer.interval)
+    assert delays == [60, 120, 240, MAX_FLUSH_BACKOFF_SECONDS, MAX_FLUSH_BACKOFF_SECONDS]
+
+    # Once the disk is writable again the pending usage is written and the backoff resets
+    blocker.unlink()
+    ledger.flush()
+    assert json.loads((blocker / "usage.json").read_text()) == {"k" * 16: 5}
+    assert ledger._timer is None and ledger._failures == 0
@@ -0,0 +1,108 @@
+import socket
+import struct
+
+import pytest
+
+from app.ws_client import (
+    OP_BINARY, OP_CLOSE, OP_CONTINUATION, OP_PING, OP_PONG, OP_TEXT,
+    WebSocket, WebSocketClosed, accept_key, encode_frame,
+)
+
+
+@pytest.fixture
+def pair():
+    client_sock, server_sock = socket.socketpair()
+    client_sock.settimeout(5)
+    server_sock.settimeout(5)
+    yield WebSocket(client_sock), server_sock
+    client_sock.close()
+    server_sock.close()
+
+
+def frame(opcode, payload, final=True, mask=False):
+    data = bytearray(encode_frame(opcode, payload, mask=mask))
+    if not final:
+        data[0] &= 0x7F
+    return bytes(data)
+
+
+def read_frame(sock):
+    """Decode one (masked) client frame from the server side"""
+    ws = WebSocket(sock)
+    return ws._read_frame()
+
+
+def test_accept_key_rfc_example():
+    # RFC 6455 §1.3
+    assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+@pytest.mark.parametrize("mask", [False, True])
+@pytest.mark.parametrize("size", [5, 200, 70_000])
+def test_text_frames_masked_and_unmasked(pair, mask, size):
+    ws, server = pair
+    text = "é" * (size // 2)
+    server.sendall(frame(OP_TEXT, text.encode("utf-8"), mask=mask))
+    assert ws.recv() == text
+
+
+def test_binary_and_raw_bytes(pair):
+    ws, server = pair
+    server.sendall(frame(OP_BINARY, b"\x00\xff"))
+    server.sendall(frame(OP_TEXT, b'{"a":1}'))
+    assert ws.recv() == b"\x00\xff"
+    assert ws.recv_bytes() == b'{"a":1}'
+
+
+def test_continuation_frames_are_joined(pair):
+    ws, server = pair
+    server.sendall(frame(OP_TEXT, b"hel", final=False)
+                   + frame(OP_CONTINUATION, b"lo ", final=False)
+                   + frame(OP_CONTINUATION, b"world"))
+    assert ws.recv() == "hello world"
+
+
+def test_ping_between_fragments_is_answered(pair):
+    ws, server = pair
+    server.sendall(frame(OP_TEXT, b"a", final=False) + frame(OP_PING, b"hi") + frame(OP_CONTINUATION, b"b"))
+    assert ws.recv() == "ab"
+    final, opcode, payload = read_frame(server)
+    assert (final, opcode, payload) == (True, OP_PONG, b"hi")
+
+
+def test_client_frames_are_masked(pair):
+    ws, server = pair
+    ws.send("hello")
+    raw = server.recv(64)
+    assert raw[1] & 0x80  # mask bit
+    assert WebSocket(_replay(raw))._read_frame() == (True, OP_TEXT, b"hello")
+
+
+def test_close_frame_raises_and_replies(pair):
+    ws, server = pair
+    server.sendall(frame(OP_CLOSE, struct.pack("!H", 1001)))
+    with pytest.raises(WebSocketClosed, match="1001"):
+        ws.recv()
+    assert ws.closed
+    final, opcode, payload = read_frame(server)
+    assert opcode == OP_CLOSE and struct.unpack("!H", payload)[0] == 1000
+
+
+def test_dropped_connection_raises(pair):
+    ws, server = pair
+    server.sendall(frame(OP_TEXT, b"partial")[:4])
+    server.close()
+    with pytest.raises(WebSocketClosed):
+        ws.recv()
+
+
+def _replay(data):
+    """Socket-like object that returns `data` once"""
+    class _Sock:
+        def __init__(self):
+            self.chunks = [data]
+
+        def recv(self, _size):
+            return self.chunks.pop(0) if self.chunks else b""
+
+    return _Sock()